@@ -0,0 +1,345 @@
+"""
+Content-addressed artifact storage shared by all nodes.
+
+Rendered artifacts (scene images, narration segments, videos) are produced in
+the job's local working directory (settings.output_dir/<job_id>/...) and then
+published to the artifact store under the sha256 of their bytes:
+
+    sha256/ab/cd/abcd1234…<suffix>
+
+Identical content is stored once, whichever job or node produced it. Jobs
+record the key of every published artifact (PipelineJob.artifacts, by path
+relative to the job directory), so downloads are served from the store and a
+node that lacks a job's working files can fetch them back instead of
+re-rendering.
+
+Backends (settings.artifact_backend):
+  local  sharded directory tree under settings.artifact_dir
+  s3     S3-compatible bucket (AWS, MinIO, ...) via boto3, imported on first use;
+         point artifact_s3_endpoint_url at a local MinIO to test against it
+"""
+
+import asyncio
+import hashlib
+from abc import ABC, abstractmethod
+import os
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+from typing import AsyncIterator, Iterable, Iterator
+
+from config import settings
+from singleflight import file_digest
+
+CHUNK_BYTES = 1024 * 1024
+
+
+def artifact_key(digest: str, suffix: str = "") -> str:
+    """Sharded key of a sha256 hex digest: two levels of 2-char hash prefixes."""
+    return f"sha256/{digest[:2]}/{digest[2:4]}/{digest}{suffix.lower()}"
+
+
+class ArtifactStore(ABC):
+    """Interface of the backends. Keys are content addresses (see artifact_key)."""
+
+    name = ""
+
+    @abstractmethod
+    def exists(self, key: str) -> bool:
+        ...
+
+    @abstractmethod
+    def size(self, key: str) -> int:
+        ...
+
+    @abstractmethod
+    def _put(self, key: str, source: Path):
+        """Store the file at `source` under `key` (content known to match)."""
+
+    @abstractmethod
+    def read(self, key: str, start: int = 0) -> Iterator[bytes]:
+        """Chunks of the artifact from byte `start` on."""
+
+    @abstractmethod
+    def delete(self, key: str):
+        ...
+
+    def touch(self, key: str) -> bool:
+        """
+        Mark an existing entry as just used, so age-based GC keeps content that
+        is re-published by a new job. False if the key is not stored.
+        """
+        return self.exists(key)
+
+    def local_path(self, key: str) -> Path | None:
+        """A path the key can be served from directly, if the backend has one."""
+        return None
+
+    def put_file(self, path: Path) -> str:
+        """Publish a file; a no-op upload if the same content is already stored."""
+        key = artifact_key(file_digest(path), path.suffix)
+        if not self.touch(key):
+            self._put(key, path)
+        return key
+
+    def put_stream(self, chunks: Iterable[bytes], suffix: str = "") -> str:
+        """Publish streamed content: spooled to a temp file while hashing, then stored."""
+        digest = hashlib.sha256()
+        fd, tmp = tempfile.mkstemp(dir=self._spool_dir(), suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                    digest.update(chunk)
+            key = artifact_key(digest.hexdigest(), suffix)
+            if not self.touch(key):
+                self._put_spooled(key, Path(tmp))
+            return key
+        finally:
+            Path(tmp).unlink(missing_ok=True)
+
+    def _spool_dir(self) -> str | None:
+        return None  # system temp dir
+
+    def _put_spooled(self, key: str, spooled: Path):
+        self._put(key, spooled)
+
+    def fetch(self, key: str, destination: Path) -> Path:
+        """Materialize an artifact as a local file (written atomically)."""
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=destination.parent, suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for chunk in self.read(key):
+                    f.write(chunk)
+            os.replace(tmp, destination)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+        return destination
+
+
+class LocalArtifactStore(ArtifactStore):
+    """Sharded directory tree: <root>/sha256/ab/cd/<digest><suffix>."""
+
+    name = "local"
+
+    def __init__(self, root: Path):
+        self.root = root
+
+    def _path(self, key: str) -> Path:
+        return self.root / key
+
+    def exists(self, key: str) -> bool:
+        return self._path(key).exists()
+
+    def size(self, key: str) -> int:
+        return self._path(key).stat().st_size
+
+    def _put(self, key: str, source: Path):
+        target = self._path(key)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=target.parent, suffix=".part")
+        os.close(fd)
+        try:
+            # Hard link where the filesystem allows (no second copy on disk);
+            # writers detach() working files before rewriting them
+            os.unlink(tmp)
+            try:
+                os.link(source, tmp)
+            except OSError:  # other filesystem, or links not supported
+                shutil.copyfile(source, tmp)
+            os.replace(tmp, target)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+
+    def read(self, key: str, start: int = 0) -> Iterator[bytes]:
+        with open(self._path(key), "rb") as f:
+            f.seek(start)
+            for chunk in iter(lambda: f.read(CHUNK_BYTES), b""):
+                yield chunk
+
+    def delete(self, key: str):
+        self._path(key).unlink(missing_ok=True)
+
+    def touch(self, key: str) -> bool:
+        try:
+            os.utime(self._path(key))
+        except FileNotFoundError:
+            return False
+        return True
+
+    def _spool_dir(self) -> str:
+        spool = self.root / "tmp"
+        spool.mkdir(parents=True, exist_ok=True)
+        return str(spool)
+
+    def _put_spooled(self, key: str, spooled: Path):
+        target = self._path(key)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(spooled, target)  # same filesystem: no copy
+
+    def local_path(self, key: str) -> Path | None:
+        path = self._path(key)
+        return path if path.exists() else None
+
+
+class S3ArtifactStore(ArtifactStore):
+    """
+    S3-compatible bucket; uploads are multipart and reads are ranged streams.
+    Expiry is left to the bucket's lifecycle rules, so touch() only checks existence.
+    """
+
+    name = "s3"
+
+    def __init__(self, bucket: str, prefix: str = "", endpoint_url: str = "", region: str = ""):
+        # boto3 is imported on first use, like the other provider SDKs
+        try:
+            import boto3
+            from boto3.s3.transfer import TransferConfig
+        except ImportError:
+            raise ValueError("Install boto3 for ARTIFACT_BACKEND=s3: pip install boto3")
+        if not bucket:
+            raise ValueError("ARTIFACT_S3_BUCKET is not set")
+        self.bucket = bucket
+        self.prefix = prefix
+        self._client = boto3.client(
+            "s3", endpoint_url=endpoint_url or None, region_name=region or None
+        )
+        self._transfer = TransferConfig(multipart_chunksize=8 * CHUNK_BYTES)
+
+    def _object(self, key: str) -> str:
+        return f"{self.prefix}{key}"
+
+    def _head(self, key: str) -> dict | None:
+        from botocore.exceptions import ClientError
+
+        try:
+            return self._client.head_object(Bucket=self.bucket, Key=self._object(key))
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+
+    def exists(self, key: str) -> bool:
+        return self._head(key) is not None
+
+    def size(self, key: str) -> int:
+        head = self._head(key)
+        if head is None:
+            raise FileNotFoundError(key)
+        return head["ContentLength"]
+
+    def _put(self, key: str, source: Path):
+        self._client.upload_file(
+            str(source), self.bucket, self._object(key), Config=self._transfer
+        )
+
+    def read(self, key: str, start: int = 0) -> Iterator[bytes]:
+        extra = {"Range": f"bytes={start}-"} if start else {}
+        body = self._client.get_object(Bucket=self.bucket, Key=self._object(key), **extra)["Body"]
+        try:
+            yield from body.iter_chunks(CHUNK_BYTES)
+        finally:
+            body.close()
+
+    def delete(self, key: str):
+        self._client.delete_object(Bucket=self.bucket, Key=self._object(key))
+
+
+_store: ArtifactStore | None = None
+_store_lock = threading.Lock()
+# (resolved path, mtime_ns, size) -> key, so re-publishing an unchanged file doesn't rehash it
+_published: dict[tuple[str, int, int], str] = {}
+_published_lock = threading.Lock()
+_PUBLISHED_MAX = 10_000
+
+
+def get_artifact_store() -> ArtifactStore:
+    global _store
+    with _store_lock:
+        if _store is None:
+            if settings.artifact_backend == "s3":
+                _store = S3ArtifactStore(
+                    settings.artifact_s3_bucket,
+                    settings.artifact_s3_prefix,
+                    settings.artifact_s3_endpoint_url,
+                    settings.artifact_s3_region,
+                )
+            elif settings.artifact_backend == "local":
+                _store = LocalArtifactStore(settings.artifact_dir)
+            else:
+                raise ValueError(f"Unknown ARTIFACT_BACKEND: {settings.artifact_backend}")
+        return _store
+
+
+def _publish_sync(path: Path) -> str:
+    st = path.stat()
+    memo = (str(path.resolve()), st.st_mtime_ns, st.st_size)
+    store = get_artifact_store()
+    with _published_lock:
+        key = _published.get(memo)
+    # A memo hit still refreshes the entry (and re-uploads if it was collected)
+    if key is None or not store.touch(key):
+        key = store.put_file(path)
+        with _published_lock:
+            _published[memo] = key
+            if len(_published) > _PUBLISHED_MAX:
+                _published.pop(next(iter(_published)))
+    return key
+
+
+def detach(path: Path):
+    """
+    Remove a working file that is about to be rewritten in place (encoder
+    output, copy target), so a store entry hard-linked to it keeps its content.
+    """
+    path.unlink(missing_ok=True)
+
+
+def forget(keys: Iterable[str]):
+    """Drop memoized publishes of deleted keys (called by the GC)."""
+    gone = set(keys)
+    if not gone:
+        return
+    with _published_lock:
+        for memo in [m for m, key in _published.items() if key in gone]:
+            del _published[memo]
+
+
+async def publish(path: Path) -> str:
+    """Publish a local artifact to the store (deduplicated); returns its key."""
+    return await asyncio.to_thread(_publish_sync, path)
+
+
+def job_artifact_name(job_id: str, path: str | Path) -> str | None:
+    """Name of a job's artifact in PipelineJob.artifacts: its path relative to the job dir."""
+    try:
+        return Path(path).resolve().relative_to((settings.output_dir / job_id).resolve()).as_posix()
+    except ValueError:
+        return None
+
+
+async def publish_job_artifacts(job_id: str, paths: list[Path]) -> dict[str, str]:
+    """Publish artifacts in a job's working dir: {artifact name: key}."""
+    named = [(job_artifact_name(job_id, p), Path(p)) for p in paths]
+    named = [(name, p) for name, p in named if name]
+    keys = await asyncio.gather(*(publish(p) for _, p in named))
+    return {name: key for (name, _), key in zip(named, keys)}
+
+
+async def fetch(key: str, destination: Path) -> Path:
+    return await asyncio.to_thread(get_artifact_store().fetch, key, destination)
+
+
+async def stream(key: str, start: int = 0) -> AsyncIterator[bytes]:
+    """Async chunked read of an artifact; blocking backend reads run in a thread."""
+    chunks = get_artifact_store().read(key, start)
+    sentinel = object()
+    try:
+        while (chunk := await asyncio.to_thread(next, chunks, sentinel)) is not sentinel:
+            yield chunk
+    finally:
+        chunks.close()
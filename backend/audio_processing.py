@@ -0,0 +1,190 @@
+"""
+Local audio helpers built on the ffmpeg binary that ships with imageio-ffmpeg
+(the same one MoviePy uses): probing, decoding to PCM, silence-aware splitting
+and the pre-Whisper preprocessing stage (VAD trim, mono 16 kHz, Opus transcode).
+"""
+
+import io
+import re
+import subprocess
+import wave
+from pathlib import Path
+
+import numpy as np
+
+SAMPLE_RATE = 16_000  # Whisper resamples to 16 kHz mono internally anyway
+_FRAME_SECONDS = 0.02
+
+_DURATION_RE = re.compile(r"Duration:\s*(\d+):(\d+):(\d+(?:\.\d+)?)")
+
+
+def ffmpeg_binary() -> str:
+    import imageio_ffmpeg
+
+    return imageio_ffmpeg.get_ffmpeg_exe()
+
+
+def probe_duration(audio_path: Path) -> float | None:
+    """Container duration in seconds (None if ffmpeg can't tell)."""
+    proc = subprocess.run(
+        [ffmpeg_binary(), "-hide_banner", "-i", str(audio_path)],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+    )
+    match = _DURATION_RE.search(proc.stderr.decode("utf-8", "replace"))
+    if not match:
+        return None
+    hours, minutes, seconds = match.groups()
+    return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+
+def decode_pcm(audio_path: Path, sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """Decode any ffmpeg-readable file to mono int16 PCM at sample_rate."""
+    proc = subprocess.run(
+        [
+            ffmpeg_binary(), "-hide_banner", "-loglevel", "error",
+            "-i", str(audio_path),
+            "-ac", "1", "-ar", str(sample_rate),
+            "-f", "s16le", "-",
+        ],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+    if proc.returncode:
+        raise IOError(f"ffmpeg could not decode {audio_path.name}: {proc.stderr.decode('utf-8', 'replace')}")
+    return np.frombuffer(proc.stdout, dtype=np.int16)
+
+
+def frame_energy(samples: np.ndarray, sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """RMS energy per 20 ms frame."""
+    frame = int(sample_rate * _FRAME_SECONDS)
+    n_frames = len(samples) // frame
+    if n_frames == 0:
+        return np.zeros(0)
+    frames = samples[: n_frames * frame].astype(np.float32).reshape(n_frames, frame)
+    return np.sqrt(np.mean(frames * frames, axis=1))
+
+
+def split_on_silence(
+    samples: np.ndarray,
+    chunk_seconds: float,
+    overlap_seconds: float,
+    search_seconds: float = 5.0,
+    sample_rate: int = SAMPLE_RATE,
+) -> list[tuple[int, int]]:
+    """
+    Split PCM into ~chunk_seconds pieces as (start, end) sample ranges.
+
+    Each cut is placed at the quietest 20 ms frame within ±search_seconds of the
+    nominal boundary, so words are rarely split. Every chunk after the first
+    starts overlap_seconds before its cut so the boundary is heard twice and the
+    transcripts can be de-duplicated when merged.
+    """
+    total = len(samples)
+    chunk = int(chunk_seconds * sample_rate)
+    if total <= chunk:
+        return [(0, total)]
+
+    energy = frame_energy(samples, sample_rate)
+    frame = int(sample_rate * _FRAME_SECONDS)
+    search = int(search_seconds / _FRAME_SECONDS)
+
+    cuts = [0]
+    while total - cuts[-1] > chunk:
+        nominal = (cuts[-1] + chunk) // frame
+        lo = max(nominal - search, cuts[-1] // frame + 1)
+        hi = min(nominal + search, len(energy))
+        cut_frame = lo + int(np.argmin(energy[lo:hi])) if hi > lo else nominal
+        cuts.append(cut_frame * frame)
+    cuts.append(total)
+
+    overlap = int(overlap_seconds * sample_rate)
+    return [
+        (max(0, start - overlap) if i else 0, end)
+        for i, (start, end) in enumerate(zip(cuts[:-1], cuts[1:]))
+    ]
+
+
+def pcm_to_wav(samples: np.ndarray, sample_rate: int = SAMPLE_RATE) -> bytes:
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(samples.astype(np.int16).tobytes())
+    return buf.getvalue()
+
+
+def trim_silence(
+    samples: np.ndarray,
+    pad_seconds: float = 0.3,
+    sample_rate: int = SAMPLE_RATE,
+) -> np.ndarray:
+    """
+    Energy-based voice activity trim of leading/trailing silence.
+
+    A frame counts as voiced when its RMS is well above the recording's noise
+    floor (10th percentile frame energy). Audio with no voiced frames is returned
+    unchanged rather than emptied.
+    """
+    energy = frame_energy(samples, sample_rate)
+    if len(energy) == 0:
+        return samples
+    noise_floor = float(np.percentile(energy, 10))
+    threshold = max(noise_floor * 3.0, float(energy.max()) * 0.05, 50.0)
+    voiced = np.flatnonzero(energy > threshold)
+    if len(voiced) == 0:
+        return samples
+
+    frame = int(sample_rate * _FRAME_SECONDS)
+    pad = int(pad_seconds * sample_rate)
+    start = max(0, voiced[0] * frame - pad)
+    end = min(len(samples), (voiced[-1] + 1) * frame + pad)
+    return samples[start:end]
+
+
+def _run_opus_encoder(samples: np.ndarray, target: str, bitrate: str, sample_rate: int) -> bytes:
+    proc = subprocess.run(
+        [
+            ffmpeg_binary(), "-hide_banner", "-loglevel", "error", "-y",
+            "-f", "s16le", "-ac", "1", "-ar", str(sample_rate), "-i", "-",
+            "-c:a", "libopus", "-b:a", bitrate, "-application", "voip",
+            "-f", "ogg", target,
+        ],
+        input=samples.astype(np.int16).tobytes(),
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+    if proc.returncode:
+        raise IOError(f"ffmpeg could not encode {Path(target).name}: {proc.stderr.decode('utf-8', 'replace')}")
+    return proc.stdout
+
+
+def encode_opus(
+    samples: np.ndarray,
+    output_path: Path,
+    bitrate: str,
+    sample_rate: int = SAMPLE_RATE,
+) -> Path:
+    """Encode mono PCM to Ogg/Opus (speech-tuned), which Whisper accepts directly."""
+    _run_opus_encoder(samples, str(output_path), bitrate, sample_rate)
+    return output_path
+
+
+def opus_bytes(samples: np.ndarray, bitrate: str, sample_rate: int = SAMPLE_RATE) -> bytes:
+    """Like encode_opus, but returns the Ogg/Opus stream instead of writing a file."""
+    return _run_opus_encoder(samples, "pipe:1", bitrate, sample_rate)
+
+
+def preprocess_for_transcription(input_path: Path, output_path: Path, bitrate: str) -> np.ndarray:
+    """
+    Decode → downmix/resample to 16 kHz mono → VAD trim → Opus at output_path.
+    Returns the trimmed PCM, so chunked transcription can split it without
+    decoding the memo a second time.
+    """
+    samples = decode_pcm(input_path)
+    if len(samples) == 0:
+        raise ValueError(f"No audio samples in {input_path.name}")
+    samples = trim_silence(samples)
+    encode_opus(samples, output_path, bitrate)
+    return samples
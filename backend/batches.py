@@ -0,0 +1,88 @@
+"""
+Batch runs: many voice memos through the full pipeline as one unit.
+
+Each memo becomes a normal pipeline job. Up to settings.batch_max_concurrency
+jobs of a batch run at once; provider calls from all of them go through the
+shared limiters in scheduler.py (in the "batch" lane, behind interactive
+work) and identical work is coalesced by the
+single-flight registries, so a batch keeps every provider busy up to its
+quota without exceeding it. Used by POST /pipeline/batch and bulk_pipeline.py.
+"""
+
+import asyncio
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+from config import settings
+from pipeline import get_job, run_full_pipeline
+from scheduler import set_lane
+from schemas import (
+    BatchItem,
+    BatchItemStatus,
+    BatchJob,
+    BatchStatusResponse,
+    PipelineStage,
+)
+
+# In-memory batch store, like the job store in pipeline.py
+_batches: dict[str, BatchJob] = {}
+
+
+def create_batch(items: list[BatchItem]) -> BatchJob:
+    batch = BatchJob(batch_id=str(uuid.uuid4())[:8], items=items)
+    _batches[batch.batch_id] = batch
+    return batch
+
+
+def get_batch(batch_id: str) -> BatchJob | None:
+    return _batches.get(batch_id)
+
+
+async def run_batch(batch_id: str, uploads: dict[str, tuple[Path, str]]) -> BatchJob:
+    """
+    Run every item of a batch through the full pipeline.
+    `uploads` maps job_id -> (audio path, mime type). A failing item never stops the others.
+    """
+    set_lane("batch")
+    batch = _batches[batch_id]
+    batch.started_at = datetime.utcnow()
+    semaphore = asyncio.Semaphore(max(1, settings.batch_max_concurrency))
+
+    async def _one(item: BatchItem):
+        audio_path, mime_type = uploads[item.job_id]
+        async with semaphore:
+            try:
+                await run_full_pipeline(item.job_id, audio_path, mime_type)
+            except Exception as e:
+                print(f"Batch {batch_id}: {item.filename} failed: {e}")
+
+    await asyncio.gather(*(_one(item) for item in batch.items))
+    batch.finished_at = datetime.utcnow()
+    return batch
+
+
+def batch_status(batch: BatchJob) -> BatchStatusResponse:
+    """Aggregate progress over the batch's jobs."""
+    status = BatchStatusResponse(batch_id=batch.batch_id, total=len(batch.items))
+    for item in batch.items:
+        job = get_job(item.job_id, blobs=False)
+        stage = job.stage if job else PipelineStage.FAILED
+        status.stage_counts[stage.value] = status.stage_counts.get(stage.value, 0) + 1
+        if stage == PipelineStage.COMPLETE:
+            status.completed += 1
+        elif stage == PipelineStage.FAILED:
+            status.failed += 1
+        else:
+            status.in_progress += 1
+        status.items.append(BatchItemStatus(
+            job_id=item.job_id,
+            filename=item.filename,
+            stage=stage,
+            video_url=f"/pipeline/{item.job_id}/video" if stage == PipelineStage.COMPLETE else None,
+            error=job.error if job else "Job not found",
+        ))
+    if batch.started_at:
+        end = batch.finished_at or datetime.utcnow()
+        status.elapsed_seconds = round((end - batch.started_at).total_seconds(), 1)
+    return status
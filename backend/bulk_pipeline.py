@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Run a whole folder of voice memos through the full VidPipe pipeline (in-process, no server).
+
+Memos run concurrently (--workers, default BATCH_MAX_CONCURRENCY) and share the
+process-wide provider limiters and single-flight coalescing, so the run keeps
+every provider at its quota and identical memos / scenes in flight together are
+generated once. Nothing is cached across runs: a memo processed again later is
+rendered again. Prints per-file outcomes and throughput.
+
+Usage:
+  python bulk_pipeline.py <directory> [--workers N] [--report report.json]
+  .venv/bin/python bulk_pipeline.py ./campaign_memos --workers 8
+
+Supported: .wav, .mp3, .m4a, .webm, .ogg
+"""
+import argparse
+import asyncio
+import json
+import shutil
+import sys
+import time
+from pathlib import Path
+
+# Project root on path
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from config import settings
+from batches import batch_status, create_batch, run_batch
+from pipeline import create_job
+from scheduler import provider_stats, set_tenant
+from schemas import BatchItem, PipelineStage
+
+
+EXT_TO_MIME = {
+    ".wav": "audio/wav",
+    ".mp3": "audio/mpeg",
+    ".m4a": "audio/mp4",
+    ".webm": "audio/webm",
+    ".ogg": "audio/ogg",
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-process a directory of voice memos.")
+    parser.add_argument("directory", type=Path)
+    parser.add_argument("--workers", type=int, default=settings.batch_max_concurrency)
+    parser.add_argument("--report", type=Path, help="write per-file outcomes as JSON")
+    args = parser.parse_args()
+
+    directory = args.directory.resolve()
+    if not directory.is_dir():
+        print(f"Not a directory: {directory}")
+        sys.exit(1)
+    files = sorted(p for p in directory.iterdir() if p.suffix.lower() in EXT_TO_MIME)
+    if not files:
+        print(f"No audio files in {directory}")
+        sys.exit(1)
+
+    settings.batch_max_concurrency = max(1, args.workers)
+    set_tenant("bulk-cli")
+    uploads: dict[str, tuple[Path, str]] = {}
+    items: list[BatchItem] = []
+    settings.upload_dir.mkdir(parents=True, exist_ok=True)
+    for path in files:
+        job = create_job()
+        # Copy into the upload dir like the API does; preprocessing writes next to it
+        audio_path = settings.upload_dir / f"{job.job_id}_{path.name}"
+        shutil.copyfile(path, audio_path)
+        uploads[job.job_id] = (audio_path, EXT_TO_MIME[path.suffix.lower()])
+        items.append(BatchItem(job_id=job.job_id, filename=path.name))
+    batch = create_batch(items)
+
+    print(f"Batch {batch.batch_id}: {len(files)} memos from {directory}, {args.workers} workers")
+    print("-" * 60)
+    started = time.perf_counter()
+    asyncio.run(run_batch(batch.batch_id, uploads))
+    elapsed = time.perf_counter() - started
+
+    status = batch_status(batch)
+    for item in status.items:
+        mark = "✅" if item.stage == PipelineStage.COMPLETE else "❌"
+        detail = item.error or ""
+        print(f"{mark} {item.filename:<40} {item.job_id}  {item.stage.value:<16} {detail[:80]}")
+    print("-" * 60)
+    print(
+        f"{status.completed}/{status.total} complete, {status.failed} failed in {elapsed:.1f}s "
+        f"({status.total / elapsed * 60:.1f} memos/min)"
+    )
+    for resource, stats in provider_stats().items():
+        if stats["calls"]:
+            waits = stats["lanes"]["batch"]
+            print(
+                f"  {resource:<12} {stats['calls']:>4} calls, queue wait "
+                f"avg {waits['avg_wait_ms']} ms / p95 {waits['p95_wait_ms']} ms"
+            )
+
+    if args.report:
+        report = status.model_dump(mode="json")
+        report["throughput_per_minute"] = round(status.total / elapsed * 60, 2)
+        report["providers"] = provider_stats()
+        args.report.write_text(json.dumps(report, indent=2))
+        print(f"Report written to {args.report}")
+
+    sys.exit(0 if status.failed == 0 else 1)
+
+
+if __name__ == "__main__":
+    main()
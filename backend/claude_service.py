@@ -5,12 +5,15 @@ Uses Anthropic Messages API; no audio input (transcription is done via Whisper).
 
 import json
 import asyncio
-from typing import Optional
-
-from anthropic import AsyncAnthropic
+from typing import TYPE_CHECKING, Optional
 
 from config import settings
 from schemas import MarketingScript
+from scheduler import provider_slot
+from singleflight import SingleFlight, content_key
+
+if TYPE_CHECKING:
+    from anthropic import AsyncAnthropic
 
 SCRIPT_SYSTEM_PROMPT = """You are an expert marketing video scriptwriter.
 Given a voice memo transcription and marketing brief, create a compelling
@@ -44,32 +47,46 @@ Rules:
 - End with a strong CTA scene
 """
 
-_client: Optional[AsyncAnthropic] = None
+_client: Optional["AsyncAnthropic"] = None
+_flights = SingleFlight("script")
 
 
-def get_client() -> AsyncAnthropic:
+def get_client() -> "AsyncAnthropic":
     global _client
     if _client is None:
         if not settings.anthropic_api_key:
             raise ValueError("ANTHROPIC_API_KEY is not set")
+        from anthropic import AsyncAnthropic  # imported on first use to keep startup fast
+
         _client = AsyncAnthropic(api_key=settings.anthropic_api_key)
     return _client
 
 
 async def generate_script(transcript: str) -> MarketingScript:
-    """Generate a structured marketing script from the transcription using Claude."""
+    """
+    Generate a structured marketing script from the transcription using Claude.
+    Concurrent requests for the same transcript share one Claude call.
+    """
+    get_client()
+    key = content_key(settings.claude_model, SCRIPT_SYSTEM_PROMPT, transcript)
+    script = await _flights.do(key, lambda: _generate_script(transcript))
+    return script.model_copy(deep=True)
+
+
+async def _generate_script(transcript: str) -> MarketingScript:
     client = get_client()
-    response = await client.messages.create(
-        model=settings.claude_model,
-        max_tokens=4096,
-        system=SCRIPT_SYSTEM_PROMPT,
-        messages=[
-            {
-                "role": "user",
-                "content": f"Here is the voice memo transcription and brief:\n\n{transcript}",
-            }
-        ],
-    )
+    async with provider_slot("anthropic"):
+        response = await client.messages.create(
+            model=settings.claude_model,
+            max_tokens=4096,
+            system=SCRIPT_SYSTEM_PROMPT,
+            messages=[
+                {
+                    "role": "user",
+                    "content": f"Here is the voice memo transcription and brief:\n\n{transcript}",
+                }
+            ],
+        )
     raw = response.content[0].text.strip()
     # Strip markdown code block if present
     if raw.startswith("```"):
@@ -78,3 +95,52 @@ async def generate_script(transcript: str) -> MarketingScript:
             raw = raw[:-3].strip()
     data = json.loads(raw)
     return MarketingScript(**data)
+
+
+TRANSLATE_SYSTEM_PROMPT = """You translate voiceover narration for marketing videos.
+You receive a JSON array of narration lines, one per scene, and a target language.
+Translate each line, keeping its tone and roughly its spoken length.
+
+Return ONLY a JSON array of strings with exactly as many items as the input
+(no markdown, no extra text).
+"""
+
+
+async def translate_narration(script: MarketingScript, language: str) -> MarketingScript:
+    """
+    Copy of the script with every scene's narration translated to `language`.
+    Visuals and timing are unchanged, so the rendered video can be reused.
+    """
+    get_client()
+    lines = [scene.narration for scene in script.scenes]
+    key = content_key(settings.claude_model, TRANSLATE_SYSTEM_PROMPT, language, json.dumps(lines))
+    translated = await _flights.do(key, lambda: _translate_lines(lines, language))
+    if len(translated) != len(lines):
+        raise ValueError(f"Translation returned {len(translated)} lines for {len(lines)} scenes")
+
+    result = script.model_copy(deep=True)
+    for scene, text in zip(result.scenes, translated):
+        scene.narration = text
+    return result
+
+
+async def _translate_lines(lines: list[str], language: str) -> list[str]:
+    client = get_client()
+    async with provider_slot("anthropic"):
+        response = await client.messages.create(
+            model=settings.claude_model,
+            max_tokens=4096,
+            system=TRANSLATE_SYSTEM_PROMPT,
+            messages=[
+                {
+                    "role": "user",
+                    "content": f"Target language: {language}\n\n{json.dumps(lines, ensure_ascii=False)}",
+                }
+            ],
+        )
+    raw = response.content[0].text.strip()
+    if raw.startswith("```"):
+        raw = raw.split("\n", 1)[1] if "\n" in raw else raw[3:]
+        if raw.endswith("```"):
+            raw = raw[:-3].strip()
+    return [str(line) for line in json.loads(raw)]
@@ -9,6 +9,12 @@ class Settings(BaseSettings):
 
     # OpenAI Whisper (transcription; Claude does not support audio input)
     openai_api_key: str = ""
+    transcribe_chunk_threshold_seconds: float = 180  # longer memos are chunked
+    transcribe_chunk_seconds: float = 60
+    transcribe_chunk_overlap_seconds: float = 1.5
+    transcribe_max_concurrency: int = 4
+    audio_preprocess: bool = True  # VAD trim + 16 kHz mono Opus before Whisper
+    audio_preprocess_bitrate: str = "24k"
 
     # ElevenLabs (voice / TTS)
     elevenlabs_api_key: str = ""
@@ -17,6 +23,14 @@ class Settings(BaseSettings):
     # Replicate (scene images for video)
     replicate_api_token: str = ""
     replicate_flux_model: str = "black-forest-labs/flux-schnell"
+    replicate_aspect_ratio: str = "16:9"
+    # Async predictions over HTTP instead of replicate.run() in a thread per render.
+    # With public_base_url and replicate_webhook_secret set, completion arrives via
+    # POST /webhooks/replicate (signed; unsigned calls are rejected). Otherwise polled.
+    replicate_async: bool = False
+    replicate_webhook_secret: str = ""
+    replicate_webhook_wait_seconds: float = 90
+    replicate_prediction_timeout: float = 300
 
     # White Circle AI
     whitecircle_api_key: str = ""
@@ -24,14 +38,80 @@ class Settings(BaseSettings):
     whitecircle_deployment_id: str = ""
 
     # App
+    public_base_url: str = ""  # externally reachable URL of this API (for webhooks)
+    http_max_connections: int = 100
+    api_only: bool = False  # serve API routes only; never load the render stack
     upload_dir: Path = Path("./uploads")
+    upload_max_bytes: int = 500 * 1024 * 1024  # resumable uploads (see resumable_upload.py)
     output_dir: Path = Path("./outputs")
+    # Content-addressed artifact store shared by nodes (see artifact_store.py): local | s3
+    artifact_backend: str = "local"
+    artifact_dir: Path = Path("./artifacts")
+    artifact_s3_bucket: str = ""
+    artifact_s3_prefix: str = ""
+    artifact_s3_endpoint_url: str = ""  # e.g. http://localhost:9000 for MinIO
+    artifact_s3_region: str = ""
     max_video_scenes: int = 8
+    # Default job deadline (0 = none); see degradation.py
+    default_deadline_seconds: float = 0
     video_duration_seconds: int = 8
+    # Opt-in: render the first K scene images while pre-compliance / review runs
+    speculative_scenes: int = 0
+    video_width: int = 1280
+    video_height: int = 720
+    video_fps: int = 24
+    video_preset: str = "medium"
+    video_crf: int = 23
+    # "ffmpeg": native filter graph with camera motion + transitions (ffmpeg_render.py);
+    # "moviepy": static slideshow composited frame by frame in Python
+    stitch_engine: str = "ffmpeg"
+    transition_seconds: float = 0.5
+    # Extra aspect ratios rendered alongside the final video in the same pass, e.g.
+    # "9:16,1:1" (each one adds an encode per job); empty = the final video only
+    output_aspect_ratios: str = ""
+
+    # Draft preview published before the final encode (see video_stitcher.draft_profile)
+    draft_preview: bool = True
+    draft_height: int = 360
+    draft_fps: int = 12
+    background_encode_niceness: int = 10
+    # Minimum seconds between encode progress reports (served by /status, not stored on the job)
+    encode_progress_interval_seconds: float = 1.0
+    background_encode_workers: int = 2
+
+    # Scene image normalization (see image_processing.py)
+    image_format: str = "webp"  # webp | jpeg
+    image_quality: int = 85
+    image_workers: int = 4
+
+    # Process-wide provider concurrency caps (see scheduler.py)
+    openai_max_concurrency: int = 8
+    anthropic_max_concurrency: int = 8
+    replicate_max_concurrency: int = 6
+    elevenlabs_max_concurrency: int = 4
+    whitecircle_max_concurrency: int = 8
+    stitch_max_concurrency: int = 2  # concurrent stitch encodes
+    # Weighted fair queuing between lanes; slots per limiter kept for interactive work
+    scheduler_interactive_weight: float = 8
+    scheduler_batch_weight: float = 1
+    scheduler_interactive_reserved: int = 1
+    # Jobs of one batch (POST /pipeline/batch, bulk_pipeline.py) running at once
+    batch_max_concurrency: int = 4
+
+    # Disk retention (see retention.py); 0 disables the interval / budget
+    gc_interval_seconds: int = 900
+    upload_ttl_hours: float = 24
+    intermediate_ttl_hours: float = 72
+    final_ttl_hours: float = 24 * 30
+    disk_budget_mb: int = 20_000
+
+    # Event-loop lag monitor (see loop_monitor.py); 0 disables. loop_debug adds a
+    # watchdog thread that captures the stack of callbacks blocking past the threshold
+    loop_monitor_interval_seconds: float = 0.25
+    loop_block_threshold_seconds: float = 0.1
+    loop_debug: bool = False
 
     model_config = {"env_file": ".env", "env_file_encoding": "utf-8"}
 
 
 settings = Settings()
-settings.upload_dir.mkdir(parents=True, exist_ok=True)
-settings.output_dir.mkdir(parents=True, exist_ok=True)
@@ -0,0 +1,185 @@
+"""
+Deadline-aware graceful degradation.
+
+A job may carry a deadline. When media generation starts, the remaining work
+(images to render, narration segments, encodes) is estimated from observed
+stage timings and the current provider / stitch queues. If it won't fit
+before the deadline, steps of a quality ladder are applied, cheapest loss
+first, until it does:
+
+  skip_draft          no low-res draft preview
+  skip_extra_aspects  only the primary aspect ratio, no 9:16 / 1:1
+  fast_preset         x264 "veryfast" instead of the configured preset
+  cached_images       keep a scene's previous image instead of re-rendering it
+  fewer_scenes        render ~60% of the script's scenes (CTA scene kept)
+  lower_resolution    480p instead of the configured height
+
+Applied steps are recorded on the job (PipelineJob.degradations).
+"""
+
+import math
+from dataclasses import dataclass, field, replace
+from datetime import datetime
+from pathlib import Path
+
+from config import settings
+from schemas import MarketingScript, PipelineJob, RenderProfile, SceneRender
+
+LADDER = (
+    "skip_draft",
+    "skip_extra_aspects",
+    "fast_preset",
+    "cached_images",
+    "fewer_scenes",
+    "lower_resolution",
+)
+
+_FAST_PRESET = "veryfast"
+_LOW_HEIGHT = 480
+# Aim to finish with some slack: the estimate is rough
+_SAFETY = 0.85
+
+# Relative x264 encode cost per preset (medium = 1)
+_PRESET_COST = {
+    "ultrafast": 0.2, "superfast": 0.3, "veryfast": 0.45, "faster": 0.65,
+    "fast": 0.8, "medium": 1.0, "slow": 1.6, "slower": 2.5, "veryslow": 4.0,
+}
+
+# Seconds per unit, refined at runtime by observe():
+#   image: one FLUX render, tts: one narration segment,
+#   encode: one second of 720p video at preset "medium" (one output)
+_costs = {"image": 8.0, "tts": 3.0, "encode": 0.6}
+_EWMA_ALPHA = 0.3
+
+
+def observe(kind: str, seconds: float, units: float = 1):
+    """Feed a measured stage duration back into the cost model."""
+    if units <= 0 or seconds <= 0:
+        return
+    _costs[kind] = (1 - _EWMA_ALPHA) * _costs[kind] + _EWMA_ALPHA * (seconds / units)
+
+
+def encode_units(profile: RenderProfile, video_seconds: float) -> float:
+    """Encode work of one output in `encode` cost units (720p / medium seconds)."""
+    pixels = (profile.width * profile.height) / (1280 * 720)
+    return video_seconds * pixels * _PRESET_COST.get(profile.preset, 1.0)
+
+
+@dataclass
+class DegradationPlan:
+    steps: list[str] = field(default_factory=list)
+    max_scenes: int = 0  # 0 = all scenes; only set by the fewer_scenes step
+    preset: str = ""
+    height: int = 0
+
+    def has(self, step: str) -> bool:
+        return any(s.split(":", 1)[0] == step for s in self.steps)
+
+    def profile(self, profile: RenderProfile) -> RenderProfile:
+        """Apply the preset / resolution steps to an output profile."""
+        update: dict = {}
+        if self.preset:
+            update["preset"] = self.preset
+        short = min(profile.width, profile.height)
+        if self.height and short > self.height:
+            scale = self.height / short
+            update["width"] = round(profile.width * scale / 2) * 2
+            update["height"] = round(profile.height * scale / 2) * 2
+        return profile.model_copy(update=update) if update else profile
+
+
+def trim_scenes(script: MarketingScript, max_scenes: int) -> MarketingScript:
+    """Keep the first max_scenes - 1 scenes plus the last (call-to-action) scene."""
+    if max_scenes <= 0 or len(script.scenes) <= max_scenes:
+        return script
+    kept = script.scenes[: max_scenes - 1] + [script.scenes[-1]]
+    return script.model_copy(update={
+        "scenes": kept,
+        "total_duration_seconds": sum(s.duration_seconds for s in kept),
+    })
+
+
+def _queue_factor(resource: str) -> float:
+    from scheduler import get_limiter
+
+    limiter = get_limiter(resource)
+    return 1.0 + limiter.waiting / limiter.limit
+
+
+def _estimate(
+    plan: DegradationPlan,
+    script: MarketingScript,
+    renders: list[SceneRender],
+    stale_images_with_fallback: set[int],
+    profiles: list[RenderProfile],
+    draft: RenderProfile,
+) -> float:
+    scenes = trim_scenes(script, plan.max_scenes).scenes
+    numbers = {s.scene_number for s in scenes}
+    images = tts = 0
+    for i, render in enumerate(renders):
+        if render.scene_number not in numbers:
+            continue
+        if not render.image_path and not (plan.has("cached_images") and i in stale_images_with_fallback):
+            images += 1
+        if render.audio_fingerprint and not render.audio_path:
+            tts += 1
+    video_seconds = sum(s.duration_seconds for s in scenes)
+
+    outputs = profiles[:1] if plan.has("skip_extra_aspects") else profiles
+    encode = sum(encode_units(plan.profile(p), video_seconds) for p in outputs)
+    if settings.draft_preview and not plan.has("skip_draft"):
+        encode += encode_units(draft, video_seconds)
+
+    return (
+        images * _costs["image"] * _queue_factor("replicate")
+        + tts * _costs["tts"] * _queue_factor("elevenlabs")
+        + encode * _costs["encode"] * _queue_factor("stitch")
+    )
+
+
+def plan_for_deadline(
+    job: PipelineJob,
+    script: MarketingScript,
+    renders: list[SceneRender],
+    previous: list[SceneRender],
+    profiles: list[RenderProfile],
+    draft: RenderProfile,
+    now: datetime | None = None,
+) -> DegradationPlan:
+    """
+    Cheapest set of ladder steps that brings the estimated remaining work within
+    the job's deadline (no steps without a deadline; all steps if it has passed).
+    """
+    plan = DegradationPlan()
+    if not job.deadline:
+        return plan
+
+    remaining = (job.deadline - (now or datetime.utcnow())).total_seconds() * _SAFETY
+    previous_images = {
+        r.scene_number for r in previous if r.image_path and Path(r.image_path).exists()
+    }
+    fallback = {i for i, r in enumerate(renders) if r.scene_number in previous_images}
+
+    estimate = _estimate(plan, script, renders, fallback, profiles, draft)
+    for step in LADDER:
+        if estimate <= remaining:
+            break
+        candidate = replace(plan, steps=list(plan.steps))
+        if step == "fast_preset":
+            candidate.preset = _FAST_PRESET
+            step = f"fast_preset:{_FAST_PRESET}"
+        elif step == "fewer_scenes":
+            current = len(script.scenes)
+            candidate.max_scenes = max(2, math.ceil(current * 0.6))
+            step = f"fewer_scenes:{current}->{candidate.max_scenes}"
+        elif step == "lower_resolution":
+            candidate.height = _LOW_HEIGHT
+            step = f"lower_resolution:{_LOW_HEIGHT}p"
+        candidate.steps.append(step)
+
+        # Only record steps that actually save time for this job
+        saved = _estimate(candidate, script, renders, fallback, profiles, draft)
+        if saved < estimate:
+            plan, estimate = candidate, saved
+    return plan
@@ -3,45 +3,152 @@ ElevenLabs service: text-to-speech for video narration.
 """
 
 import asyncio
+import hashlib
+import time
 from pathlib import Path
-from typing import Optional
-
-import httpx
+from functools import partial
+from typing import Awaitable, Callable, Optional
 
 from config import settings
-from schemas import MarketingScript
+from schemas import SceneScript, SynthesizedAudio
+from scheduler import provider_slot
+from singleflight import SingleFlight, fan_out_file
 
 ELEVENLABS_TTS_URL = "https://api.elevenlabs.io/v1/text-to-speech/{voice_id}"
+ELEVENLABS_TTS_STREAM_URL = ELEVENLABS_TTS_URL + "/stream"
+ELEVENLABS_MODEL_ID = "eleven_multilingual_v2"
 
+_flights = SingleFlight("tts")
 
-async def generate_script_audio(script: MarketingScript, output_path: Path) -> Path:
-    """
-    Generate a single audio file with full narration for the script using ElevenLabs.
-    Concatenates all scene narrations into one request (or multiple in sequence).
-    """
+
+def _check_config():
     if not settings.elevenlabs_api_key or not settings.elevenlabs_voice_id:
         raise ValueError("ELEVENLABS_API_KEY and ELEVENLABS_VOICE_ID must be set")
 
-    full_text = " ".join(s.narration.strip() for s in script.scenes if s.narration)
-    if not full_text:
-        raise ValueError("Script has no narration text")
+
+# Receives narration mp3 bytes as they arrive from ElevenLabs
+ChunkConsumer = Callable[[bytes], Awaitable[None]]
+# Same, per scene: (scene_number, chunk); an empty chunk ends that scene's segment
+SceneChunkConsumer = Callable[[int, bytes], Awaitable[None]]
+
+
+async def _synthesize(
+    text: str,
+    output_path: Path,
+    voice_id: Optional[str] = None,
+    on_chunk: Optional[ChunkConsumer] = None,
+) -> SynthesizedAudio:
+    """
+    Run one streaming TTS request, writing the mp3 to output_path chunk by
+    chunk as it arrives (nothing is buffered whole, no blocking writes on the
+    event loop). Each chunk is also handed to `on_chunk` once written, so a
+    consumer can start on the first narration bytes before synthesis finishes.
+    `voice_id` overrides settings.elevenlabs_voice_id.
+    """
+    import aiofiles
+
+    from http_client import get_http_client
 
     output_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = output_path.with_suffix(output_path.suffix + ".part")
+    started = time.perf_counter()
+    ttfb_ms: Optional[float] = None
+    total_bytes = 0
 
-    async with httpx.AsyncClient(timeout=120.0) as client:
-        resp = await client.post(
-            ELEVENLABS_TTS_URL.format(voice_id=settings.elevenlabs_voice_id),
+    try:
+        async with provider_slot("elevenlabs"), get_http_client().stream(
+            "POST",
+            ELEVENLABS_TTS_STREAM_URL.format(voice_id=voice_id or settings.elevenlabs_voice_id),
             headers={
                 "xi-api-key": settings.elevenlabs_api_key,
                 "Content-Type": "application/json",
                 "Accept": "audio/mpeg",
             },
             json={
-                "text": full_text,
-                "model_id": "eleven_multilingual_v2",
+                "text": text,
+                "model_id": ELEVENLABS_MODEL_ID,
             },
-        )
-        resp.raise_for_status()
-        output_path.write_bytes(resp.content)
+        ) as resp:
+            resp.raise_for_status()
+            async with aiofiles.open(tmp_path, "wb") as f:
+                async for chunk in resp.aiter_bytes():
+                    if ttfb_ms is None:
+                        ttfb_ms = (time.perf_counter() - started) * 1000
+                    total_bytes += len(chunk)
+                    await f.write(chunk)
+                    if on_chunk:
+                        await on_chunk(chunk)
+
+        # Rename only once complete so a partial file is never mistaken for a segment
+        await asyncio.to_thread(tmp_path.replace, output_path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    return SynthesizedAudio(
+        path=str(output_path),
+        ttfb_ms=ttfb_ms or 0.0,
+        total_bytes=total_bytes,
+        duration_ms=(time.perf_counter() - started) * 1000,
+    )
+
+
+def scene_audio_fingerprint(scene: SceneScript, voice_id: Optional[str] = None) -> str:
+    """Hash of the narration inputs (voice + model + text). Empty for silent scenes."""
+    text = scene.narration.strip()
+    if not text:
+        return ""
+    key = f"{voice_id or settings.elevenlabs_voice_id}\n{ELEVENLABS_MODEL_ID}\n{text}"
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+def segment_path(output_dir: Path, scene_number: int) -> Path:
+    """Where generate_scene_audio writes a scene's narration segment."""
+    return output_dir / f"scene_{scene_number:02d}.mp3"
+
+
+async def generate_scene_audio(
+    scene: SceneScript,
+    output_dir: Path,
+    voice_id: Optional[str] = None,
+    on_chunk: Optional[ChunkConsumer] = None,
+) -> SynthesizedAudio:
+    """
+    Generate the narration segment for a single scene (identical concurrent
+    requests run once; only the request that ran receives `on_chunk` calls).
+    """
+    _check_config()
+
+    text = scene.narration.strip()
+    if not text:
+        raise ValueError(f"Scene {scene.scene_number} has no narration text")
+
+    output_path = segment_path(output_dir, scene.scene_number)
+    key = scene_audio_fingerprint(scene, voice_id)
+    result = await _flights.do(key, lambda: _synthesize(text, output_path, voice_id, on_chunk))
+    await fan_out_file(Path(result.path), output_path)
+    return result.model_copy(update={"path": str(output_path)})
+
+
+async def generate_all_scene_audio(
+    scenes: list[SceneScript],
+    output_dir: Path,
+    voice_id: Optional[str] = None,
+    on_chunk: Optional[SceneChunkConsumer] = None,
+) -> list[SynthesizedAudio]:
+    """
+    Generate narration segments for the given scenes concurrently; the
+    "elevenlabs" provider slot caps how many requests are in flight at once.
+    `on_chunk` gets each scene's bytes as they arrive, then an empty chunk
+    once that scene's segment file is in place (or its synthesis failed).
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    async def one(scene: SceneScript) -> SynthesizedAudio:
+        consumer = partial(on_chunk, scene.scene_number) if on_chunk else None
+        try:
+            return await generate_scene_audio(scene, output_dir, voice_id, consumer)
+        finally:
+            if on_chunk:
+                await on_chunk(scene.scene_number, b"")
 
-    return output_path
+    return list(await asyncio.gather(*(one(scene) for scene in scenes)))
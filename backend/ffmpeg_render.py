@@ -0,0 +1,215 @@
+"""
+Native slideshow renderer: scene images + narration -> mp4 in a single ffmpeg
+filter graph.
+
+Camera motion (Ken Burns zoom / pan via zoompan) and scene transitions
+(cut / fade / dissolve via concat and xfade) come from each scene's
+camera_direction and transition fields and are computed inside ffmpeg, so
+per-frame work never goes through Python. Each image is decoded and scaled
+once; zoompan emits the scene's frames from that single frame.
+
+Transition semantics: a scene's `transition` is how it hands over to the
+next scene. On the last scene, "fade" fades the video out to black.
+
+Several output profiles (e.g. 16:9, 9:16, 1:1) can come out of one ffmpeg
+run: each image is decoded once and split per profile, crops follow the
+image's smart-crop focus, and the narration is encoded to AAC once and
+stream-copied into every output.
+"""
+
+import math
+from pathlib import Path
+from typing import Optional
+
+from config import settings
+from schemas import MarketingScript, RenderProfile, SceneScript
+
+# Peak zoom for Ken Burns moves (1.0 = no zoom); pans need headroom too
+_ZOOM = 1.15
+# Supersampling before zoompan, which crops on integer pixels and jitters at 1x
+_SUPERSAMPLE = 2
+
+# Claude's free-text transition -> xfade transition name (None = hard cut)
+_XFADE = {
+    "dissolve": "fade",       # crossfade
+    "crossfade": "fade",
+    "fade": "fadeblack",      # dip through black
+}
+
+
+def camera_motion(camera_direction: str) -> str:
+    """Map free-text camera direction to a motion: zoom_in/zoom_out/pan_*/static."""
+    text = (camera_direction or "").lower()
+    if any(k in text for k in ("zoom out", "pull back", "pull out", "dolly out")):
+        return "zoom_out"
+    if any(k in text for k in ("zoom in", "push in", "dolly in", "zoom")):
+        return "zoom_in"
+    if "left" in text:
+        return "pan_left"
+    if "right" in text:
+        return "pan_right"
+    if any(k in text for k in ("tilt up", "pan up", "crane up")):
+        return "pan_up"
+    if any(k in text for k in ("tilt down", "pan down", "crane down")):
+        return "pan_down"
+    return "static"
+
+
+def transition_kind(transition: str) -> str | None:
+    """xfade transition name for a scene's transition field, or None for a cut."""
+    text = (transition or "").lower()
+    for keyword, xfade in _XFADE.items():
+        if keyword in text:
+            return xfade
+    return None
+
+
+def _zoompan(motion: str, frames: int, profile: RenderProfile) -> str:
+    p = f"on/{max(frames - 1, 1)}"  # progress 0 → 1 across the scene
+    center_x = "iw/2-(iw/zoom/2)"
+    center_y = "ih/2-(ih/zoom/2)"
+    span = _ZOOM - 1
+    z, x, y = "1", center_x, center_y
+    if motion == "zoom_in":
+        z = f"1+{span}*{p}"
+    elif motion == "zoom_out":
+        z = f"{_ZOOM}-{span}*{p}"
+    elif motion in ("pan_left", "pan_right", "pan_up", "pan_down"):
+        z = str(_ZOOM)
+        if motion == "pan_left":
+            x = f"(iw-iw/zoom)*(1-{p})"
+        elif motion == "pan_right":
+            x = f"(iw-iw/zoom)*{p}"
+        elif motion == "pan_up":
+            y = f"(ih-ih/zoom)*(1-{p})"
+        else:
+            y = f"(ih-ih/zoom)*{p}"
+    return (
+        f"zoompan=z='{z}':x='{x}':y='{y}':d={frames}"
+        f":s={profile.width}x{profile.height}:fps={profile.fps}"
+    )
+
+
+def _transition_seconds(scenes: list[SceneScript], durations: list[float], i: int) -> float:
+    """Overlap between scene i and i+1 (0 for cuts), at most a third of either scene."""
+    if i >= len(durations) - 1 or i >= len(scenes) or transition_kind(scenes[i].transition) is None:
+        return 0.0
+    return min(settings.transition_seconds, durations[i] / 3, durations[i + 1] / 3)
+
+
+def build_filter_graph(
+    scenes: list[SceneScript],
+    durations: list[float],
+    profile: RenderProfile,
+    source_label: str = "{i}:v",
+    out_label: str = "vout",
+    focus: Optional[list[tuple[float, float]]] = None,
+) -> str:
+    """
+    filter_complex for one output: per-scene scale/crop + zoompan, then a chain
+    of concat (cuts) / xfade (fade, dissolve) joins. Scene i reads from input
+    `source_label.format(i=i)`; the result is labelled `out_label`. `focus`
+    gives each image's crop centre as (x, y) fractions (default: centre).
+    """
+    n = len(durations)
+    tag = out_label
+    overlaps = [_transition_seconds(scenes, durations, i) for i in range(n)]
+    sw, sh = profile.width * _SUPERSAMPLE, profile.height * _SUPERSAMPLE
+    parts: list[str] = []
+
+    for i in range(n):
+        # Each clip runs into the next one's start by the transition overlap
+        frames = max(1, math.ceil((durations[i] + overlaps[i]) * profile.fps))
+        motion = camera_motion(scenes[i].camera_direction) if i < len(scenes) else "static"
+        fx, fy = focus[i] if focus else (0.5, 0.5)
+        parts.append(
+            f"[{source_label.format(i=i)}]"
+            f"scale={sw}:{sh}:force_original_aspect_ratio=increase,"
+            f"crop={sw}:{sh}:x='clip({fx:.4f}*iw-ow/2,0,iw-ow)':y='clip({fy:.4f}*ih-oh/2,0,ih-oh)',"
+            f"setsar=1,"
+            f"{_zoompan(motion, frames, profile)},"
+            f"fps={profile.fps},format=yuv420p[{tag}s{i}]"
+        )
+
+    current = f"{tag}s0"
+    start = 0.0
+    for i in range(1, n):
+        start += durations[i - 1]
+        joined = f"{tag}j{i}"
+        if overlaps[i - 1] > 0:
+            kind = transition_kind(scenes[i - 1].transition)
+            parts.append(
+                f"[{current}][{tag}s{i}]xfade=transition={kind}"
+                f":duration={overlaps[i - 1]:.3f}:offset={start:.3f}[{joined}]"
+            )
+        else:
+            parts.append(f"[{current}][{tag}s{i}]concat=n=2:v=1:a=0[{joined}]")
+        current = joined
+
+    total = sum(durations)
+    last_fade = min(settings.transition_seconds, durations[-1] / 3)
+    last_transition = scenes[n - 1].transition if n <= len(scenes) else ""
+    if transition_kind(last_transition) == "fadeblack":
+        parts.append(f"[{current}]fade=t=out:st={total - last_fade:.3f}:d={last_fade:.3f}[{out_label}]")
+    else:
+        parts.append(f"[{current}]null[{out_label}]")
+    return ";".join(parts)
+
+
+def build_command(
+    ffmpeg: str,
+    image_paths: list[Path],
+    script: MarketingScript,
+    durations: list[float],
+    audio_path: Path,
+    outputs: list[tuple[RenderProfile, Path]],
+    focus: Optional[list[tuple[float, float]]] = None,
+    copy_audio: bool = False,
+) -> list[str]:
+    """
+    One ffmpeg run writing every (profile, path) in `outputs`. With
+    `copy_audio`, audio_path must already be AAC and is stream-copied.
+    """
+    cmd = [ffmpeg, "-y", "-hide_banner", "-loglevel", "error"]
+    for path in image_paths:
+        cmd += ["-i", str(path)]  # single frame each; zoompan generates the scene's frames
+    cmd += ["-i", str(audio_path)]
+
+    graphs: list[str] = []
+    if len(outputs) > 1:
+        # Decode each image once and fan it out to every profile
+        branches = len(outputs)
+        for i in range(len(image_paths)):
+            labels = "".join(f"[in{i}_{k}]" for k in range(branches))
+            graphs.append(f"[{i}:v]split={branches}{labels}")
+    for k, (profile, _) in enumerate(outputs):
+        source = f"in{{i}}_{k}" if len(outputs) > 1 else "{i}:v"
+        graphs.append(build_filter_graph(script.scenes, durations, profile, source, f"v{k}", focus))
+    cmd += ["-filter_complex", ";".join(graphs)]
+
+    audio_codec = ["-c:a", "copy"] if copy_audio else ["-c:a", "aac", "-b:a", "192k"]
+    for k, (profile, output_path) in enumerate(outputs):
+        cmd += [
+            "-map", f"[v{k}]", "-map", f"{len(image_paths)}:a",
+            "-c:v", "libx264", "-preset", profile.preset, "-crf", str(profile.crf),
+            "-pix_fmt", "yuv420p", "-r", str(profile.fps),
+            *audio_codec,
+            "-t", f"{sum(durations):.3f}",
+            "-movflags", "+faststart",
+            str(output_path),
+        ]
+    return cmd
+
+
+def encode_audio_command(
+    ffmpeg: str, audio_path: Path, output_path: Path, duration: Optional[float] = None
+) -> list[str]:
+    """
+    Encode narration to AAC once so multi-profile renders can stream-copy it.
+    With a duration the track is padded with silence / cut to exactly that length.
+    """
+    fit = ["-af", "apad", "-t", f"{duration:.3f}"] if duration is not None else []
+    return [
+        ffmpeg, "-y", "-hide_banner", "-loglevel", "error",
+        "-i", str(audio_path), "-vn", *fit, "-c:a", "aac", "-b:a", "192k", str(output_path),
+    ]
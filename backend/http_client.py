@@ -0,0 +1,38 @@
+"""
+Shared, pooled HTTP client for provider calls.
+
+One AsyncClient per process keeps TCP/TLS connections alive across jobs
+instead of paying a handshake per request. httpx is imported on first use.
+"""
+
+from typing import TYPE_CHECKING, Optional
+
+from config import settings
+
+if TYPE_CHECKING:
+    import httpx
+
+_client: Optional["httpx.AsyncClient"] = None
+
+
+def get_http_client() -> "httpx.AsyncClient":
+    global _client
+    if _client is None:
+        import httpx
+
+        _client = httpx.AsyncClient(
+            timeout=httpx.Timeout(120.0, connect=10.0),
+            limits=httpx.Limits(
+                max_connections=settings.http_max_connections,
+                max_keepalive_connections=settings.http_max_connections,
+            ),
+            follow_redirects=True,
+        )
+    return _client
+
+
+async def close_http_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
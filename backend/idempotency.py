@@ -0,0 +1,87 @@
+"""
+Idempotency-Key support for the pipeline-mutating endpoints
+(/pipeline/full, /pipeline/{id}/script, /pipeline/{id}/generate).
+
+Keys are scoped to the tenant and recorded on the job they created or acted
+on (PipelineJob.idempotency), together with the response that was sent. A
+retry with the same key gets that response back instead of scheduling the
+work again, and a retry of a /script call that is still running attaches to
+it. Reusing a key for a different request is rejected (422).
+"""
+
+from typing import Awaitable, Callable, Optional, TypeVar
+
+from pydantic import BaseModel
+
+from pipeline import get_job
+from scheduler import current_tenant
+from schemas import IdempotencyRecord, PipelineJob
+from singleflight import SingleFlight, content_key
+
+T = TypeVar("T")
+
+# Scoped key -> job_id, for /pipeline/full where the URL carries no job id
+_index: dict[str, str] = {}
+_flights = SingleFlight("idempotent requests")
+
+
+class IdempotencyKeyReused(Exception):
+    """The key was already used for a different request."""
+
+    def __init__(self, key: str, operation: str):
+        super().__init__(f"Idempotency-Key {key!r} was already used for a different {operation} request")
+
+
+def _scoped(key: str) -> str:
+    return f"{current_tenant()}:{key}"
+
+
+def request_fingerprint(operation: str, *parts: str | bytes) -> str:
+    return content_key(operation, *parts)
+
+
+def find_record(
+    job_id: Optional[str], key: str, operation: str, fingerprint: str
+) -> IdempotencyRecord | None:
+    """
+    The recorded response for `key` (looked up on `job_id`, or via the key index
+    when the job id is not known yet), or None if the key is new.
+    """
+    scoped = _scoped(key)
+    job_id = job_id or _index.get(scoped)
+    job = get_job(job_id, blobs=("idempotency",)) if job_id else None
+    record = job.idempotency.get(scoped) if job else None
+    if record and (record.operation != operation or record.fingerprint != fingerprint):
+        raise IdempotencyKeyReused(key, operation)
+    return record
+
+
+def remember(
+    job: PipelineJob,
+    key: str,
+    operation: str,
+    fingerprint: str,
+    response: BaseModel,
+    status_code: int = 200,
+) -> dict[str, IdempotencyRecord]:
+    """
+    job.idempotency plus the record for `key`, to write with patch_job(idempotency=...).
+    `job` must have been read with its idempotency blob loaded, or the records
+    already on the job are dropped by that write.
+    """
+    scoped = _scoped(key)
+    _index[scoped] = job.job_id
+    return {
+        **job.idempotency,
+        scoped: IdempotencyRecord(
+            operation=operation,
+            fingerprint=fingerprint,
+            status_code=status_code,
+            response=response.model_dump(mode="json"),
+        ),
+    }
+
+
+async def attach(job_id: str, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+    """Run fn() once for concurrent requests carrying the same key."""
+    return await _flights.do(f"{job_id}:{_scoped(key)}", fn)
@@ -0,0 +1,160 @@
+"""
+Image post-processing: normalize generated scene images on ingest.
+
+Every image is cropped to the video's aspect ratio and sized so that every
+output aspect (settings.output_aspect_ratios) can be cropped from it without
+upscaling (never larger than the source allows, never smaller than the video
+resolution), re-encoded to a compact format (WebP or JPEG) and written without
+EXIF/ICC metadata, so downstream stages (stitching, serving) always see a
+known aspect and format. The Pillow work runs
+in a dedicated thread pool; resize and encode release the GIL.
+"""
+
+import asyncio
+import io
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional
+
+from config import settings
+
+_FORMATS = {
+    "webp": ("WEBP", ".webp"),
+    "jpeg": ("JPEG", ".jpg"),
+    "jpg": ("JPEG", ".jpg"),
+}
+
+# Thumbnail size for smart-crop focus detection
+_FOCUS_SIZE = 96
+
+_pool: Optional[ThreadPoolExecutor] = None
+
+
+def _get_pool() -> ThreadPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ThreadPoolExecutor(
+            max_workers=settings.image_workers,
+            thread_name_prefix="image-normalize",
+        )
+    return _pool
+
+
+def image_suffix() -> str:
+    """File suffix for normalized images in the configured format."""
+    return _resolve_format()[1]
+
+
+def aspect_size(ratio: str) -> tuple[int, int]:
+    """(width, height) of an output aspect like "9:16"; its short side matches the video's."""
+    a, b = (int(part) for part in ratio.split(":"))
+    short = min(settings.video_width, settings.video_height)
+    if a >= b:
+        return round(short * a / b / 2) * 2, short
+    return short, round(short * b / a / 2) * 2
+
+
+def normalized_size(source_size: tuple[int, int]) -> tuple[int, int]:
+    """
+    Size to store a scene image at: the video's aspect ratio, scaled up from the
+    video resolution as far as the largest output crop needs and the source
+    (cropped to that aspect) can supply.
+    """
+    width, height = settings.video_width, settings.video_height
+    needed = 1.0
+    for ratio in filter(None, (r.strip() for r in settings.output_aspect_ratios.split(","))):
+        w, h = aspect_size(ratio)
+        # A narrower crop spans the full height, a wider one the full width
+        needed = max(needed, h / height if w * height <= h * width else w / width)
+    source_w, source_h = source_size
+    available = min(source_w / width, source_h / height)
+    scale = max(1.0, min(needed, available))
+    return round(width * scale / 2) * 2, round(height * scale / 2) * 2
+
+
+def _resolve_format() -> tuple[str, str]:
+    fmt = _FORMATS.get(settings.image_format.lower())
+    if fmt is None:
+        raise ValueError(f"Unsupported image_format: {settings.image_format} (use webp or jpeg)")
+    return fmt
+
+
+async def normalize_image(data: bytes | Path, output_path: Path) -> Path:
+    """
+    Decode raw image bytes (or a downloaded file), fit them to the video's
+    aspect at normalized_size() and write them to output_path (its suffix is
+    replaced with the configured format's).
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_pool(), _normalize_sync, data, output_path)
+
+
+def _normalize_sync(data: bytes | Path, output_path: Path) -> Path:
+    from PIL import Image, ImageOps
+
+    pil_format, suffix = _resolve_format()
+    output_path = output_path.with_suffix(suffix)
+    tmp_path = output_path.with_suffix(suffix + ".tmp")
+
+    source = data if isinstance(data, Path) else io.BytesIO(data)
+    with Image.open(source) as img:
+        img = ImageOps.exif_transpose(img)  # apply orientation before the tag is dropped
+        img = img.convert("RGB")
+        size = normalized_size(img.size)
+        if img.size != size:
+            img = ImageOps.fit(img, size, Image.LANCZOS)
+        # No exif/icc_profile passed to save(), so metadata is stripped
+        save_kwargs = {"quality": settings.image_quality}
+        if pil_format == "WEBP":
+            save_kwargs["method"] = 4
+        else:
+            save_kwargs["optimize"] = True
+        img.save(tmp_path, format=pil_format, **save_kwargs)
+
+    tmp_path.replace(output_path)
+    return output_path
+
+
+def read_image_info(image_path: Path) -> tuple[int, int, int]:
+    """(width, height, bytes) of a stored image; reads only the header."""
+    from PIL import Image
+
+    with Image.open(image_path) as img:
+        width, height = img.size
+    return width, height, image_path.stat().st_size
+
+
+def saliency_focus(image_path: Path) -> tuple[float, float]:
+    """
+    Focus point of an image as (x, y) fractions of its size, for smart crops
+    into other aspect ratios: the centroid of edge energy on a small greyscale
+    thumbnail, pulled halfway back towards the centre.
+    """
+    from PIL import Image, ImageFilter
+
+    with Image.open(image_path) as img:
+        img.draft("L", (_FOCUS_SIZE * 2, _FOCUS_SIZE * 2))  # cheap JPEG downscale on decode
+        thumb = img.convert("L")
+    thumb.thumbnail((_FOCUS_SIZE, _FOCUS_SIZE))
+    edges = thumb.filter(ImageFilter.FIND_EDGES)
+
+    width, height = edges.size
+    total = sum_x = sum_y = 0
+    for index, value in enumerate(edges.getdata()):
+        y, x = divmod(index, width)
+        if value and 0 < x < width - 1 and 0 < y < height - 1:  # borders are filter artefacts
+            total += value
+            sum_x += value * x
+            sum_y += value * y
+    if not total:
+        return 0.5, 0.5
+    fx = (sum_x / total + 0.5) / width
+    fy = (sum_y / total + 0.5) / height
+    return 0.5 + (fx - 0.5) / 2, 0.5 + (fy - 0.5) / 2
+
+
+def shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
@@ -3,65 +3,141 @@ Scene image generation via Replicate (FLUX).
 """
 
 import asyncio
+import hashlib
+import shutil
 from pathlib import Path
 from typing import Optional
 
 from config import settings
+from image_processing import normalize_image
 from schemas import MarketingScript, SceneScript
+from scheduler import provider_slot
+from singleflight import SingleFlight, content_key, fan_out_file
 
-try:
-    import replicate
-except ImportError:
-    replicate = None
+_flights = SingleFlight("images")
+
+# Flight key -> callers that have not yet copied the flight's render. Flights
+# render into a directory of their own, never into a caller's: a caller may
+# delete its directory (e.g. a discarded speculative render) while other jobs
+# still wait for the shared render. The last caller to copy removes it.
+_staged: dict[str, int] = {}
 
 
 def _get_client():
-    if replicate is None:
+    # replicate is imported on first use to keep startup fast
+    try:
+        import replicate
+    except ImportError:
         raise ValueError("Install replicate: pip install replicate")
     if not settings.replicate_api_token:
         raise ValueError("REPLICATE_API_TOKEN is not set")
     return replicate
 
 
-async def generate_scene_image(
-    scene: SceneScript,
-    script_context: MarketingScript,
-    output_dir: Path,
-) -> Path:
-    """Generate a single scene image using Replicate FLUX."""
-    client = _get_client()
-    prompt = (
+def build_scene_prompt(scene: SceneScript, script_context: MarketingScript) -> str:
+    """FLUX prompt for a scene; everything that affects the rendered image goes in here."""
+    return (
         f"High-quality cinematic marketing image, {script_context.tone} tone, "
         f"targeting {script_context.target_audience}. "
         f"Scene: {scene.visual_description}. "
         f"Camera: {scene.camera_direction}. "
         f"Professional, photorealistic, 16:9, good lighting."
     )
-    output_path = output_dir / f"scene_{scene.scene_number:02d}.png"
 
-    def _run():
-        out = replicate.run(
+
+def scene_image_fingerprint(scene: SceneScript, script_context: MarketingScript) -> str:
+    """Hash of the image inputs (model + prompt). Equal fingerprints mean the image can be reused."""
+    key = (
+        f"{settings.replicate_flux_model}\n{settings.replicate_aspect_ratio}\n"
+        f"{build_scene_prompt(scene, script_context)}"
+    )
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+async def _render_scene_image(prompt: str, output_path: Path) -> Path:
+    if settings.replicate_async:
+        return await _render_scene_image_async(prompt, output_path)
+
+    client = _get_client()
+
+    def _run() -> bytes:
+        out = client.run(
             settings.replicate_flux_model,
-            input={"prompt": prompt},
+            input={"prompt": prompt, "aspect_ratio": settings.replicate_aspect_ratio},
         )
         # Replicate returns FileOutput (has .read()) or list of them
         file_out = out
         if isinstance(out, (list, tuple)):
             file_out = out[0]
-        output_path.write_bytes(file_out.read())
-        return output_path
+        return file_out.read()
 
-    return await asyncio.to_thread(_run)
+    async with provider_slot("replicate"):
+        data = await asyncio.to_thread(_run)
+    return await normalize_image(data, output_path)
+
+
+async def _render_scene_image_async(prompt: str, output_path: Path) -> Path:
+    """Async prediction (webhook or polling) — holds no thread while FLUX renders."""
+    from replicate_predictions import run_prediction
+
+    download_path = output_path.with_suffix(".download")
+    # run_prediction holds a "replicate" slot only while creating the prediction
+    await run_prediction(
+        settings.replicate_flux_model,
+        {"prompt": prompt, "aspect_ratio": settings.replicate_aspect_ratio},
+        download_path,
+    )
+    try:
+        return await normalize_image(download_path, output_path)
+    finally:
+        download_path.unlink(missing_ok=True)
+
+
+async def generate_scene_image(
+    scene: SceneScript,
+    script_context: MarketingScript,
+    output_dir: Path,
+) -> Path:
+    """
+    Generate a single scene image using Replicate FLUX, then normalize it
+    (video resolution, compact format, no metadata) before it is stored.
+    Identical concurrent renders (same prompt and output settings) run once.
+    """
+    if not settings.replicate_async:
+        _get_client()
+    prompt = build_scene_prompt(scene, script_context)
+    output_path = output_dir / f"scene_{scene.scene_number:02d}"
+
+    key = content_key(
+        scene_image_fingerprint(scene, script_context),
+        settings.image_format, settings.image_quality,
+        settings.video_width, settings.video_height, settings.output_aspect_ratios,
+    )
+    staging_dir = settings.output_dir / "_flights" / key[:16]
+    _staged[key] = _staged.get(key, 0) + 1
+    staging_dir.mkdir(parents=True, exist_ok=True)
+    try:
+        rendered = await _flights.do(key, lambda: _render_scene_image(prompt, staging_dir / output_path.name))
+        return await fan_out_file(rendered, output_path.with_suffix(rendered.suffix))
+    finally:
+        _staged[key] -= 1
+        if not _staged[key]:
+            del _staged[key]
+            shutil.rmtree(staging_dir, ignore_errors=True)
 
 
 async def generate_all_images(
     script: MarketingScript,
     output_dir: Path,
+    scenes: Optional[list[SceneScript]] = None,
 ) -> list[Path]:
-    """Generate images for all scenes (sequentially to avoid rate limits)."""
+    """
+    Generate images for all scenes (sequentially to avoid rate limits).
+    Pass `scenes` to render only a subset (e.g. the scenes changed by an edit).
+    """
     output_dir.mkdir(parents=True, exist_ok=True)
     paths = []
-    for scene in script.scenes:
+    for scene in (script.scenes if scenes is None else scenes):
         path = await generate_scene_image(scene, script, output_dir)
         paths.append(path)
         await asyncio.sleep(1)
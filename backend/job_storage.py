@@ -0,0 +1,70 @@
+"""
+Compact in-memory form of pipeline jobs.
+
+Large, rarely read fields (BLOB_FIELDS: the transcript, the raw White Circle
+responses, recorded idempotent responses) are kept out of the hot record.
+Each is serialized, zlib-compressed and stored beside it, and only
+decompressed for readers that ask for it (get_job(..., blobs=...)). Status
+polling, listings and the disk GC only ever touch the hot record.
+"""
+
+import zlib
+from typing import Iterable, Optional
+
+from pydantic import TypeAdapter
+
+from schemas import IdempotencyRecord, PipelineJob
+
+# Dotted paths into PipelineJob; the first segment is the top-level field
+_ADAPTERS: dict[str, TypeAdapter] = {
+    "transcript": TypeAdapter(Optional[str]),
+    "pre_compliance.raw_response": TypeAdapter(Optional[dict]),
+    "post_compliance.raw_response": TypeAdapter(Optional[dict]),
+    "idempotency": TypeAdapter(dict[str, IdempotencyRecord]),
+}
+BLOB_FIELDS = tuple(_ADAPTERS)
+# Top-level fields that have (parts of them) stored as blobs
+BLOB_ROOTS = {path.split(".", 1)[0] for path in BLOB_FIELDS}
+
+_EMPTY = {"idempotency": dict}
+
+
+def _parent(job: PipelineJob, path: str):
+    """(object holding the field, attribute name); object is None if an ancestor is unset."""
+    *parents, name = path.split(".")
+    obj = job
+    for part in parents:
+        obj = getattr(obj, part)
+        if obj is None:
+            break
+    return obj, name
+
+
+def blobs_for(fields: Iterable[str]) -> tuple[str, ...]:
+    """Blob paths needed to serve the given top-level fields."""
+    wanted = set(fields)
+    return tuple(path for path in BLOB_FIELDS if path.split(".", 1)[0] in wanted)
+
+
+def split_blobs(job: PipelineJob) -> dict[str, bytes]:
+    """Move the blob fields out of `job` (emptied in place); returns them compressed."""
+    blobs: dict[str, bytes] = {}
+    for path, adapter in _ADAPTERS.items():
+        obj, name = _parent(job, path)
+        if obj is None:
+            continue
+        value = getattr(obj, name)
+        if value:
+            blobs[path] = zlib.compress(adapter.dump_json(value))
+        setattr(obj, name, _EMPTY[path]() if path in _EMPTY else None)
+    return blobs
+
+
+def attach_blobs(job: PipelineJob, blobs: dict[str, bytes], paths: Iterable[str] = BLOB_FIELDS) -> PipelineJob:
+    """Decompress the requested blobs back into `job` (in place)."""
+    for path in paths:
+        data = blobs.get(path)
+        obj, name = _parent(job, path)
+        if data is not None and obj is not None:
+            setattr(obj, name, _ADAPTERS[path].validate_json(zlib.decompress(data)))
+    return job
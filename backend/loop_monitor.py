@@ -0,0 +1,167 @@
+"""
+Event-loop lag monitor and blocking-call detector.
+
+A background task sleeps for settings.loop_monitor_interval_seconds at a time
+and records how late it wakes up: that delay is the lag every other request on
+this worker saw at the same moment. Lags go into a histogram (cumulative
+buckets in ms, like a Prometheus histogram) and a window of recent samples for
+percentiles, served at GET /metrics/loop.
+
+With settings.loop_debug on, a watchdog thread also checks the monitor's
+heartbeat. When the loop has not come back for
+settings.loop_block_threshold_seconds, the thread captures the stack of the
+loop thread through sys._current_frames(). That stack shows the callback
+that is blocking, and the thread does this while the callback is still
+running. Each stall is recorded once and printed, and the most recent ones
+are kept for /metrics/loop.
+"""
+
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from datetime import datetime
+from typing import Optional
+
+from config import settings
+
+# Upper bounds (ms) of the lag histogram buckets; the last bucket is +Inf
+LAG_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+_LAG_SAMPLES = 1000
+_BLOCK_REPORTS = 20
+
+
+class LoopMonitor:
+    """Lag histogram + (optional) watchdog for one event loop."""
+
+    def __init__(self, interval: float, block_threshold: float, debug: bool = False):
+        self.interval = interval
+        self.block_threshold = block_threshold
+        self.debug = debug
+        self.buckets = [0] * (len(LAG_BUCKETS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.lags: deque[float] = deque(maxlen=_LAG_SAMPLES)
+        self.blocks: deque[dict] = deque(maxlen=_BLOCK_REPORTS)
+        self.blocks_total = 0
+        self._heartbeat = time.monotonic()
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def start(self):
+        """Start monitoring the running loop (call from inside it)."""
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._task = asyncio.create_task(self._run())
+        if self.debug:
+            self._stop.clear()
+            self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+            self._watchdog.start()
+
+    async def stop(self):
+        self._stop.set()
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        if self._watchdog:
+            self._watchdog.join(timeout=1)
+
+    async def _run(self):
+        while True:
+            started = time.monotonic()
+            await asyncio.sleep(self.interval)
+            self._heartbeat = now = time.monotonic()
+            self.observe(max(0.0, now - started - self.interval))
+
+    def observe(self, lag: float):
+        lag_ms = lag * 1000
+        for i, bound in enumerate(LAG_BUCKETS_MS):
+            if lag_ms <= bound:
+                break
+        else:
+            i = len(LAG_BUCKETS_MS)
+        self.buckets[i] += 1
+        self.count += 1
+        self.total += lag
+        self.max = max(self.max, lag)
+        self.lags.append(lag)
+
+    def _watch(self):
+        """Watchdog thread: capture the loop thread's stack while it is blocked."""
+        reported = None  # heartbeat of the stall already captured
+        while not self._stop.wait(self.block_threshold / 2):
+            heartbeat = self._heartbeat
+            blocked = time.monotonic() - heartbeat - self.interval
+            if blocked < self.block_threshold or heartbeat == reported:
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            reported = heartbeat
+            stack = "".join(traceback.format_stack(frame))
+            self.blocks_total += 1
+            self.blocks.append({
+                "blocked_ms": round(blocked * 1000, 1),
+                "at": datetime.utcnow().isoformat(),
+                "stack": stack,
+            })
+            print(f"⚠️ Event loop blocked for {blocked * 1000:.0f}ms+ in:\n{stack}")
+
+    def snapshot(self) -> dict:
+        lags = sorted(self.lags)
+
+        def pct(p: float) -> float:
+            return round(lags[min(len(lags) - 1, int(p * len(lags)))] * 1000, 1) if lags else 0.0
+
+        cumulative, buckets = 0, {}
+        for bound, n in zip((*map(str, LAG_BUCKETS_MS), "+Inf"), self.buckets):
+            cumulative += n
+            buckets[bound] = cumulative
+        return {
+            "interval_ms": round(self.interval * 1000, 1),
+            "count": self.count,
+            "sum_ms": round(self.total * 1000, 1),
+            "max_ms": round(self.max * 1000, 1),
+            "p50_ms": pct(0.50),
+            "p95_ms": pct(0.95),
+            "p99_ms": pct(0.99),
+            "buckets_ms": buckets,
+            "debug": self.debug,
+            "block_threshold_ms": round(self.block_threshold * 1000, 1),
+            "blocks_total": self.blocks_total,
+            "recent_blocks": list(self.blocks),
+        }
+
+
+_monitor: Optional[LoopMonitor] = None
+
+
+def start_loop_monitor() -> Optional[LoopMonitor]:
+    """Start the process monitor on the running loop (no-op if the interval is 0)."""
+    global _monitor
+    if settings.loop_monitor_interval_seconds <= 0:
+        return None
+    _monitor = LoopMonitor(
+        settings.loop_monitor_interval_seconds,
+        settings.loop_block_threshold_seconds,
+        debug=settings.loop_debug,
+    )
+    _monitor.start()
+    return _monitor
+
+
+async def stop_loop_monitor():
+    if _monitor:
+        await _monitor.stop()
+
+
+def loop_stats() -> dict:
+    return _monitor.snapshot() if _monitor else {"enabled": False}
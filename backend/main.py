@@ -5,39 +5,91 @@ Routes:
   POST /pipeline/upload          Upload voice memo, get job_id + transcript
   POST /pipeline/{id}/script     Generate script + pre-compliance check
   POST /pipeline/{id}/generate   Approve & generate images → video → stitch
+                                 (both honour If-Match: <job version>, 409 on conflict)
   POST /pipeline/{id}/full       Run entire pipeline end-to-end (auto mode)
+                                 (script / generate / full accept Idempotency-Key: retries
+                                 get the original response instead of new work)
+  POST /uploads                  Resumable (tus) upload of a voice memo; PATCH / HEAD /uploads/{uid}
+                                 to send / resume chunks, transcription starts when complete
+  POST /pipeline/batch           Submit many memos at once, get a batch_id
+  GET  /pipeline/batch/{bid}     Aggregate batch progress + per-memo outcomes
   GET  /pipeline/{id}/status     Poll job status
-  GET  /pipeline/{id}/video      Download final video
+  GET  /pipeline/{id}/video      Download final video (?profile=9x16 / 1x1 for other aspects)
+  GET  /pipeline/{id}/draft      Download the low-res draft preview
+  GET  /pipeline/{id}/narration/{n}  A scene's narration mp3, streamed live while it is synthesized
+  POST /pipeline/{id}/variants   Re-voice a finished video (other voice / language)
+  GET  /pipeline/{id}/variants/{vid}/video   Download a variant (?profile= as above)
   GET  /pipeline/videos          List all generated videos
+  GET  /metrics/scheduler        Per-resource / per-lane queue-wait metrics
+  GET  /metrics/loop             Event-loop lag histogram (+ blocking stacks with LOOP_DEBUG)
+  POST /admin/gc                 Run a disk GC pass now and report reclaimed bytes
+  GET  /admin/gc                 Report of the last GC pass (null before the first one)
+  POST /webhooks/replicate       Replicate prediction-completed webhook
   GET  /health                   Health check
 """
 
 import shutil
 import asyncio
+import hashlib
+from datetime import datetime, timedelta
 from pathlib import Path
+from typing import Optional, Union, get_args, get_origin
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, UploadFile, File, HTTPException, BackgroundTasks
-from fastapi.responses import FileResponse
+from fastapi import FastAPI, UploadFile, File, Header, HTTPException, BackgroundTasks, Request
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
+from pydantic import BaseModel
 
+from artifact_store import get_artifact_store, job_artifact_name, stream as stream_artifact
 from config import settings
+from http_client import close_http_client
+from image_processing import shutdown_pool as shutdown_image_pool
+from replicate_predictions import resolve_webhook, verify_webhook_signature
+from retention import collect_garbage, last_report, run_gc_loop
+from batches import batch_status, create_batch, get_batch, run_batch
+from job_storage import blobs_for
+from loop_monitor import loop_stats, start_loop_monitor, stop_loop_monitor
+from idempotency import IdempotencyKeyReused, attach, find_record, remember, request_fingerprint
+from resumable_upload import (
+    CHECKSUM_ALGORITHMS,
+    TUS_VERSION,
+    UploadError,
+    append_chunk,
+    create_upload,
+    get_upload,
+    parse_metadata,
+    upload_path,
+)
+from scheduler import provider_stats, run_in_lane, set_tenant
 from schemas import (
     PipelineJob,
     PipelineStage,
     TranscribeResponse,
+    IdempotencyRecord,
     ScriptResponse,
     GenerateRequest,
     JobStatusResponse,
     VideoSummary,
+    StorageGCReport,
+    BatchItem,
+    BatchStatusResponse,
+    VariantRequest,
+    VideoVariant,
 )
 from pipeline import (
+    JobConflictError,
     create_job,
+    create_variant,
+    get_encode_progress,
     get_job,
+    listen_narration,
+    patch_job,
     run_transcription,
     run_script_generation,
     run_media_generation,
     run_full_pipeline,
+    run_variant,
 )
 
 
@@ -47,8 +99,17 @@ from pipeline import (
 async def lifespan(app: FastAPI):
     settings.upload_dir.mkdir(parents=True, exist_ok=True)
     settings.output_dir.mkdir(parents=True, exist_ok=True)
+    gc_task = None
+    if settings.gc_interval_seconds > 0:
+        gc_task = asyncio.create_task(run_gc_loop())
+    start_loop_monitor()
     print("🎬 VidPipe API ready")
     yield
+    if gc_task:
+        gc_task.cancel()
+    await stop_loop_monitor()
+    shutdown_image_pool()
+    await close_http_client()
     print("👋 Shutting down")
 
 
@@ -70,8 +131,38 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Let browser tus clients read the upload protocol headers
+    expose_headers=["Location", "Upload-Offset", "Upload-Length", "Tus-Resumable", "Upload-Job-Id"],
 )
 
+ALLOWED_AUDIO_TYPES = {
+    "audio/wav", "audio/x-wav", "audio/mpeg", "audio/mp3",
+    "audio/mp4", "audio/m4a", "audio/x-m4a", "audio/webm",
+    "audio/ogg", "video/webm",
+}
+
+
+@app.middleware("http")
+async def tenant_context(request: Request, call_next):
+    """Attribute the request's provider calls to its tenant for fair scheduling."""
+    client = request.client.host if request.client else "default"
+    set_tenant(request.headers.get("x-tenant-id") or client)
+    return await call_next(request)
+
+
+@app.exception_handler(IdempotencyKeyReused)
+async def idempotency_key_reused_handler(request: Request, exc: IdempotencyKeyReused):
+    return JSONResponse(status_code=422, content={"detail": str(exc)})
+
+
+@app.exception_handler(JobConflictError)
+async def job_conflict_handler(request: Request, exc: JobConflictError):
+    """A write lost against a newer version of the job: the client re-reads and retries."""
+    return JSONResponse(
+        status_code=409,
+        content={"detail": str(exc), "job_id": exc.job_id, "current_version": exc.actual},
+    )
+
 
 # ── Health check ─────────────────────────────────────────────────────────────
 
@@ -80,6 +171,7 @@ async def health():
     return {
         "status": "ok",
         "service": "vidpipe",
+        "api_only": settings.api_only,
         "models": {
             "transcription": "whisper-1",
             "script": settings.claude_model,
@@ -100,13 +192,8 @@ async def upload_voice_memo(
     The transcription includes both raw text and extracted marketing brief.
     """
     # Validate file type
-    allowed_types = {
-        "audio/wav", "audio/x-wav", "audio/mpeg", "audio/mp3",
-        "audio/mp4", "audio/m4a", "audio/x-m4a", "audio/webm",
-        "audio/ogg", "video/webm",
-    }
     content_type = audio.content_type or "audio/wav"
-    if content_type not in allowed_types:
+    if content_type not in ALLOWED_AUDIO_TYPES:
         raise HTTPException(
             status_code=400,
             detail=f"Unsupported audio format: {content_type}. Supported: wav, mp3, m4a, webm, ogg",
@@ -114,10 +201,7 @@ async def upload_voice_memo(
 
     # Create job and save file
     job = create_job()
-    audio_path = settings.upload_dir / f"{job.job_id}_{audio.filename}"
-
-    with open(audio_path, "wb") as f:
-        shutil.copyfileobj(audio.file, f)
+    audio_path = await _save_upload(audio, job.job_id)
 
     # Transcribe
     await run_transcription(job.job_id, audio_path, content_type)
@@ -132,18 +216,45 @@ async def upload_voice_memo(
 # ── Step 2: Generate script ─────────────────────────────────────────────────
 
 @app.post("/pipeline/{job_id}/script", response_model=ScriptResponse)
-async def generate_script_endpoint(job_id: str):
+async def generate_script_endpoint(
+    job_id: str,
+    if_match: Optional[str] = Header(None),
+    idempotency_key: Optional[str] = Header(None),
+):
     """
     Generate a marketing script from the transcription.
     Automatically runs pre-compliance check via White Circle.
     Returns the script + compliance result for frontend review.
     """
+    if not idempotency_key:
+        return await _generate_script(job_id, if_match)
+
+    fingerprint = request_fingerprint("script", job_id, if_match or "")
+    record = find_record(job_id, idempotency_key, "script", fingerprint)
+    if record:
+        return _replay(record)
+    # A retry while the first request is still generating waits for its result
+    response = await attach(job_id, idempotency_key, lambda: _generate_script(job_id, if_match))
+    record = find_record(job_id, idempotency_key, "script", fingerprint)
+    if record:  # recorded by a request that joined the same flight
+        return _replay(record)
+    # Recording the key is itself a write: report the version it produces
+    response = response.model_copy(update={"version": response.version + 1})
+    job = get_job(job_id)
+    patch_job(job_id, idempotency=remember(job, idempotency_key, "script", fingerprint, response))
+    return response
+
+
+async def _generate_script(job_id: str, if_match: Optional[str]) -> ScriptResponse:
     job = get_job(job_id)
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
+    _check_version(job, if_match)
     if not job.transcript:
         raise HTTPException(status_code=400, detail="No transcript available. Upload audio first.")
 
+    # Claim the job first: a concurrent duplicate loses the version check (409)
+    patch_job(job_id, expected_version=job.version, stage=PipelineStage.SCRIPTING)
     await run_script_generation(job_id)
     job = get_job(job_id)
 
@@ -154,6 +265,7 @@ async def generate_script_endpoint(job_id: str):
         job_id=job.job_id,
         script=job.script,
         compliance=job.pre_compliance,
+        version=job.version,
     )
 
 
@@ -164,15 +276,29 @@ async def generate_media(
     job_id: str,
     request: GenerateRequest = GenerateRequest(),
     background_tasks: BackgroundTasks = BackgroundTasks(),
+    deadline_seconds: Optional[float] = None,
+    if_match: Optional[str] = Header(None),
+    idempotency_key: Optional[str] = Header(None),
 ):
     """
     Kick off image + video generation. Runs in background.
-    Optionally accepts an edited/approved script from the frontend.
+    Optionally accepts an edited/approved script from the frontend; send
+    If-Match with the job version it was edited from to avoid overwriting a
+    newer script.
     Poll GET /pipeline/{job_id}/status for progress.
     """
+    _require_render_stack()
     job = get_job(job_id)
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
+    if idempotency_key:
+        fingerprint = request_fingerprint(
+            "generate", request.model_dump_json(), str(deadline_seconds), if_match or ""
+        )
+        record = find_record(job_id, idempotency_key, "generate", fingerprint)
+        if record:
+            return _replay(record)
+    _check_version(job, if_match)
     if not job.script and not request.approved_script:
         raise HTTPException(status_code=400, detail="No script available")
     if job.pre_compliance and not job.pre_compliance.passed:
@@ -181,16 +307,30 @@ async def generate_media(
             detail="Script failed compliance. Edit and resubmit.",
         )
 
-    # Run in background so we don't timeout
-    background_tasks.add_task(
-        run_media_generation, job_id, request.approved_script
-    )
-
-    return JobStatusResponse(
+    _set_deadline(job, deadline_seconds)
+    # Re-read with the recorded keys: remember() extends them, and the patch
+    # snapshot from _set_deadline does not load them
+    job = get_job(job_id, blobs=("idempotency",))
+    response = JobStatusResponse(
         job_id=job.job_id,
         stage=PipelineStage.IMAGE_GEN,
         progress_detail="Media generation started. Poll /status for updates.",
+        version=job.version + 1,
+    )
+    # Claim the job before scheduling: a concurrent duplicate loses the version
+    # check (409) instead of starting a second render into the same files
+    patch_job(
+        job_id,
+        expected_version=job.version,
+        stage=PipelineStage.IMAGE_GEN,
+        **({"idempotency": remember(job, idempotency_key, "generate", fingerprint, response)}
+           if idempotency_key else {}),
+    )
+    # Run in background so we don't timeout
+    background_tasks.add_task(
+        run_media_generation, job_id, request.approved_script
     )
+    return response
 
 
 # ── Full auto pipeline ──────────────────────────────────────────────────────
@@ -199,27 +339,183 @@ async def generate_media(
 async def full_pipeline(
     audio: UploadFile = File(...),
     background_tasks: BackgroundTasks = BackgroundTasks(),
+    deadline_seconds: Optional[float] = None,
+    idempotency_key: Optional[str] = Header(None),
 ):
     """
     One-shot: upload voice memo → full pipeline runs in background.
     Returns job_id immediately. Poll /status for progress.
+    With ?deadline_seconds=N, quality is degraded as needed to finish in time.
     """
+    _require_render_stack()
     content_type = audio.content_type or "audio/wav"
-    job = create_job()
-    audio_path = settings.upload_dir / f"{job.job_id}_{audio.filename}"
-
-    with open(audio_path, "wb") as f:
-        shutil.copyfileobj(audio.file, f)
-
-    background_tasks.add_task(
-        run_full_pipeline, job.job_id, audio_path, content_type
-    )
+    if idempotency_key:
+        fingerprint = request_fingerprint(
+            "full", await _upload_digest(audio), content_type, str(deadline_seconds)
+        )
+        record = find_record(None, idempotency_key, "full", fingerprint)
+        if record:
+            return _replay(record)
 
-    return JobStatusResponse(
+    job = create_job()
+    job = _set_deadline(job, deadline_seconds)
+    response = JobStatusResponse(
         job_id=job.job_id,
         stage=PipelineStage.UPLOADED,
         progress_detail="Full pipeline started. Poll /status for updates.",
     )
+    audio_path = await _save_upload(audio, job.job_id)
+
+    # Fire-and-forget work queues behind interactive editor calls
+    background_tasks.add_task(
+        run_in_lane, "batch", run_full_pipeline, job.job_id, audio_path, content_type
+    )
+    # Only a request that got this far is replayable
+    if idempotency_key:
+        patch_job(job.job_id, idempotency=remember(job, idempotency_key, "full", fingerprint, response))
+    return response
+
+
+# ── Resumable uploads (tus) ─────────────────────────────────────────────────
+
+@app.options("/uploads")
+async def resumable_upload_options():
+    """tus discovery: supported version, extensions and checksum algorithms."""
+    return Response(status_code=204, headers={
+        "Tus-Resumable": TUS_VERSION,
+        "Tus-Version": TUS_VERSION,
+        "Tus-Extension": "creation,checksum",
+        "Tus-Max-Size": str(settings.upload_max_bytes),
+        "Tus-Checksum-Algorithm": ",".join(CHECKSUM_ALGORITHMS),
+    })
+
+
+@app.post("/uploads", status_code=201)
+async def create_resumable_upload(
+    request: Request,
+    mode: str = "transcribe",
+    deadline_seconds: Optional[float] = None,
+):
+    """
+    Start a resumable upload. Send the file with PATCH /uploads/{upload_id};
+    once the last byte arrives the job transcribes (mode=transcribe, then
+    continue with /pipeline/{job_id}/script) or runs end-to-end (mode=full).
+    """
+    _check_tus_version(request)
+    if mode == "full":
+        _require_render_stack()
+    try:
+        length = int(request.headers.get("upload-length", ""))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Upload-Length header is required")
+    try:
+        metadata = parse_metadata(request.headers.get("upload-metadata"))
+        content_type = metadata.get("filetype") or "audio/wav"
+        if content_type not in ALLOWED_AUDIO_TYPES:
+            raise UploadError(415, f"Unsupported audio format: {content_type}")
+        upload = create_upload(length, metadata, mode)
+    except UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    _set_deadline(get_job(upload.job_id, blobs=False), deadline_seconds)
+
+    return JSONResponse(
+        status_code=201,
+        content={"upload_id": upload.upload_id, "job_id": upload.job_id},
+        headers={
+            "Location": f"/uploads/{upload.upload_id}",
+            "Tus-Resumable": TUS_VERSION,
+            "Upload-Offset": "0",
+            "Upload-Job-Id": upload.job_id,
+        },
+    )
+
+
+@app.head("/uploads/{upload_id}")
+async def resumable_upload_offset(upload_id: str, request: Request):
+    """How many bytes the server has: resume the PATCH from here."""
+    _check_tus_version(request)
+    upload = get_upload(upload_id)
+    if not upload:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    return Response(status_code=200, headers={
+        "Tus-Resumable": TUS_VERSION,
+        "Upload-Offset": str(upload.offset),
+        "Upload-Length": str(upload.length),
+        "Upload-Job-Id": upload.job_id,
+        "Cache-Control": "no-store",
+    })
+
+
+@app.patch("/uploads/{upload_id}")
+async def append_resumable_upload(
+    upload_id: str,
+    request: Request,
+    background_tasks: BackgroundTasks = BackgroundTasks(),
+):
+    """Append a chunk at Upload-Offset (optionally verified by Upload-Checksum)."""
+    _check_tus_version(request)
+    if request.headers.get("content-type") != "application/offset+octet-stream":
+        raise HTTPException(status_code=415, detail="Content-Type must be application/offset+octet-stream")
+    try:
+        offset = int(request.headers.get("upload-offset", ""))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Upload-Offset header is required")
+    try:
+        upload = await append_chunk(
+            upload_id, offset, request.stream(), request.headers.get("upload-checksum")
+        )
+    except UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+
+    if upload.completed:
+        audio_path = upload_path(upload)
+        if upload.mode == "full":
+            background_tasks.add_task(
+                run_in_lane, "batch", run_full_pipeline, upload.job_id, audio_path, upload.content_type
+            )
+        else:
+            background_tasks.add_task(run_transcription, upload.job_id, audio_path, upload.content_type)
+    return Response(status_code=204, headers={
+        "Tus-Resumable": TUS_VERSION,
+        "Upload-Offset": str(upload.offset),
+    })
+
+
+# ── Batch submission ────────────────────────────────────────────────────────
+
+@app.post("/pipeline/batch", response_model=BatchStatusResponse, status_code=202)
+async def submit_batch(
+    audios: list[UploadFile] = File(...),
+    background_tasks: BackgroundTasks = BackgroundTasks(),
+    deadline_seconds: Optional[float] = None,
+):
+    """
+    Upload many voice memos in one request; each runs the full pipeline in background.
+    Poll GET /pipeline/batch/{batch_id} for aggregate progress.
+    """
+    _require_render_stack()
+    if not audios:
+        raise HTTPException(status_code=400, detail="No files uploaded")
+
+    items: list[BatchItem] = []
+    uploads: dict[str, tuple[Path, str]] = {}
+    for audio in audios:
+        job = create_job()
+        _set_deadline(job, deadline_seconds)
+        uploads[job.job_id] = (await _save_upload(audio, job.job_id), audio.content_type or "audio/wav")
+        items.append(BatchItem(job_id=job.job_id, filename=audio.filename or job.job_id))
+
+    batch = create_batch(items)
+    background_tasks.add_task(run_batch, batch.batch_id, uploads)
+    return batch_status(batch)
+
+
+@app.get("/pipeline/batch/{batch_id}", response_model=BatchStatusResponse)
+async def get_batch_status(batch_id: str):
+    batch = get_batch(batch_id)
+    if not batch:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    return batch_status(batch)
 
 
 # ── List all generated videos ────────────────────────────────────────────────
@@ -244,7 +540,7 @@ async def list_videos():
 
         job_id = job_dir.name
         # Try to get title from in-memory job if available
-        job = get_job(job_id)
+        job = get_job(job_id, blobs=False)
         title = job.script.title if job and job.script else ""
         created_at = (
             job.created_at
@@ -271,56 +567,372 @@ async def list_videos():
 @app.get("/pipeline/{job_id}/status", response_model=JobStatusResponse)
 async def get_status(job_id: str):
     """Poll the current status of a pipeline job."""
-    job = get_job(job_id)
+    job = get_job(job_id, blobs=False)
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
 
     video_url = None
     if job.final_video_path and job.stage == PipelineStage.COMPLETE:
         video_url = f"/pipeline/{job_id}/video"
+    draft_url = f"/pipeline/{job_id}/draft" if job.draft_video_path else None
+    output_urls = {}
+    progress = get_encode_progress(job_id)
+    if job.stage == PipelineStage.COMPLETE:
+        output_urls = {
+            name: f"/pipeline/{job_id}/video" + ("" if name == "final" else f"?profile={name}")
+            for name in job.outputs
+        }
 
     return JobStatusResponse(
         job_id=job.job_id,
         stage=job.stage,
         progress_detail=_stage_description(job.stage),
         final_video_url=video_url,
+        draft_video_url=draft_url,
+        output_urls=output_urls,
+        degradations=job.degradations,
         error=job.error,
+        encode_progress=progress,
+        poll_after_seconds=_poll_after(job, progress),
+        version=job.version,
     )
 
 
+def _poll_after(job, progress) -> float:
+    """Suggested status polling interval: back off while a long encode has a known ETA."""
+    if job.stage == PipelineStage.STITCHING and progress and not progress.done and progress.eta_seconds is not None:
+        return min(max(progress.eta_seconds / 5, 1), 10)
+    return 2
+
+
 # ── Download final video ────────────────────────────────────────────────────
 
 @app.get("/pipeline/{job_id}/video")
-async def download_video(job_id: str):
-    """Download the final marketing video."""
+async def download_video(job_id: str, profile: str = "final"):
+    """Download the final marketing video, or another aspect ratio via ?profile=9x16 / 1x1."""
     # Try in-memory job first
-    job = get_job(job_id)
-    if job and job.final_video_path:
-        path = Path(job.final_video_path)
-        if path.exists():
-            return FileResponse(path=str(path), media_type="video/mp4", filename=path.name)
+    job = get_job(job_id, blobs=False)
+    stored = None
+    if job:
+        stored = job.outputs.get(profile) or (job.final_video_path if profile == "final" else None)
+    if stored and (response := await _video_response(job, stored)):
+        return response
 
     # Fallback: look on disk in outputs directory
-    disk_path = settings.output_dir / job_id / "clips" / "video.mp4"
+    if not profile.replace("x", "").isdigit() and profile != "final":
+        raise HTTPException(status_code=400, detail="Invalid profile")
+    filename = "video.mp4" if profile == "final" else f"video_{profile}.mp4"
+    disk_path = settings.output_dir / job_id / "clips" / filename
     if disk_path.exists():
         return FileResponse(path=str(disk_path), media_type="video/mp4", filename=disk_path.name)
 
     raise HTTPException(status_code=404, detail="Video not found")
 
 
+@app.get("/pipeline/{job_id}/draft")
+async def download_draft(job_id: str):
+    """Download the low-resolution draft preview (available while the final encode runs)."""
+    job = get_job(job_id, blobs=False)
+    if job and job.draft_video_path and (response := await _video_response(job, job.draft_video_path)):
+        return response
+    raise HTTPException(status_code=404, detail="Draft not available")
+
+
+@app.get("/pipeline/{job_id}/narration/{scene_number}")
+async def download_narration_segment(job_id: str, scene_number: int):
+    """
+    A scene's narration (mp3). While the render is still synthesizing it, the
+    bytes are streamed as ElevenLabs sends them.
+    """
+    job = get_job(job_id, blobs=False)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    live = listen_narration(job_id, scene_number)
+    if live is not None:
+        return StreamingResponse(live, media_type="audio/mpeg")
+    for render in job.scene_renders:
+        if render.scene_number == scene_number and render.audio_path and Path(render.audio_path).exists():
+            return FileResponse(path=render.audio_path, media_type="audio/mpeg")
+    raise HTTPException(status_code=404, detail="Narration not available")
+
+
+# ── Narration variants ──────────────────────────────────────────────────────
+
+@app.post("/pipeline/{job_id}/variants", response_model=VideoVariant, status_code=202)
+async def create_video_variant(
+    job_id: str,
+    request: VariantRequest,
+    background_tasks: BackgroundTasks = BackgroundTasks(),
+):
+    """
+    Re-voice a finished video with another ElevenLabs voice and/or language.
+    Images and video encodes are reused: the new narration is muxed onto the
+    existing video streams without re-encoding them. Runs in background; poll
+    GET /pipeline/{job_id}/variants/{variant_id}.
+    """
+    _require_render_stack()
+    if not request.voice_id and not request.language:
+        raise HTTPException(status_code=400, detail="Provide voice_id and/or language")
+    job = get_job(job_id, blobs=False)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job.stage != PipelineStage.COMPLETE or not job.final_video_path:
+        raise HTTPException(status_code=409, detail="Job has no finished video yet")
+
+    variant = create_variant(job, request)
+    background_tasks.add_task(run_in_lane, "batch", run_variant, job_id, variant.variant_id)
+    return variant
+
+
+@app.get("/pipeline/{job_id}/variants", response_model=list[VideoVariant])
+async def list_video_variants(job_id: str):
+    job = get_job(job_id, blobs=False)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return list(job.variants.values())
+
+
+@app.get("/pipeline/{job_id}/variants/{variant_id}", response_model=VideoVariant)
+async def get_video_variant(job_id: str, variant_id: str):
+    job = get_job(job_id, blobs=False)
+    if not job or variant_id not in job.variants:
+        raise HTTPException(status_code=404, detail="Variant not found")
+    return job.variants[variant_id]
+
+
+@app.get("/pipeline/{job_id}/variants/{variant_id}/video")
+async def download_variant_video(job_id: str, variant_id: str, profile: str = "final"):
+    """Download a finished variant (?profile=9x16 / 1x1 for other aspects)."""
+    job = get_job(job_id, blobs=False)
+    variant = job.variants.get(variant_id) if job else None
+    if variant and variant.status == "complete" and profile in variant.outputs:
+        if response := await _video_response(job, variant.outputs[profile]):
+            return response
+    raise HTTPException(status_code=404, detail="Variant video not found")
+
+
 # ── Get full job details (for debugging / frontend) ─────────────────────────
 
 @app.get("/pipeline/{job_id}/details")
-async def get_job_details(job_id: str):
-    """Get full job details including script, compliance, paths."""
-    job = get_job(job_id)
+async def get_job_details(job_id: str, fields: Optional[str] = None):
+    """
+    Get full job details including script, compliance, paths.
+    ?fields=stage,script.title,pre_compliance.passed returns only those fields
+    (dotted paths select inside nested objects); large stored fields are only
+    loaded when selected.
+    """
+    include = _parse_fields(fields) if fields else _DEFAULT_DETAIL_FIELDS
+    job = get_job(job_id, blobs=blobs_for(include))
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
-    return job
+    # Serialized straight to JSON bytes by pydantic-core, skipping the dict round-trip
+    return Response(content=job.model_dump_json(include=include), media_type="application/json")
+
+
+# ── Scheduler metrics ───────────────────────────────────────────────────────
+
+@app.get("/metrics/scheduler")
+async def scheduler_metrics():
+    """Slots, queue depth and per-lane queue-wait percentiles for each provider and the stitchers."""
+    return provider_stats()
+
+
+@app.get("/metrics/loop")
+async def loop_metrics():
+    """Event-loop lag of this worker: histogram, percentiles and (debug) blocking-call stacks."""
+    return loop_stats()
+
+
+# ── Replicate webhook ───────────────────────────────────────────────────────
+
+@app.post("/webhooks/replicate")
+async def replicate_webhook(request: Request):
+    """Receives completed predictions (async render mode) and wakes the waiting render."""
+    body = await request.body()
+    if not verify_webhook_signature(request.headers, body):
+        raise HTTPException(status_code=401, detail="Invalid webhook signature")
+    resolved = resolve_webhook(await request.json())
+    return {"ok": True, "resolved": resolved}
+
+
+# ── Disk retention ──────────────────────────────────────────────────────────
+
+@app.post("/admin/gc", response_model=StorageGCReport)
+async def run_storage_gc():
+    """Run a GC pass over uploads/outputs now (TTL + disk budget) and report what was reclaimed."""
+    return await collect_garbage()
+
+
+@app.get("/admin/gc", response_model=Optional[StorageGCReport])
+async def last_storage_gc():
+    """What the last GC pass (background loop or POST /admin/gc) reclaimed, if one has run."""
+    return last_report()
 
 
 # ── Helpers ──────────────────────────────────────────────────────────────────
 
+async def _video_response(job: PipelineJob, stored: str) -> Response | None:
+    """
+    Serve one of a job's videos from the artifact store (shared by all nodes),
+    falling back to this node's working copy. None if neither has it.
+    """
+    path = Path(stored)
+    key = job.artifacts.get(job_artifact_name(job.job_id, path) or "")
+    if key:
+        store = get_artifact_store()
+        local = store.local_path(key)
+        if local:
+            return FileResponse(path=str(local), media_type="video/mp4", filename=path.name)
+        try:
+            size = await asyncio.to_thread(store.size, key)
+        except FileNotFoundError:
+            size = None
+        if size is not None:
+            return StreamingResponse(
+                stream_artifact(key),
+                media_type="video/mp4",
+                headers={
+                    "Content-Length": str(size),
+                    "Content-Disposition": f'attachment; filename="{path.name}"',
+                },
+            )
+    if path.exists():
+        return FileResponse(path=str(path), media_type="video/mp4", filename=path.name)
+    return None
+
+
+async def _upload_digest(audio: UploadFile) -> str:
+    """sha256 of an uploaded file's bytes (read off the event loop, then rewound)."""
+
+    def digest() -> str:
+        h = hashlib.sha256()
+        audio.file.seek(0)
+        for block in iter(lambda: audio.file.read(1 << 20), b""):
+            h.update(block)
+        audio.file.seek(0)
+        return h.hexdigest()
+
+    return await asyncio.to_thread(digest)
+
+
+async def _save_upload(audio: UploadFile, job_id: str) -> Path:
+    settings.upload_dir.mkdir(parents=True, exist_ok=True)
+    audio_path = settings.upload_dir / f"{job_id}_{audio.filename}"
+
+    def copy():
+        with open(audio_path, "wb") as f:
+            shutil.copyfileobj(audio.file, f)
+
+    # The spooled upload may be on disk: copy off the event loop
+    await asyncio.to_thread(copy)
+    return audio_path
+
+
+# Recorded idempotent responses are bookkeeping, not job details
+_DEFAULT_DETAIL_FIELDS = {name: True for name in PipelineJob.model_fields if name != "idempotency"}
+
+
+def _parse_fields(fields: str) -> dict:
+    """
+    "stage,script.title,scene_renders.image_path" → model_dump(include=...) spec;
+    paths through lists / dicts select that field on every element.
+    """
+    include: dict = {}
+    for path in filter(None, (f.strip() for f in fields.split(","))):
+        model, node = PipelineJob, include
+        parts = path.split(".")
+        for i, part in enumerate(parts):
+            field = model.model_fields.get(part) if model else None
+            if field is None:
+                raise HTTPException(status_code=400, detail=f"Unknown field: {path}")
+            if i == len(parts) - 1:
+                node[part] = True
+                break
+            if node.get(part) is True:
+                break  # already selected whole
+            node = node.setdefault(part, {})
+            annotation = _unwrap_optional(field.annotation)
+            if get_origin(annotation) in (list, dict):
+                node = node.setdefault("__all__", {})
+                annotation = _unwrap_optional(get_args(annotation)[-1])
+            model = annotation if isinstance(annotation, type) and issubclass(annotation, BaseModel) else None
+    return include
+
+
+def _unwrap_optional(annotation):
+    args = [a for a in get_args(annotation) if a is not type(None)]
+    return args[0] if get_origin(annotation) is Union and len(args) == 1 else annotation
+
+
+def _replay(record: IdempotencyRecord) -> JSONResponse:
+    """The response originally sent for an Idempotency-Key."""
+    return JSONResponse(
+        status_code=record.status_code,
+        content=record.response,
+        headers={"Idempotent-Replayed": "true"},
+    )
+
+
+def _check_tus_version(request: Request):
+    version = request.headers.get("tus-resumable")
+    if version and version != TUS_VERSION:
+        raise HTTPException(
+            status_code=412,
+            detail=f"Unsupported tus version {version}",
+            headers={"Tus-Version": TUS_VERSION},
+        )
+
+
+def _set_deadline(job: PipelineJob, deadline_seconds: Optional[float]) -> PipelineJob:
+    """Set the job's deadline for this run; cleared when neither request nor settings give one."""
+    seconds = deadline_seconds or settings.default_deadline_seconds
+    deadline = datetime.utcnow() + timedelta(seconds=seconds) if seconds and seconds > 0 else None
+    return patch_job(job.job_id, deadline=deadline)
+
+
+# Stages during which a transcription, script generation or render is writing
+# the job. PRE_COMPLIANCE is also where a checked script waits for review, so
+# it only counts while the check has not reported yet (see _is_busy)
+_BUSY_STAGES = {
+    PipelineStage.TRANSCRIBING,
+    PipelineStage.SCRIPTING,
+    PipelineStage.IMAGE_GEN,
+    PipelineStage.VIDEO_GEN,
+    PipelineStage.STITCHING,
+    PipelineStage.POST_COMPLIANCE,
+}
+
+
+def _is_busy(job: PipelineJob) -> bool:
+    if job.stage == PipelineStage.PRE_COMPLIANCE:
+        return job.pre_compliance is None
+    return job.stage in _BUSY_STAGES
+
+
+def _check_version(job: PipelineJob, if_match: Optional[str]):
+    """409 if the client edited an older version of the job, or work on it is still running."""
+    if if_match is not None:
+        try:
+            expected = int(if_match.strip().removeprefix("W/").strip('"'))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="If-Match must be a job version number")
+        if expected != job.version:
+            raise JobConflictError(job.job_id, expected, job.version)
+    if _is_busy(job):
+        raise HTTPException(
+            status_code=409,
+            detail=f"Job is busy ({job.stage.value}); retry when it finishes",
+        )
+
+
+def _require_render_stack():
+    if settings.api_only:
+        raise HTTPException(
+            status_code=503,
+            detail="This worker runs in API-only mode and does not render videos.",
+        )
+
+
 def _stage_description(stage: PipelineStage) -> str:
     return {
         PipelineStage.UPLOADED: "Voice memo uploaded",
@@ -13,70 +13,283 @@ Flow:
   9. Deliver
 """
 
+import copy
 import uuid
+import time
+import shutil
 import asyncio
+import threading
 from pathlib import Path
 from datetime import datetime
+from typing import TYPE_CHECKING, AsyncIterator, Callable, Iterable
 
+from artifact_store import detach, fetch, job_artifact_name, publish_job_artifacts
 from config import settings
+from job_storage import BLOB_FIELDS, BLOB_ROOTS, attach_blobs, blobs_for, split_blobs
 from schemas import (
+    EncodeProgress,
     PipelineJob,
     PipelineStage,
     MarketingScript,
+    SceneRender,
+    VariantRequest,
+    VideoVariant,
 )
 from whisper_service import transcribe_audio
-from claude_service import generate_script
-from image_service import generate_all_images
-from elevenlabs_service import generate_script_audio
-from video_stitcher import stitch_images_with_audio
+from claude_service import generate_script, translate_narration
+from degradation import encode_units, observe, plan_for_deadline, trim_scenes
+from image_service import generate_all_images, generate_scene_image, scene_image_fingerprint
+from image_processing import read_image_info
+from elevenlabs_service import generate_all_scene_audio, scene_audio_fingerprint, segment_path
+from singleflight import SingleFlight, content_key, file_digest
 from whitecircle_service import (
     check_script_compliance,
     check_video_compliance,
 )
 
+if TYPE_CHECKING:
+    import numpy as np
 
-# In-memory job store (swap with Redis/DB for production)
+
+# In-memory job store (swap with Redis/DB for production).
+# Records are versioned: every write bumps PipelineJob.version. Readers get
+# snapshots; writers either patch individual fields on the latest version or
+# compare-and-set a whole record against the version they read.
+# Large fields are stored compressed beside the hot record (see job_storage.py)
+# and only loaded into snapshots that ask for them.
 _jobs: dict[str, PipelineJob] = {}
+_blobs: dict[str, dict[str, bytes]] = {}  # job_id -> blob path -> compressed value
+_jobs_lock = threading.Lock()  # the GC thread reads the store too
+
+
+# Live encoder progress, kept beside the store: reports arrive about once a second
+# from encoder threads and must not bump job versions (If-Match / mutate_job CAS).
+# Single dict assignments / pops, so no lock is needed.
+_encode_progress: dict[str, EncodeProgress] = {}
+
+
+class JobConflictError(Exception):
+    """A compare-and-set write lost against a newer version of the job."""
+
+    def __init__(self, job_id: str, expected: int, actual: int):
+        super().__init__(f"Job {job_id} was modified (version {actual}, expected {expected})")
+        self.job_id = job_id
+        self.expected = expected
+        self.actual = actual
+
+
+def _snapshot(job_id: str, blobs: bool | Iterable[str]) -> PipelineJob:
+    job = _jobs[job_id].model_copy(deep=True)
+    paths = BLOB_FIELDS if blobs is True else () if blobs is False else tuple(blobs)
+    job._blobs_loaded = paths == BLOB_FIELDS
+    return attach_blobs(job, _blobs.get(job_id, {}), paths)
+
+
+def _store(job: PipelineJob, replace_blobs: bool | set[str]):
+    """
+    Write `job` as the hot record. Blobs are replaced for all blob fields
+    (True), none (False) or those under the given top-level fields.
+    """
+    blobs = split_blobs(job)
+    stored = _blobs.setdefault(job.job_id, {})
+    for path in BLOB_FIELDS:
+        if replace_blobs is True or (replace_blobs and path.split(".", 1)[0] in replace_blobs):
+            if path in blobs:
+                stored[path] = blobs[path]
+            else:
+                stored.pop(path, None)
+    _jobs[job.job_id] = job
 
 
 def create_job() -> PipelineJob:
     job_id = str(uuid.uuid4())[:8]
     job = PipelineJob(job_id=job_id)
-    _jobs[job_id] = job
+    with _jobs_lock:
+        _jobs[job_id] = job
+    return job.model_copy(deep=True)
+
+
+def get_job(job_id: str, blobs: bool | Iterable[str] = True) -> PipelineJob | None:
+    """
+    Snapshot of the job; changing it has no effect until patched / updated.
+    Pass blobs=False (or the blob paths needed) to skip decompressing large
+    fields the caller doesn't read, e.g. when polling status.
+    """
+    with _jobs_lock:
+        return _snapshot(job_id, blobs) if job_id in _jobs else None
+
+
+def get_encode_progress(job_id: str) -> EncodeProgress | None:
+    """Latest progress of the job's running encode (None when it is not stitching)."""
+    return _encode_progress.get(job_id)
+
+
+def list_jobs(blobs: bool | Iterable[str] = False) -> list[PipelineJob]:
+    with _jobs_lock:
+        return [_snapshot(job_id, blobs) for job_id in _jobs]
+
+
+# The GC thread's view of the store: read under the lock without snapshotting
+# (deep-copying) every record, so handlers on the loop never wait long for it.
+
+def job_activity() -> dict[str, tuple[PipelineStage, datetime]]:
+    """job_id -> (current stage, time of the last write) of every job."""
+    with _jobs_lock:
+        return {job_id: (job.stage, job.updated_at) for job_id, job in _jobs.items()}
+
+
+def job_activity_of(job_id: str) -> tuple[PipelineStage, datetime] | None:
+    """(current stage, time of the last write) of one job; None if unknown."""
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+        return (job.stage, job.updated_at) if job else None
+
+
+def artifact_references() -> dict[str, set[str]]:
+    """Artifact store key -> ids of the jobs that point to it."""
+    references: dict[str, set[str]] = {}
+    with _jobs_lock:
+        for job_id, job in _jobs.items():
+            for key in job.artifacts.values():
+                references.setdefault(key, set()).add(job_id)
+    return references
+
+
+def update_job(job: PipelineJob) -> PipelineJob:
+    """
+    Compare-and-set the whole record: stored only if nobody wrote the job since
+    `job` was read (raises JobConflictError otherwise). Bumps job.version.
+    Blob fields are only written back if `job` was read with all of them.
+    """
+    with _jobs_lock:
+        current = _jobs.get(job.job_id)
+        if current is not None and current.version != job.version:
+            raise JobConflictError(job.job_id, job.version, current.version)
+        job.version += 1
+        job.updated_at = datetime.utcnow()
+        _store(job.model_copy(deep=True), replace_blobs=job._blobs_loaded)
     return job
 
 
-def get_job(job_id: str) -> PipelineJob | None:
-    return _jobs.get(job_id)
+def _validate_fields(fields: dict) -> dict:
+    """
+    Check and coerce `fields` the way constructing a PipelineJob would
+    (pydantic.ValidationError, a ValueError, if one is invalid). Values are
+    copied, so the caller's objects never end up shared with the store.
+    """
+    scratch = PipelineJob.model_construct()
+    for name, value in copy.deepcopy(fields).items():
+        PipelineJob.__pydantic_validator__.validate_assignment(scratch, name, value)
+    return {name: getattr(scratch, name) for name in fields}
 
 
-def list_jobs() -> list[PipelineJob]:
-    return list(_jobs.values())
+def patch_job(job_id: str, expected_version: int | None = None, **fields) -> PipelineJob:
+    """
+    Set only `fields` on the latest version of the job, leaving fields written
+    by others untouched. With `expected_version`, the patch is a compare-and-set
+    (JobConflictError if the job moved on). Returns the new snapshot (with the
+    blob fields it patched loaded).
+    """
+    reserved = {"job_id", "version", "updated_at"}  # maintained by the store
+    unknown = set(fields) - set(PipelineJob.model_fields) | (reserved & set(fields))
+    if unknown:
+        raise ValueError(f"Cannot patch job fields: {', '.join(sorted(unknown))}")
+    fields = _validate_fields(fields)
+    with _jobs_lock:
+        current = _jobs.get(job_id)
+        if current is None:
+            raise ValueError(f"Job {job_id} not found")
+        if expected_version is not None and current.version != expected_version:
+            raise JobConflictError(job_id, expected_version, current.version)
+        updated = current.model_copy(
+            update={**fields, "version": current.version + 1, "updated_at": datetime.utcnow()}
+        )
+        _store(updated, replace_blobs=set(fields) & BLOB_ROOTS)
+        return _snapshot(job_id, blobs_for(fields))
 
 
-def update_job(job: PipelineJob):
-    _jobs[job.job_id] = job
+def mutate_job(job_id: str, mutate: Callable[[PipelineJob], None], retries: int = 5) -> PipelineJob:
+    """Read-modify-write for nested changes (e.g. one entry of a dict), retried on conflict."""
+    for attempt in range(retries):
+        job = get_job(job_id)
+        if job is None:
+            raise ValueError(f"Job {job_id} not found")
+        mutate(job)
+        try:
+            return update_job(job)
+        except JobConflictError:
+            if attempt == retries - 1:
+                raise
+    raise AssertionError("unreachable")
 
 
 # ── Step 1: Transcribe ──────────────────────────────────────────────────────
 
+_transcription_flights = SingleFlight("transcription")
+
+
+async def _preprocess_audio(audio_path: Path, mime_type: str) -> tuple[Path, str, "np.ndarray | None"]:
+    """
+    Trim silence, downmix to 16 kHz mono and transcode to Opus before Whisper.
+    Also returns the decoded PCM (None without preprocessing), which chunked
+    transcription reuses instead of decoding again.
+    Falls back to the original upload if preprocessing fails.
+    """
+    if not settings.audio_preprocess:
+        return audio_path, mime_type, None
+
+    from audio_processing import preprocess_for_transcription
+
+    processed_path = audio_path.with_name(f"{audio_path.stem}.processed.ogg")
+    try:
+        samples = await asyncio.to_thread(
+            preprocess_for_transcription,
+            audio_path,
+            processed_path,
+            settings.audio_preprocess_bitrate,
+        )
+    except Exception as e:
+        print(f"Audio preprocessing failed, sending original: {e}")
+        return audio_path, mime_type, None
+
+    return processed_path, "audio/ogg", samples
+
+
+async def _transcribe_upload(audio_path: Path, mime_type: str) -> tuple[str, int, int]:
+    """Preprocess + transcribe. Returns (transcript, original bytes, bytes sent to Whisper)."""
+    original_bytes = audio_path.stat().st_size
+    processed_path, processed_mime, samples = await _preprocess_audio(audio_path, mime_type)
+    print(f"Audio preprocessed: {original_bytes} → {processed_path.stat().st_size} bytes")
+    transcript, uploaded_bytes = await transcribe_audio(processed_path, processed_mime, samples=samples)
+    return transcript, original_bytes, uploaded_bytes
+
+
 async def run_transcription(job_id: str, audio_path: Path, mime_type: str) -> PipelineJob:
-    job = get_job(job_id)
-    if not job:
+    if not get_job(job_id, blobs=False):
         raise ValueError(f"Job {job_id} not found")
 
-    job.stage = PipelineStage.TRANSCRIBING
-    update_job(job)
+    patch_job(job_id, stage=PipelineStage.TRANSCRIBING)
 
     try:
-        transcript = await transcribe_audio(audio_path, mime_type)
-        job.transcript = transcript
-        update_job(job)
-        return job
+        # Identical memos uploaded concurrently are transcribed once
+        digest = await asyncio.to_thread(file_digest, audio_path)
+        key = content_key(
+            digest, mime_type, settings.audio_preprocess, settings.audio_preprocess_bitrate
+        )
+        transcript, original_bytes, uploaded_bytes = await _transcription_flights.do(
+            key, lambda: _transcribe_upload(audio_path, mime_type)
+        )
+        return patch_job(
+            job_id,
+            transcript=transcript,
+            audio_original_bytes=original_bytes,
+            audio_processed_bytes=uploaded_bytes,
+        )
+    except asyncio.CancelledError:
+        patch_job(job_id, stage=PipelineStage.FAILED, error="Transcription was cancelled")
+        raise
     except Exception as e:
-        job.stage = PipelineStage.FAILED
-        job.error = f"Transcription failed: {str(e)}"
-        update_job(job)
+        patch_job(job_id, stage=PipelineStage.FAILED, error=f"Transcription failed: {str(e)}")
         raise
 
 
@@ -88,107 +301,559 @@ async def run_script_generation(job_id: str) -> PipelineJob:
     if not job or not job.transcript:
         raise ValueError(f"Job {job_id} not found or missing transcript")
 
-    job.stage = PipelineStage.SCRIPTING
-    update_job(job)
-
+    # From here on the job is in a busy stage: every exit must leave it
     try:
+        # The previous check is cleared: a job in PRE_COMPLIANCE without one is still being checked
+        patch_job(job_id, stage=PipelineStage.SCRIPTING, pre_compliance=None)
+        await discard_speculation(job_id)  # a new script invalidates earlier speculative renders
         script = await generate_script(job.transcript)
-        job.script = script
+        _start_speculation(job_id, script)
 
         # Pre-compliance check
-        job.stage = PipelineStage.PRE_COMPLIANCE
-        update_job(job)
+        patch_job(job_id, script=script, stage=PipelineStage.PRE_COMPLIANCE)
 
         compliance = await check_script_compliance(script)
-        job.pre_compliance = compliance
 
         if not compliance.passed:
-            job.stage = PipelineStage.FAILED
-            job.error = (
-                f"Script failed compliance check: {', '.join(compliance.flagged_issues)}"
+            await discard_speculation(job_id)
+            return patch_job(
+                job_id,
+                pre_compliance=compliance,
+                stage=PipelineStage.FAILED,
+                error=f"Script failed compliance check: {', '.join(compliance.flagged_issues)}",
             )
+        return patch_job(job_id, pre_compliance=compliance)
 
-        update_job(job)
-        return job
-
+    except asyncio.CancelledError:
+        # Client disconnect / abandoned single-flight: don't leave the job "scripting"
+        patch_job(job_id, stage=PipelineStage.FAILED, error="Script generation was cancelled")
+        await discard_speculation(job_id)
+        raise
     except Exception as e:
-        job.stage = PipelineStage.FAILED
-        job.error = f"Script generation failed: {str(e)}"
-        update_job(job)
+        await discard_speculation(job_id)
+        patch_job(job_id, stage=PipelineStage.FAILED, error=f"Script generation failed: {str(e)}")
         raise
 
 
+# ── Speculative rendering (opt-in) ──────────────────────────────────────────
+#
+# With settings.speculative_scenes = K > 0, the first K scene images start
+# rendering as soon as the script is parsed, while pre-compliance runs and the
+# user reviews it. They are rendered into a quarantine directory and only
+# promoted by run_media_generation (i.e. after compliance passed and the user
+# approved) when their fingerprint still matches the approved script.
+
+class _Speculation:
+    def __init__(self, script: MarketingScript, quarantine_dir: Path):
+        self.quarantine_dir = quarantine_dir
+        self.started = time.time()
+        # fingerprint -> task rendering that scene's image into the quarantine
+        self.tasks: dict[str, asyncio.Task] = {}
+        for scene in script.scenes[: settings.speculative_scenes]:
+            fingerprint = scene_image_fingerprint(scene, script)
+            if fingerprint not in self.tasks:
+                task = asyncio.create_task(generate_scene_image(scene, script, quarantine_dir))
+                # Failures are harmless: the scene is simply rendered again after approval
+                task.add_done_callback(lambda t: t.cancelled() or t.exception())
+                self.tasks[fingerprint] = task
+
+    async def cancel(self):
+        for task in self.tasks.values():
+            task.cancel()
+        await asyncio.gather(*self.tasks.values(), return_exceptions=True)
+
+
+_speculations: dict[str, _Speculation] = {}
+
+
+def _start_speculation(job_id: str, script: MarketingScript):
+    if settings.speculative_scenes <= 0 or settings.api_only:
+        return
+    speculation = _Speculation(script, settings.output_dir / job_id / "speculative")
+    _speculations[job_id] = speculation
+    print(f"Speculatively rendering {len(speculation.tasks)} scene images for {job_id}")
+
+
+async def discard_speculation(job_id: str):
+    """Cancel in-flight speculative renders for a job and delete its quarantine."""
+    speculation = _speculations.pop(job_id, None)
+    if not speculation:
+        return
+    await speculation.cancel()
+    await asyncio.to_thread(shutil.rmtree, speculation.quarantine_dir, True)
+
+
+async def expire_speculations(max_age_seconds: float) -> int:
+    """
+    Discard speculations that will never be promoted: the job is gone or
+    finished, or its script was never approved within `max_age_seconds`.
+    Called by the GC pass. Returns the number discarded.
+    """
+    now = time.time()
+    expired = []
+    for job_id, speculation in list(_speculations.items()):
+        job = get_job(job_id, blobs=False)
+        if (
+            not job
+            or job.stage in (PipelineStage.COMPLETE, PipelineStage.FAILED)
+            or now - speculation.started > max_age_seconds
+        ):
+            expired.append(job_id)
+    for job_id in expired:
+        await discard_speculation(job_id)
+    return len(expired)
+
+
+async def _promote_speculation(job_id: str, renders: list[SceneRender], images_dir: Path) -> int:
+    """
+    Move quarantined images whose fingerprint matches a scene that still needs
+    rendering into images_dir, waiting for those still in flight. Speculative
+    renders the (possibly edited) script no longer needs are cancelled and
+    discarded with the quarantine. Returns the number of scenes promoted.
+    """
+    speculation = _speculations.get(job_id)
+    if not speculation:
+        return 0
+
+    promoted = 0
+    images_dir.mkdir(parents=True, exist_ok=True)
+    for render in renders:
+        task = speculation.tasks.get(render.image_fingerprint)
+        if render.image_path or task is None:
+            continue
+        try:
+            source = await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if not task.cancelled():
+                raise  # this render was cancelled, not the speculative task
+            continue  # discarded by a concurrent /script: render it normally
+        except Exception:
+            continue
+        target = images_dir / f"scene_{render.scene_number:02d}{source.suffix}"
+        try:
+            await asyncio.to_thread(detach, target)
+            await asyncio.to_thread(shutil.copyfile, source, target)
+        except FileNotFoundError:
+            continue  # quarantine deleted by a concurrent discard
+        render.image_path = str(target)
+        promoted += 1
+
+    await discard_speculation(job_id)
+    return promoted
+
+
+# ── Live narration ──────────────────────────────────────────────────────────
+#
+# While a render synthesizes narration, each segment's mp3 bytes are handed to
+# listeners (GET /pipeline/{job_id}/narration/{scene_number}) as ElevenLabs
+# sends them, so a scene can be heard before its segment file is complete.
+
+class _NarrationFeed:
+    def __init__(self, segments: dict[int, Path]):
+        self.segments = segments  # scene number -> segment file, while being synthesized
+        self.listeners: dict[int, list[asyncio.Queue]] = {}
+
+    async def on_chunk(self, scene_number: int, chunk: bytes):
+        if not chunk:  # the segment is done
+            self.segments.pop(scene_number, None)
+            for queue in self.listeners.pop(scene_number, []):
+                queue.put_nowait(None)
+            return
+        for queue in self.listeners.get(scene_number, []):
+            queue.put_nowait(chunk)
+
+
+_narration_feeds: dict[str, _NarrationFeed] = {}
+
+
+def listen_narration(job_id: str, scene_number: int) -> AsyncIterator[bytes] | None:
+    """
+    Live mp3 bytes of a segment the job is synthesizing right now (None if it
+    is not). A listener joining mid-segment hears the rest; a segment another
+    job's identical request synthesized is read from its file once done.
+    """
+    feed = _narration_feeds.get(job_id)
+    path = feed.segments.get(scene_number) if feed else None
+    if not path:
+        return None
+    queue: asyncio.Queue = asyncio.Queue()
+    feed.listeners.setdefault(scene_number, []).append(queue)
+
+    async def stream():
+        received = False
+        try:
+            while (chunk := await queue.get()) is not None:
+                received = True
+                yield chunk
+        finally:
+            if queue in feed.listeners.get(scene_number, []):
+                feed.listeners[scene_number].remove(queue)
+        if not received and path.exists():
+            yield await asyncio.to_thread(path.read_bytes)
+
+    return stream()
+
+
 # ── Step 3: Images + ElevenLabs voice + stitch ─────────────────────────────
 
+def _artifact_exists(path: str | None) -> bool:
+    return bool(path) and Path(path).exists()
+
+
+async def _record_artifacts(job_id: str, paths: list[Path]):
+    """Publish working files to the artifact store and note their keys on the job."""
+    keys = await publish_job_artifacts(job_id, paths)
+    if keys:
+        mutate_job(job_id, lambda j: j.artifacts.update(keys))
+
+
+async def _restore_artifacts(job: PipelineJob) -> int:
+    """
+    Fetch rendered scene files missing from this node's working dir back from
+    the artifact store (rendered elsewhere, or GC'd locally), so they are reused
+    instead of re-rendered. Returns the number restored.
+    """
+    missing = []
+    for render in job.scene_renders:
+        for path in (render.image_path, render.audio_path):
+            key = job.artifacts.get(job_artifact_name(job.job_id, path) or "") if path else None
+            if key and not Path(path).exists():
+                missing.append(fetch(key, Path(path)))
+    results = await asyncio.gather(*missing, return_exceptions=True)
+    return sum(1 for r in results if not isinstance(r, BaseException))
+
+
+def diff_scene_renders(
+    script: MarketingScript,
+    previous: list[SceneRender],
+) -> list[SceneRender]:
+    """
+    Scene-level diff of a script against what was last rendered for the job.
+
+    Returns one SceneRender per scene of `script`. An image/audio path is carried
+    over from any earlier scene with the same input fingerprint whose file is
+    still on disk, so inserting or reordering scenes re-renders nothing else;
+    otherwise it is left as None and must be re-rendered. Carried-over files
+    may still be named after their old scene (see _adopt_reused_files).
+    """
+    images = {r.image_fingerprint: r for r in previous if _artifact_exists(r.image_path)}
+    audio = {r.audio_fingerprint: r for r in previous if r.audio_fingerprint and _artifact_exists(r.audio_path)}
+    plan = []
+    for scene in script.scenes:
+        render = SceneRender(
+            scene_number=scene.scene_number,
+            image_fingerprint=scene_image_fingerprint(scene, script),
+            audio_fingerprint=scene_audio_fingerprint(scene),
+        )
+        if prev := images.get(render.image_fingerprint):
+            render.image_path = prev.image_path
+            render.image_width = prev.image_width
+            render.image_height = prev.image_height
+            render.image_bytes = prev.image_bytes
+        if render.audio_fingerprint and (prev := audio.get(render.audio_fingerprint)):
+            render.audio_path = prev.audio_path
+            render.audio_bytes = prev.audio_bytes
+            render.audio_ttfb_ms = prev.audio_ttfb_ms
+        plan.append(render)
+    return plan
+
+
+def _adopt_reused_files(renders: list[SceneRender]):
+    """
+    Copy files carried over from another scene number to the scene's own name
+    (scene_NN), because re-rendered scenes are written under their own names and
+    would otherwise overwrite a file that a moved scene still reuses. Every
+    source is copied before any target is replaced, so chains of shifted scenes
+    (2 → 3, 3 → 4, ...) are safe.
+    """
+    moves = []
+    for render in renders:
+        for field in ("image_path", "audio_path"):
+            source = getattr(render, field)
+            if not source:
+                continue
+            source = Path(source)
+            target = source.with_name(f"scene_{render.scene_number:02d}{source.suffix}")
+            if source != target:
+                moves.append((render, field, source, target))
+    staged = []
+    for render, field, source, target in moves:
+        tmp = target.with_name(target.name + ".tmp")
+        shutil.copyfile(source, tmp)
+        staged.append((render, field, tmp, target))
+    for render, field, tmp, target in staged:
+        tmp.replace(target)
+        setattr(render, field, str(target))
+
+
 async def run_media_generation(
     job_id: str,
     approved_script: MarketingScript | None = None,
 ) -> PipelineJob:
     """
     Generate scene images (Replicate) → narration (ElevenLabs) → stitch into video.
-    Accepts optional approved_script if the user edited it.
+    Accepts optional approved_script if the user edited it; only scenes whose
+    image or narration inputs changed since the last render are regenerated.
     """
-    job = get_job(job_id)
+    job = get_job(job_id, blobs=False)
     if not job:
         raise ValueError(f"Job {job_id} not found")
 
-    if approved_script:
-        job.script = approved_script
-
-    if not job.script:
-        raise ValueError(f"Job {job_id} has no script")
+    # /generate has already claimed the job (IMAGE_GEN): every exit must leave that stage
+    try:
+        full_script = approved_script or job.script
+        if not full_script:
+            raise ValueError(f"Job {job_id} has no script")
+
+        # Any earlier draft / outputs are stale once re-rendering starts
+        job = patch_job(job_id, script=full_script, draft_video_path=None, outputs={}, rendered_scenes=[])
+
+        # Render stack (moviepy/numpy) is loaded on first use, not at API startup
+        from video_stitcher import (
+            stitch_images_with_audio,
+            stitch_images_to_profiles,
+            concat_audio_segments,
+            draft_profile,
+            output_profiles,
+        )
 
-    job_dir = settings.output_dir / job.job_id
-    images_dir = job_dir / "images"
-    video_dir = job_dir / "clips"
+        job_dir = settings.output_dir / job.job_id
+        images_dir = job_dir / "images"
+        audio_dir = job_dir / "audio"
+        video_dir = job_dir / "clips"
+
+        restored = await _restore_artifacts(job)
+        if restored:
+            print(f"Restored {restored} scene files from the artifact store")
+        previous = job.scene_renders
+        renders = diff_scene_renders(full_script, previous)
+        await asyncio.to_thread(_adopt_reused_files, renders)
+        promoted = await _promote_speculation(job_id, renders, images_dir)
+        if promoted:
+            print(f"Promoted {promoted} speculatively rendered scene images")
+
+        # Degrade quality if the remaining work won't fit before the job's deadline
+        profiles = output_profiles()
+        plan = plan_for_deadline(job, full_script, renders, previous, profiles, draft_profile())
+        if plan.steps:
+            print(f"⏱ Job {job_id} degraded to meet its deadline: {', '.join(plan.steps)}")
+        script = trim_scenes(full_script, plan.max_scenes)
+        kept = {s.scene_number for s in script.scenes}
+        renders = [r for r in renders if r.scene_number in kept]
+        scenes = script.scenes
 
-    try:
         # ── Scene images (Replicate FLUX) ───────────────────────────
-        job.stage = PipelineStage.IMAGE_GEN
-        update_job(job)
-        image_paths = await generate_all_images(job.script, images_dir)
-        job.image_paths = [str(p) for p in image_paths]
-        update_job(job)
-
-        # ── Narration audio (ElevenLabs) ────────────────────────────
-        job.stage = PipelineStage.VIDEO_GEN
-        update_job(job)
+        patch_job(job_id, stage=PipelineStage.IMAGE_GEN, degradations=plan.steps)
+        if plan.has("cached_images"):
+            # Keep the scene's previous image (and its old fingerprint, so a later
+            # render without a deadline still refreshes it)
+            by_number = {r.scene_number: r for r in previous}
+            for i, render in enumerate(renders):
+                prev = by_number.get(render.scene_number)
+                if not render.image_path and prev and _artifact_exists(prev.image_path):
+                    renders[i] = render.model_copy(update={
+                        "image_fingerprint": prev.image_fingerprint,
+                        "image_path": prev.image_path,
+                        "image_width": prev.image_width,
+                        "image_height": prev.image_height,
+                        "image_bytes": prev.image_bytes,
+                    })
+        stale = [i for i, r in enumerate(renders) if not r.image_path]
+        print(f"Rendering {len(stale)}/{len(renders)} scene images (rest reused)")
+        started = time.perf_counter()
+        new_paths = await generate_all_images(
+            script, images_dir, scenes=[scenes[i] for i in stale]
+        )
+        observe("image", time.perf_counter() - started, len(stale))
+        for i, path in zip(stale, new_paths):
+            renders[i].image_path = str(path)
+        for render in renders:
+            if render.image_width is None:
+                render.image_width, render.image_height, render.image_bytes = read_image_info(
+                    Path(render.image_path)
+                )
+        image_paths = [Path(r.image_path) for r in renders]
+        # Scenes dropped by degradation keep their earlier renders for next time
+        patch_job(
+            job_id,
+            scene_renders=renders + [r for r in previous if r.scene_number not in kept],
+            image_paths=[str(p) for p in image_paths],
+        )
+        await _record_artifacts(job_id, image_paths)
+
+        # ── Narration audio (ElevenLabs, one segment per scene) ─────
+        patch_job(job_id, stage=PipelineStage.VIDEO_GEN)
+        stale = [i for i, r in enumerate(renders) if r.audio_fingerprint and not r.audio_path]
+        print(f"Rendering {len(stale)}/{len(renders)} narration segments (rest reused)")
+        started = time.perf_counter()
+        feed = _narration_feeds[job_id] = _NarrationFeed(
+            {scenes[i].scene_number: segment_path(audio_dir, scenes[i].scene_number) for i in stale}
+        )
+        try:
+            synthesized = await generate_all_scene_audio(
+                [scenes[i] for i in stale], audio_dir, on_chunk=feed.on_chunk
+            )
+        finally:
+            _narration_feeds.pop(job_id, None)
+        observe("tts", time.perf_counter() - started, len(stale))
+        for i, audio in zip(stale, synthesized):
+            renders[i].audio_path = audio.path
+            renders[i].audio_bytes = audio.total_bytes
+            renders[i].audio_ttfb_ms = audio.ttfb_ms
+        patch_job(job_id, scene_renders=renders + [r for r in previous if r.scene_number not in kept])
+
+        segments = [Path(r.audio_path) for r in renders if r.audio_path]
+        await _record_artifacts(job_id, segments)
+        if not segments:
+            raise ValueError("Script has no narration text")
         audio_path = job_dir / "narration.mp3"
-        await generate_script_audio(job.script, audio_path)
+        await concat_audio_segments(segments, audio_path)
 
         # ── Stitch images + audio into video ──────────────────────────
-        job.stage = PipelineStage.STITCHING
-        update_job(job)
+        patch_job(job_id, stage=PipelineStage.STITCHING)
         video_dir.mkdir(parents=True, exist_ok=True)
-        final_path = video_dir / "video.mp4"
-        await stitch_images_with_audio(
-            image_paths, job.script, audio_path, final_path
+
+        # Quick low-res draft first so users can watch something right away,
+        # then the final-quality encode at lower CPU priority.
+        draft = settings.draft_preview and not plan.has("skip_draft")
+
+        def report_progress(progress: EncodeProgress):
+            # Called from the encoder thread
+            _encode_progress[job_id] = progress
+
+        if draft:
+            draft_path = video_dir / "draft.mp4"
+            await stitch_images_with_audio(
+                image_paths, script, audio_path, draft_path, profile=draft_profile(),
+                on_progress=report_progress,
+            )
+            patch_job(job_id, draft_video_path=str(draft_path))
+            await _record_artifacts(job_id, [draft_path])
+
+        # Final video plus the other aspect ratios, all from one render pass
+        if plan.has("skip_extra_aspects"):
+            profiles = profiles[:1]
+        outputs = [
+            (plan.profile(profile), video_dir / ("video.mp4" if profile.name == "final" else f"video_{profile.name}.mp4"))
+            for profile in profiles
+        ]
+        started = time.perf_counter()
+        rendered = await stitch_images_to_profiles(
+            image_paths, script, audio_path, outputs,
+            low_priority=draft,
+            on_progress=report_progress,
+        )
+        observe(
+            "encode",
+            time.perf_counter() - started,
+            sum(encode_units(p, sum(s.duration_seconds for s in scenes)) for p, _ in outputs),
+        )
+        final_path = rendered["final"]
+        await _record_artifacts(job_id, list(rendered.values()))
+        patch_job(
+            job_id,
+            outputs={name: str(path) for name, path in rendered.items()},
+            rendered_scenes=[scene.scene_number for scene in scenes],
+            video_clip_paths=[str(final_path)],
+            final_video_path=str(final_path),
+            stage=PipelineStage.POST_COMPLIANCE,
         )
-        job.video_clip_paths = [str(final_path)]
-        job.final_video_path = str(final_path)
-        update_job(job)
 
         # ── Post-compliance check ────────────────────────────────────
-        job.stage = PipelineStage.POST_COMPLIANCE
-        update_job(job)
-        post_compliance = await check_video_compliance(job.script, str(final_path))
-        job.post_compliance = post_compliance
-
-        if post_compliance.passed:
-            job.stage = PipelineStage.COMPLETE
-        else:
-            job.stage = PipelineStage.FAILED
-            job.error = (
-                f"Final video failed compliance: {', '.join(post_compliance.flagged_issues)}"
+        post_compliance = await check_video_compliance(script, str(final_path))
+
+        if not post_compliance.passed:
+            return patch_job(
+                job_id,
+                post_compliance=post_compliance,
+                stage=PipelineStage.FAILED,
+                error=f"Final video failed compliance: {', '.join(post_compliance.flagged_issues)}",
             )
+        return patch_job(job_id, post_compliance=post_compliance, stage=PipelineStage.COMPLETE)
 
-        update_job(job)
-        return job
+    except asyncio.CancelledError:
+        patch_job(job_id, stage=PipelineStage.FAILED, error="Media generation was cancelled")
+        raise
+    except Exception as e:
+        patch_job(job_id, stage=PipelineStage.FAILED, error=f"Media generation failed: {str(e)}")
+        raise
+    finally:
+        _encode_progress.pop(job_id, None)
+
+
+# ── Narration variants (voice / language A/B tests) ─────────────────────────
+
+def create_variant(job: PipelineJob, request: VariantRequest) -> VideoVariant:
+    variant = VideoVariant(
+        variant_id=str(uuid.uuid4())[:8],
+        voice_id=request.voice_id or settings.elevenlabs_voice_id,
+        language=request.language,
+    )
+    mutate_job(job.job_id, lambda j: j.variants.__setitem__(variant.variant_id, variant))
+    return variant
+
+
+def _save_variant(job_id: str, variant: VideoVariant):
+    """Write one variant back without touching the job's other fields or variants."""
+    mutate_job(job_id, lambda j: j.variants.__setitem__(variant.variant_id, variant.model_copy(deep=True)))
+
+
+async def run_variant(job_id: str, variant_id: str) -> VideoVariant:
+    """
+    Re-voice a finished job: (translate →) per-scene TTS with the variant's voice →
+    mux the new narration onto every rendered output with the video stream copied.
+    Images and video encodes are reused as they are.
+    """
+    from video_stitcher import concat_audio_segments, remux_audio
+
+    job = get_job(job_id, blobs=False)
+    if not job or variant_id not in job.variants:
+        raise ValueError(f"Variant {variant_id} not found for job {job_id}")
+    variant = job.variants[variant_id]
+    variant.status = "rendering"
+    _save_variant(job_id, variant)
+
+    try:
+        script = job.script
+        if job.rendered_scenes:
+            # Degraded renders leave scenes out: narrate only those in the video
+            script = script.model_copy(update={
+                "scenes": [s for s in script.scenes if s.scene_number in job.rendered_scenes],
+            })
+        if variant.language:
+            script = await translate_narration(script, variant.language)
+            compliance = await check_script_compliance(script)
+            if not compliance.passed:
+                raise ValueError(
+                    f"Translated narration failed compliance: {', '.join(compliance.flagged_issues)}"
+                )
+
+        variant_dir = settings.output_dir / job_id / "variants" / variant_id
+        started = time.perf_counter()
+        voiced = [scene for scene in script.scenes if scene.narration.strip()]
+        if not voiced:
+            raise ValueError("Script has no narration text")
+        segments = await generate_all_scene_audio(voiced, variant_dir, voice_id=variant.voice_id)
+        audio_path = variant_dir / "narration.mp3"
+        await concat_audio_segments([Path(s.path) for s in segments], audio_path)
+        variant.tts_ms = (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        sources = job.outputs or {"final": job.final_video_path}
+        targets = {name: variant_dir / Path(video_path).name for name, video_path in sources.items()}
+        await remux_audio([(Path(sources[name]), targets[name]) for name in sources], audio_path)
+        variant.outputs.update({name: str(path) for name, path in targets.items()})
+        variant.remux_ms = (time.perf_counter() - started) * 1000
+        await _record_artifacts(job_id, [Path(p) for p in variant.outputs.values()])
+
+        variant.status = "complete"
+        _save_variant(job_id, variant)
+        return variant
 
     except Exception as e:
-        job.stage = PipelineStage.FAILED
-        job.error = f"Media generation failed: {str(e)}"
-        update_job(job)
+        variant.status = "failed"
+        variant.error = f"Variant failed: {str(e)}"
+        _save_variant(job_id, variant)
         raise
 
 
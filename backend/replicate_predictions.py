@@ -0,0 +1,185 @@
+"""
+Asynchronous Replicate predictions over the HTTP API.
+
+Instead of blocking a thread in replicate.run() per render, a prediction is
+created and then awaited without holding a thread:
+  - webhook: if settings.public_base_url and settings.replicate_webhook_secret
+    are set, Replicate POSTs the finished prediction to /webhooks/replicate,
+    which verifies its signature and resolves the waiting future. Webhooks are
+    never used without a secret: the payload names the output URL we download;
+  - polling: otherwise (or if the webhook doesn't arrive in time) the
+    prediction is polled with exponential backoff.
+Outputs are streamed to disk through the shared pooled HTTP client.
+
+Only creating the prediction takes a "replicate" scheduler slot: the slot caps
+concurrent API calls, not renders in flight, so it is released while FLUX
+renders and the webhook / polling wait runs.
+"""
+
+import asyncio
+import base64
+import hashlib
+import hmac
+import time
+from pathlib import Path
+from typing import Optional
+
+from config import settings
+from http_client import get_http_client
+from scheduler import provider_slot
+
+REPLICATE_API_URL = "https://api.replicate.com/v1"
+_TERMINAL_STATUSES = {"succeeded", "failed", "canceled"}
+_WEBHOOK_TOLERANCE_SECONDS = 300
+
+# prediction id -> future resolved by the webhook receiver
+_waiters: dict[str, asyncio.Future] = {}
+# webhooks that arrived before their waiter registered (prediction id -> payload)
+_early: dict[str, dict] = {}
+
+
+def _headers() -> dict:
+    if not settings.replicate_api_token:
+        raise ValueError("REPLICATE_API_TOKEN is not set")
+    return {
+        "Authorization": f"Bearer {settings.replicate_api_token}",
+        "Content-Type": "application/json",
+    }
+
+
+def webhook_url() -> Optional[str]:
+    """Webhook target, or None (polling) unless both the public URL and the signing secret are set."""
+    base = settings.public_base_url.rstrip("/")
+    return f"{base}/webhooks/replicate" if base and settings.replicate_webhook_secret else None
+
+
+async def create_prediction(model: str, input: dict) -> dict:
+    """Create a prediction for `owner/name` (official model) or `owner/name:version`."""
+    payload: dict = {"input": input}
+    if webhook_url():
+        payload["webhook"] = webhook_url()
+        payload["webhook_events_filter"] = ["completed"]
+
+    if ":" in model:
+        url = f"{REPLICATE_API_URL}/predictions"
+        payload["version"] = model.split(":", 1)[1]
+    else:
+        url = f"{REPLICATE_API_URL}/models/{model}/predictions"
+
+    resp = await get_http_client().post(url, headers=_headers(), json=payload)
+    resp.raise_for_status()
+    return resp.json()
+
+
+async def _poll(prediction: dict, deadline: float) -> dict:
+    delay = 0.5
+    while prediction.get("status") not in _TERMINAL_STATUSES:
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"Replicate prediction {prediction.get('id')} timed out")
+        await asyncio.sleep(delay)
+        delay = min(delay * 1.5, 5.0)
+        resp = await get_http_client().get(prediction["urls"]["get"], headers=_headers())
+        resp.raise_for_status()
+        prediction = resp.json()
+    return prediction
+
+
+async def wait_for_prediction(prediction: dict) -> dict:
+    """Wait for a prediction to finish (webhook first, polling as fallback)."""
+    deadline = time.monotonic() + settings.replicate_prediction_timeout
+    prediction_id = prediction["id"]
+
+    if prediction.get("status") not in _TERMINAL_STATUSES and webhook_url():
+        if prediction_id in _early:
+            prediction = _early.pop(prediction_id)
+        else:
+            future = asyncio.get_running_loop().create_future()
+            _waiters[prediction_id] = future
+            try:
+                prediction = await asyncio.wait_for(
+                    future, timeout=settings.replicate_webhook_wait_seconds
+                )
+            except asyncio.TimeoutError:
+                print(f"No webhook for prediction {prediction_id}, polling instead")
+            finally:
+                _waiters.pop(prediction_id, None)
+
+    prediction = await _poll(prediction, deadline)
+    if prediction["status"] != "succeeded":
+        raise RuntimeError(
+            f"Replicate prediction {prediction_id} {prediction['status']}: {prediction.get('error')}"
+        )
+    return prediction
+
+
+def resolve_webhook(payload: dict) -> bool:
+    """Hand a webhook payload to its waiter. Returns False for non-terminal/unknown events."""
+    prediction_id = payload.get("id")
+    if not prediction_id or payload.get("status") not in _TERMINAL_STATUSES:
+        return False
+    future = _waiters.get(prediction_id)
+    if future and not future.done():
+        future.set_result(payload)
+    else:
+        _early[prediction_id] = payload
+        if len(_early) > 1000:  # never-claimed payloads (e.g. after a restart)
+            _early.pop(next(iter(_early)))
+    return True
+
+
+def verify_webhook_signature(headers, body: bytes) -> bool:
+    """
+    Check Replicate's webhook signature (webhook-id / -timestamp / -signature headers,
+    HMAC-SHA256 keyed by settings.replicate_webhook_secret). Fails if no secret is set.
+    """
+    secret = settings.replicate_webhook_secret
+    if not secret:
+        return False
+    webhook_id = headers.get("webhook-id")
+    timestamp = headers.get("webhook-timestamp")
+    signatures = headers.get("webhook-signature", "")
+    if not webhook_id or not timestamp:
+        return False
+    try:
+        if abs(time.time() - int(timestamp)) > _WEBHOOK_TOLERANCE_SECONDS:
+            return False
+    except ValueError:
+        return False
+
+    try:
+        key = base64.b64decode(secret.split("_", 1)[1] if secret.startswith("whsec_") else secret)
+    except ValueError:
+        print("REPLICATE_WEBHOOK_SECRET is not valid base64; rejecting webhook")
+        return False
+    signed = f"{webhook_id}.{timestamp}.".encode() + body
+    expected = base64.b64encode(hmac.new(key, signed, hashlib.sha256).digest()).decode()
+    return any(
+        hmac.compare_digest(expected, sig.split(",", 1)[-1])
+        for sig in signatures.split()
+    )
+
+
+async def download_output(url: str, output_path: Path) -> Path:
+    """Stream a prediction output file to disk without buffering it in memory."""
+    import aiofiles
+
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    async with get_http_client().stream("GET", url) as resp:
+        resp.raise_for_status()
+        async with aiofiles.open(output_path, "wb") as f:
+            async for chunk in resp.aiter_bytes(64 * 1024):
+                await f.write(chunk)
+    return output_path
+
+
+async def run_prediction(model: str, input: dict, output_path: Path) -> Path:
+    """Create a prediction, wait for it and download its (first) output file."""
+    async with provider_slot("replicate"):
+        prediction = await create_prediction(model, input)
+    prediction = await wait_for_prediction(prediction)
+    output = prediction.get("output")
+    if isinstance(output, (list, tuple)):
+        output = output[0] if output else None
+    if not output:
+        raise RuntimeError(f"Replicate prediction {prediction['id']} returned no output")
+    return await download_output(output, output_path)
@@ -0,0 +1,244 @@
+"""
+Resumable voice-memo uploads (tus 1.0 core + creation + checksum extensions).
+
+  POST  /uploads          Upload-Length + Upload-Metadata (filename, filetype[, sha256])
+                          → 201, Location: /uploads/<id>; creates the pipeline job
+  PATCH /uploads/<id>     Upload-Offset + application/offset+octet-stream body
+                          [+ Upload-Checksum: sha256 <base64>] → 204, new Upload-Offset
+  HEAD  /uploads/<id>     current Upload-Offset, to resume after a dropped connection
+
+Bytes are appended to <upload_dir>/<job_id>_<filename>.part as they arrive, so a
+dropped connection keeps everything received so far (unless the chunk carried a
+checksum, in which case the whole chunk is rolled back). A running SHA-256 over
+the file is carried from chunk to chunk; when the client sent the digest of
+the whole file in the metadata, it is checked once the last byte arrives. The
+completed file is renamed to the regular upload path and transcription (or
+the full pipeline) starts.
+"""
+
+import asyncio
+import base64
+import binascii
+import hashlib
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import AsyncIterator, Optional
+
+from starlette.requests import ClientDisconnect
+
+from config import settings
+from pipeline import create_job, patch_job
+from schemas import PipelineStage, ResumableUpload
+
+TUS_VERSION = "1.0.0"
+CHECKSUM_ALGORITHMS = ("sha256", "sha1", "md5")
+UPLOAD_MODES = ("transcribe", "full")
+
+# Received bytes are written (and hashed) off the event loop in blocks of this size
+_FLUSH_BYTES = 1024 * 1024
+
+# In-memory upload store, like the job store in pipeline.py
+_uploads: dict[str, ResumableUpload] = {}
+_hashers: dict = {}  # upload_id -> running SHA-256 of bytes [0, offset)
+_locks: dict[str, asyncio.Lock] = {}
+
+
+class UploadError(Exception):
+    """A protocol error the API turns into an HTTP status."""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def parse_metadata(header: Optional[str]) -> dict[str, str]:
+    """Upload-Metadata: comma-separated `key base64(value)` pairs."""
+    metadata: dict[str, str] = {}
+    for pair in (header or "").split(","):
+        if not pair.strip():
+            continue
+        key, _, value = pair.strip().partition(" ")
+        try:
+            metadata[key] = base64.b64decode(value, validate=True).decode("utf-8") if value else ""
+        except (binascii.Error, UnicodeDecodeError):
+            raise UploadError(400, f"Invalid Upload-Metadata value for {key!r}")
+    return metadata
+
+
+def _part_path(upload: ResumableUpload) -> Path:
+    return settings.upload_dir / f"{upload.job_id}_{upload.filename}.part"
+
+
+def upload_path(upload: ResumableUpload) -> Path:
+    """Where the completed file lives: the same place /pipeline/upload saves to."""
+    return settings.upload_dir / f"{upload.job_id}_{upload.filename}"
+
+
+def create_upload(length: int, metadata: dict[str, str], mode: str = "transcribe") -> ResumableUpload:
+    if length <= 0:
+        # tus allows empty uploads, but an empty memo has nothing to transcribe
+        raise UploadError(400, "Upload-Length must be a positive integer")
+    if length > settings.upload_max_bytes:
+        raise UploadError(413, f"Upload exceeds {settings.upload_max_bytes} bytes")
+    if mode not in UPLOAD_MODES:
+        raise UploadError(400, f"mode must be one of: {', '.join(UPLOAD_MODES)}")
+    filename = Path(metadata.get("filename") or "memo").name
+    expected = (metadata.get("sha256") or "").lower() or None
+
+    job = create_job()
+    upload = ResumableUpload(
+        upload_id=uuid.uuid4().hex,
+        job_id=job.job_id,
+        filename=filename,
+        content_type=metadata.get("filetype") or metadata.get("content_type") or "audio/wav",
+        length=length,
+        mode=mode,
+        expected_sha256=expected,
+    )
+    settings.upload_dir.mkdir(parents=True, exist_ok=True)
+    _part_path(upload).touch()
+    _uploads[upload.upload_id] = upload
+    _hashers[upload.upload_id] = hashlib.sha256()
+    _locks[upload.upload_id] = asyncio.Lock()
+    return upload
+
+
+def get_upload(upload_id: str) -> ResumableUpload | None:
+    return _uploads.get(upload_id)
+
+
+def _parse_checksum(header: Optional[str]):
+    """Upload-Checksum: `<algorithm> <base64 digest>` → (hasher, expected digest) or None."""
+    if not header:
+        return None
+    algorithm, _, encoded = header.strip().partition(" ")
+    if algorithm.lower() not in CHECKSUM_ALGORITHMS:
+        raise UploadError(400, f"Unsupported checksum algorithm: {algorithm}")
+    try:
+        digest = base64.b64decode(encoded, validate=True)
+    except binascii.Error:
+        raise UploadError(400, "Upload-Checksum digest is not valid base64")
+    return hashlib.new(algorithm.lower()), digest
+
+
+async def append_chunk(
+    upload_id: str,
+    offset: int,
+    body: AsyncIterator[bytes],
+    checksum: Optional[str] = None,
+) -> ResumableUpload:
+    """
+    Append the request body at `offset` (must equal the upload's current offset).
+    Returns the upload with its new offset; `completed` is set once all bytes
+    are in and verified.
+    """
+    upload = _uploads.get(upload_id)
+    if upload is None:
+        raise UploadError(404, "Upload not found")
+    if upload.completed:
+        raise UploadError(409, "Upload already completed")
+    lock = _locks[upload_id]
+    if lock.locked():
+        raise UploadError(409, "Another PATCH for this upload is in progress")
+
+    async with lock:
+        if offset != upload.offset:
+            raise UploadError(409, f"Upload-Offset mismatch: server is at {upload.offset}")
+        chunk = _parse_checksum(checksum)
+        running = _hashers[upload_id].copy()  # committed only if the chunk is kept
+        remaining = upload.length - offset
+        received = 0
+        disconnected = False
+
+        def _write(f, data: bytes):
+            f.write(data)
+            running.update(data)
+            if chunk:
+                chunk[0].update(data)
+
+        def _open():
+            f = open(_part_path(upload), "r+b")
+            f.seek(offset)
+            f.truncate()
+            return f
+
+        f = await asyncio.to_thread(_open)
+        try:
+            buffer = bytearray()
+            try:
+                async for data in body:
+                    received += len(data)
+                    if received > remaining:
+                        raise UploadError(413, "Chunk extends past Upload-Length")
+                    buffer += data
+                    if len(buffer) >= _FLUSH_BYTES:
+                        await asyncio.to_thread(_write, f, bytes(buffer))
+                        buffer.clear()
+            except ClientDisconnect:
+                disconnected = True
+            except UploadError:
+                await asyncio.to_thread(f.truncate, offset)
+                raise
+            if buffer:
+                await asyncio.to_thread(_write, f, bytes(buffer))
+
+            if chunk and (disconnected or chunk[0].digest() != chunk[1]):
+                # A checksummed chunk is all or nothing
+                await asyncio.to_thread(f.truncate, offset)
+                if disconnected:
+                    return upload
+                raise UploadError(460, "Upload-Checksum mismatch")
+        finally:
+            await asyncio.to_thread(f.close)
+
+        _hashers[upload_id] = running
+        upload.offset = offset + received
+        upload.updated_at = datetime.utcnow()
+        if upload.offset == upload.length:
+            await _complete(upload)
+        return upload
+
+
+async def _complete(upload: ResumableUpload):
+    digest = _hashers.pop(upload.upload_id).hexdigest()
+    if upload.expected_sha256 and digest != upload.expected_sha256:
+        await asyncio.to_thread(_part_path(upload).unlink, missing_ok=True)
+        _drop(upload, error="Upload checksum mismatch: file corrupted in transit")
+        raise UploadError(460, "Whole-file sha256 does not match Upload-Metadata")
+    await asyncio.to_thread(_part_path(upload).replace, upload_path(upload))
+    upload.completed = True
+    print(f"⬆️ Upload {upload.upload_id} complete ({upload.length} bytes) → job {upload.job_id}")
+
+
+def _drop(upload: ResumableUpload, error: str):
+    """Forget an upload that can no longer complete and fail its job."""
+    _uploads.pop(upload.upload_id, None)
+    _hashers.pop(upload.upload_id, None)
+    _locks.pop(upload.upload_id, None)
+    patch_job(upload.job_id, stage=PipelineStage.FAILED, error=error)
+
+
+def expire_uploads(now: Optional[datetime] = None) -> int:
+    """
+    Fail the jobs of uploads idle for longer than upload_ttl_hours, so their
+    partial files are no longer protected from the disk GC. Returns the count.
+    Must run on the event loop, which owns the upload state; uploads with a
+    PATCH in progress are never expired.
+    """
+    now = now or datetime.utcnow()
+    expired = [
+        u for u in _uploads.values()
+        if not u.completed
+        and not _locks[u.upload_id].locked()
+        and (now - u.updated_at).total_seconds() > settings.upload_ttl_hours * 3600
+    ]
+    for upload in expired:
+        _drop(upload, error="Upload expired before it completed")
+    # Completed uploads are only kept for HEAD; their jobs have moved on
+    for upload in [u for u in _uploads.values() if u.completed]:
+        if (now - upload.updated_at).total_seconds() > settings.upload_ttl_hours * 3600:
+            _uploads.pop(upload.upload_id, None)
+            _locks.pop(upload.upload_id, None)
+    return len(expired)
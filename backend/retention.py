@@ -0,0 +1,244 @@
+"""
+Disk retention: garbage-collect uploads and job outputs.
+
+Artifacts are classified as
+  - upload:        raw voice memos in settings.upload_dir (<job_id>_<filename>,
+                   plus .part files of resumable uploads in progress)
+  - intermediate:  per-scene images, narration segments, narration.mp3, ...
+  - final:         rendered videos under <job_id>/clips/ (drafts are intermediates)
+                   and re-voiced variant videos under <job_id>/variants/<id>/
+
+Each class has its own TTL. If the total is still above the disk budget
+afterwards, the oldest artifacts are evicted, uploads and intermediates
+before finals. Files belonging to in-flight jobs are never touched; a job
+counts as in flight while it is not complete / failed and was written to
+within the intermediate TTL (older ones were abandoned, e.g. a script never
+reviewed). Protection is checked again right before each file is removed, so
+a job that starts rendering during a pass keeps its files.
+
+The local artifact store (artifact_store.py) is content-addressed and shared
+between jobs. Its entries go through the same pass, by the TTL of their kind
+(videos: final, everything else: intermediate) and under the same disk
+budget. An entry's age runs from its last publish or the last write to a job
+that points to it, whichever is later, and entries of in-flight jobs are never
+touched. Store entries are usually hard links of working files, so sizes are
+counted once per inode and a file only frees space when its last link goes.
+S3 buckets are left to the bucket's lifecycle rules.
+"""
+
+import asyncio
+import os
+import time
+from dataclasses import dataclass
+from datetime import timezone
+from pathlib import Path
+from typing import Optional
+
+from config import settings
+from schemas import PipelineStage, StorageGCReport
+
+# Eviction order under budget pressure (lowest first)
+_KIND_RANK = {"upload": 0, "intermediate": 1, "final": 2}
+
+_TERMINAL_STAGES = {PipelineStage.COMPLETE, PipelineStage.FAILED}
+
+_last_report: Optional[StorageGCReport] = None
+
+
+@dataclass
+class _Artifact:
+    path: Path
+    job_id: str  # "" for artifact store entries (owned by the jobs referencing `key`)
+    kind: str
+    size: int
+    mtime: float
+    inode: tuple[int, int] = (0, 0)
+    key: Optional[str] = None  # artifact store entries only
+
+
+def _classify(relative: Path) -> str:
+    if relative.parts and relative.parts[0] == "clips" and not relative.name.startswith("draft"):
+        return "final"
+    if relative.parts and relative.parts[0] == "variants" and relative.suffix == ".mp4":
+        return "final"
+    return "intermediate"
+
+
+def _scan() -> list[_Artifact]:
+    artifacts: list[_Artifact] = []
+
+    def add(path: Path, job_id: str, kind: str, key: Optional[str] = None):
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            return
+        artifacts.append(_Artifact(path, job_id, kind, st.st_size, st.st_mtime, (st.st_dev, st.st_ino), key))
+
+    if settings.upload_dir.exists():
+        for entry in os.scandir(settings.upload_dir):
+            if entry.is_file():
+                add(Path(entry.path), entry.name.split("_", 1)[0], "upload")
+
+    if settings.output_dir.exists():
+        for job_dir in settings.output_dir.iterdir():
+            if not job_dir.is_dir():
+                continue
+            for root, _, files in os.walk(job_dir):
+                for name in files:
+                    path = Path(root) / name
+                    add(path, job_dir.name, _classify(path.relative_to(job_dir)))
+
+    store_root = settings.artifact_dir / "sha256"
+    if settings.artifact_backend == "local" and store_root.exists():
+        for root, _, files in os.walk(store_root):
+            for name in files:
+                path = Path(root) / name
+                kind = "final" if path.suffix == ".mp4" else "intermediate"
+                add(path, "", kind, key=path.relative_to(settings.artifact_dir).as_posix())
+
+    return artifacts
+
+
+def _disk_usage(artifacts) -> int:
+    """Bytes on disk: hard links of one file are counted once."""
+    return sum({a.inode: a.size for a in artifacts}.values())
+
+
+def _in_flight(activity, now: float) -> bool:
+    """Whether a job's (stage, last write) keeps its files; abandoned jobs age out."""
+    if activity is None:
+        return False
+    stage, updated_at = activity
+    idle = now - updated_at.replace(tzinfo=timezone.utc).timestamp()
+    return stage not in _TERMINAL_STAGES and idle <= _ttl_seconds("intermediate")
+
+
+def _ttl_seconds(kind: str) -> float:
+    hours = {
+        "upload": settings.upload_ttl_hours,
+        "intermediate": settings.intermediate_ttl_hours,
+        "final": settings.final_ttl_hours,
+    }[kind]
+    return hours * 3600
+
+
+def _remove_empty_dirs(root: Path):
+    if not root.exists():
+        return
+    for dirpath, _, _ in sorted(os.walk(root), key=lambda w: len(w[0]), reverse=True):
+        path = Path(dirpath)
+        if path != root:
+            try:
+                path.rmdir()
+            except OSError:
+                pass  # not empty
+
+
+def collect_garbage_sync(now: Optional[float] = None) -> StorageGCReport:
+    """Run one GC pass: TTL expiry first, then the disk budget."""
+    from artifact_store import forget
+    from pipeline import artifact_references, job_activity, job_activity_of
+
+    now = now or time.time()
+    activity = job_activity()
+    references = artifact_references()
+    protected = {job_id for job_id, a in activity.items() if _in_flight(a, now)}
+    artifacts = _scan()
+    report = StorageGCReport(bytes_before=_disk_usage(artifacts))
+    deleted_keys: list[str] = []
+
+    def owners(artifact: _Artifact) -> set[str]:
+        return references.get(artifact.key, set()) if artifact.key else {artifact.job_id}
+
+    def last_used(artifact: _Artifact) -> float:
+        """Store entries stay fresh while a job pointing to them is written to."""
+        if not artifact.key:
+            return artifact.mtime
+        writes = [activity[j][1].replace(tzinfo=timezone.utc).timestamp() for j in owners(artifact) if j in activity]
+        return max([artifact.mtime, *writes])
+
+    def _delete(artifact: _Artifact) -> int:
+        """Unlink; returns the bytes freed (0 while other hard links remain, or if kept)."""
+        # The job may have started rendering again (e.g. /generate) since the pass began
+        if any(_in_flight(job_activity_of(j), now) for j in owners(artifact)):
+            protected.update(owners(artifact))
+            report.files_protected += 1
+            return 0
+        try:
+            st = artifact.path.stat()
+            if artifact.key and st.st_mtime > artifact.mtime:
+                return 0  # re-published since the scan
+            artifact.path.unlink()
+        except FileNotFoundError:
+            return 0
+        report.files_deleted += 1
+        if artifact.key:
+            deleted_keys.append(artifact.key)
+        if st.st_nlink > 1:
+            return 0
+        kind = "artifact" if artifact.key else artifact.kind
+        report.bytes_reclaimed += artifact.size
+        report.reclaimed_by_kind[kind] = report.reclaimed_by_kind.get(kind, 0) + artifact.size
+        return artifact.size
+
+    remaining: list[_Artifact] = []
+    for artifact in artifacts:
+        if owners(artifact) & protected:
+            report.files_protected += 1
+            remaining.append(artifact)
+        elif now - last_used(artifact) > _ttl_seconds(artifact.kind):
+            _delete(artifact)
+        else:
+            remaining.append(artifact)
+
+    budget = settings.disk_budget_mb * 1024 * 1024
+    total = _disk_usage(remaining)
+    if budget and total > budget:
+        candidates = sorted(
+            (a for a in remaining if not owners(a) & protected),
+            key=lambda a: (_KIND_RANK[a.kind], last_used(a)),
+        )
+        for artifact in candidates:
+            if total <= budget:
+                break
+            total -= _delete(artifact)
+
+    forget(deleted_keys)
+    _remove_empty_dirs(settings.output_dir)
+    _remove_empty_dirs(settings.artifact_dir / "sha256")
+    report.bytes_after = report.bytes_before - report.bytes_reclaimed
+    return report
+
+
+async def collect_garbage() -> StorageGCReport:
+    global _last_report
+    from pipeline import expire_speculations
+    from resumable_upload import expire_uploads
+
+    # On the loop, which owns their state: abandoned resumable uploads stop
+    # protecting their partial files, and speculative renders nobody approved
+    # stop holding tasks and quarantine dirs
+    expire_uploads()
+    await expire_speculations(_ttl_seconds("intermediate"))
+    report = await asyncio.to_thread(collect_garbage_sync)
+    _last_report = report
+    if report.files_deleted:
+        print(
+            f"🧹 GC reclaimed {report.bytes_reclaimed / 1_048_576:.1f} MB "
+            f"({report.files_deleted} files), {report.bytes_after / 1_048_576:.1f} MB in use"
+        )
+    return report
+
+
+def last_report() -> Optional[StorageGCReport]:
+    return _last_report
+
+
+async def run_gc_loop():
+    """Background task: collect garbage every settings.gc_interval_seconds."""
+    while True:
+        try:
+            await collect_garbage()
+        except Exception as e:
+            print(f"GC pass failed: {e}")
+        await asyncio.sleep(settings.gc_interval_seconds)
@@ -0,0 +1,298 @@
+"""
+Fair scheduling of provider calls and stitch workers.
+
+Every external API and the stitch workers have a process-wide limiter with a
+fixed number of slots (settings.<resource>_max_concurrency). Callers wait
+for a slot with
+
+    async with provider_slot("replicate"):
+        ...
+
+Waiters are ordered by weighted fair queuing over flows of (lane, tenant):
+  - lanes: "interactive" (editor calls: upload, script, generate) and
+    "batch" (/pipeline/full, batches, variants, the bulk CLI), weighted by
+    settings.scheduler_<lane>_weight;
+  - tenants: each client (X-Tenant-ID header, else client address) is its own
+    flow within its lane, so one tenant's flood doesn't starve the others.
+settings.scheduler_interactive_reserved slots of each limiter are kept for
+interactive work, so a batch flood can never occupy all of them.
+
+Lane and tenant travel with the asyncio context (contextvars), so tasks and
+threads started by a job inherit them. Work shared by several callers
+(single-flight) runs in a FlightLane: the most urgent lane among its current
+waiters, so an interactive caller joining batch work promotes it, including
+provider calls already queued.
+"""
+
+import asyncio
+import contextvars
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, TypeVar
+
+from config import settings
+
+T = TypeVar("T")
+
+PROVIDERS = ("openai", "anthropic", "replicate", "elevenlabs", "whitecircle")
+RESOURCES = PROVIDERS + ("stitch",)
+LANES = ("interactive", "batch")
+
+_lane: contextvars.ContextVar["str | FlightLane"] = contextvars.ContextVar("lane", default="interactive")
+_tenant: contextvars.ContextVar[str] = contextvars.ContextVar("tenant", default="default")
+
+# Queue-wait samples kept per lane for percentiles
+_WAIT_SAMPLES = 1000
+
+
+# ── Lane / tenant context ────────────────────────────────────────────────────
+
+def current_lane() -> str:
+    lane = _lane.get()
+    return lane.lane if isinstance(lane, FlightLane) else lane
+
+
+def current_tenant() -> str:
+    return _tenant.get()
+
+
+def set_lane(lane: str):
+    if lane not in LANES:
+        raise ValueError(f"Unknown lane: {lane}")
+    _lane.set(lane)
+
+
+def set_tenant(tenant: str):
+    _tenant.set(tenant or "default")
+
+
+async def run_in_lane(lane: str, fn: Callable[..., Awaitable[T]], *args, **kwargs) -> T:
+    """Await fn(*args, **kwargs) with every provider call it makes scheduled in `lane`."""
+    set_lane(lane)
+    return await fn(*args, **kwargs)
+
+
+class FlightLane:
+    """Lane of work shared by several callers: the most urgent lane among its waiters."""
+
+    def __init__(self):
+        self._waiters = {lane: 0 for lane in LANES}
+
+    @property
+    def lane(self) -> str:
+        # LANES is ordered most urgent first
+        return next((lane for lane in LANES if self._waiters[lane]), LANES[-1])
+
+    def join(self, lane: str):
+        before = self.lane
+        self._waiters[lane] += 1
+        if self.lane != before:
+            for limiter in _limiters.values():
+                limiter.promote(self)
+
+    def leave(self, lane: str):
+        self._waiters[lane] -= 1
+
+
+def create_shared_task(fn: Callable[[], Awaitable[T]], lane: FlightLane) -> asyncio.Task:
+    """Start fn() in a task whose provider calls are scheduled in `lane` (as it changes)."""
+    context = contextvars.copy_context()
+    context.run(_lane.set, lane)
+    return asyncio.create_task(fn(), context=context)
+
+
+def _lane_weight(lane: str) -> float:
+    return max(getattr(settings, f"scheduler_{lane}_weight"), 1e-3)
+
+
+# ── Limiter ─────────────────────────────────────────────────────────────────
+
+class _Waiter:
+    __slots__ = ("lane", "tenant", "owner", "start", "finish", "future", "queued")
+
+    def __init__(self, lane: str, tenant: str, owner: "FlightLane | None"):
+        self.lane = lane
+        self.tenant = tenant
+        self.owner = owner  # shared work whose lane may be promoted while queued
+        self.start = self.finish = 0.0  # fair-queuing tags, set when enqueued
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.queued = time.perf_counter()
+
+
+class _LaneStats:
+    def __init__(self):
+        self.calls = 0
+        self.waiting = 0
+        self.in_flight = 0
+        self.waits: deque[float] = deque(maxlen=_WAIT_SAMPLES)
+
+    def snapshot(self) -> dict:
+        waits = sorted(self.waits)
+
+        def pct(p: float) -> float:
+            return round(waits[min(len(waits) - 1, int(p * len(waits)))] * 1000, 1) if waits else 0.0
+
+        return {
+            "calls": self.calls,
+            "waiting": self.waiting,
+            "in_flight": self.in_flight,
+            "avg_wait_ms": round(sum(waits) / len(waits) * 1000, 1) if waits else 0.0,
+            "p50_wait_ms": pct(0.50),
+            "p95_wait_ms": pct(0.95),
+        }
+
+
+class ProviderLimiter:
+    """Slots for one resource, handed out by weighted fair queuing over (lane, tenant)."""
+
+    def __init__(self, name: str, limit: int, reserved: int = 0):
+        self.name = name
+        self.limit = limit
+        self.reserved = max(0, min(reserved, limit - 1))  # slots only interactive work may use
+        self.in_flight = 0
+        self.calls = 0
+        self._queues: dict[tuple[str, str], deque[_Waiter]] = {}
+        self._last_finish: dict[tuple[str, str], float] = {}
+        self._virtual_time = 0.0
+        self.lanes = {lane: _LaneStats() for lane in LANES}
+
+    @property
+    def waiting(self) -> int:
+        return sum(len(q) for q in self._queues.values())
+
+    def _has_room(self, lane: str) -> bool:
+        if lane == "interactive":
+            return self.in_flight < self.limit
+        return self.in_flight < self.limit - self.reserved
+
+    def _dispatch(self):
+        """Grant free slots to the queued waiters with the smallest finish tags."""
+        while True:
+            best_flow, best = None, None
+            for flow, queue in self._queues.items():
+                head = queue[0]
+                if self._has_room(head.lane) and (best is None or head.finish < best.finish):
+                    best_flow, best = flow, head
+            if best is None:
+                return
+            queue = self._queues[best_flow]
+            queue.popleft()
+            if not queue:
+                del self._queues[best_flow]
+                self._last_finish.pop(best_flow, None)
+            self._virtual_time = best.start
+            self._occupy(best.lane)
+            self.lanes[best.lane].waiting -= 1
+            self.lanes[best.lane].waits.append(time.perf_counter() - best.queued)
+            best.future.set_result(None)
+
+    def _occupy(self, lane: str):
+        self.in_flight += 1
+        self.calls += 1
+        self.lanes[lane].in_flight += 1
+        self.lanes[lane].calls += 1
+
+    def _release(self, lane: str):
+        self.in_flight -= 1
+        self.lanes[lane].in_flight -= 1
+        self._dispatch()
+
+    def _enqueue(self, waiter: _Waiter):
+        flow = (waiter.lane, waiter.tenant)
+        waiter.start = max(self._virtual_time, self._last_finish.get(flow, 0.0))
+        waiter.finish = waiter.start + 1 / _lane_weight(waiter.lane)
+        self._last_finish[flow] = waiter.finish
+        self._queues.setdefault(flow, deque()).append(waiter)
+        self.lanes[waiter.lane].waiting += 1
+
+    def _dequeue(self, waiter: _Waiter) -> bool:
+        flow = (waiter.lane, waiter.tenant)
+        queue = self._queues.get(flow)
+        if not queue or waiter not in queue:
+            return False
+        queue.remove(waiter)
+        if not queue:
+            del self._queues[flow]
+        self.lanes[waiter.lane].waiting -= 1
+        return True
+
+    def promote(self, owner: FlightLane):
+        """Move queued waiters of shared work into its (newly more urgent) lane."""
+        moved = [
+            w for queue in self._queues.values() for w in queue
+            if w.owner is owner and w.lane != owner.lane
+        ]
+        for waiter in moved:
+            self._dequeue(waiter)
+            waiter.lane = owner.lane
+            self._enqueue(waiter)
+        if moved:
+            self._dispatch()
+
+    async def _acquire(self, lane: str, tenant: str, owner: FlightLane | None = None) -> str:
+        """Wait for a slot; returns the lane it was granted in (promotion may change it)."""
+        if not self._queues and self._has_room(lane):
+            self._occupy(lane)
+            self.lanes[lane].waits.append(0.0)
+            return lane
+
+        waiter = _Waiter(lane, tenant, owner)
+        self._enqueue(waiter)
+        self._dispatch()
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                self._release(waiter.lane)  # granted just as we were cancelled
+            else:
+                self._dequeue(waiter)
+            raise
+        return waiter.lane
+
+    @asynccontextmanager
+    async def slot(self, lane: str | None = None, tenant: str | None = None):
+        owner = None
+        if lane is None:
+            context_lane = _lane.get()
+            owner = context_lane if isinstance(context_lane, FlightLane) else None
+            lane = current_lane()
+        lane = await self._acquire(lane, tenant or current_tenant(), owner)
+        try:
+            yield
+        finally:
+            self._release(lane)
+
+    def stats(self) -> dict:
+        return {
+            "limit": self.limit,
+            "reserved_interactive": self.reserved,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "calls": self.calls,
+            "lanes": {lane: stats.snapshot() for lane, stats in self.lanes.items()},
+        }
+
+
+_limiters: dict[str, ProviderLimiter] = {}
+
+
+def get_limiter(resource: str) -> ProviderLimiter:
+    limiter = _limiters.get(resource)
+    if limiter is None:
+        if resource not in RESOURCES:
+            raise ValueError(f"Unknown resource: {resource}")
+        limit = max(1, getattr(settings, f"{resource}_max_concurrency"))
+        limiter = _limiters[resource] = ProviderLimiter(
+            resource, limit, reserved=settings.scheduler_interactive_reserved
+        )
+    return limiter
+
+
+def provider_slot(resource: str):
+    """Async context manager holding one slot of a provider (or "stitch") in the current lane."""
+    return get_limiter(resource).slot()
+
+
+def provider_stats() -> dict[str, dict]:
+    return {name: get_limiter(name).stats() for name in RESOURCES}
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr
 from enum import Enum
 from typing import Optional
 from datetime import datetime
@@ -45,18 +45,117 @@ class MarketingScript(BaseModel):
     cta: str = ""  # call to action
 
 
+class SynthesizedAudio(BaseModel):
+    """One TTS result: where it was written and how the stream behaved."""
+    path: str
+    ttfb_ms: float
+    total_bytes: int
+    duration_ms: float
+
+
+class SceneRender(BaseModel):
+    """Rendered artifacts for one scene, keyed by fingerprints of their inputs."""
+    scene_number: int
+    image_fingerprint: str = ""
+    image_path: Optional[str] = None
+    image_width: Optional[int] = None
+    image_height: Optional[int] = None
+    image_bytes: Optional[int] = None
+    audio_fingerprint: str = ""
+    audio_path: Optional[str] = None
+    audio_bytes: Optional[int] = None
+    audio_ttfb_ms: Optional[float] = None
+
+
+class RenderProfile(BaseModel):
+    """Encoder settings for one rendered output."""
+    name: str
+    width: int
+    height: int
+    fps: int = 24
+    preset: str = "medium"
+    crf: int = 23
+
+
+class VideoVariant(BaseModel):
+    """
+    Narration-only variant of a finished video (other voice and/or language):
+    new TTS muxed onto the job's existing video streams without re-encoding them.
+    """
+    variant_id: str
+    voice_id: str
+    language: Optional[str] = None
+    status: str = "pending"  # pending | rendering | complete | failed
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    outputs: dict[str, str] = {}  # render profile name -> video path
+    tts_ms: Optional[float] = None
+    remux_ms: Optional[float] = None
+    error: Optional[str] = None
+
+
+class EncodeProgress(BaseModel):
+    """Live progress of the running video encode, reported by the stitcher."""
+    output: str  # "draft" or "final" (the final pass renders every aspect ratio)
+    frames: int = 0
+    total_frames: int = 0
+    percent: float = 0
+    fps: float = 0  # frames encoded per wall-clock second
+    eta_seconds: Optional[float] = None
+    elapsed_seconds: float = 0
+    done: bool = False
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class IdempotencyRecord(BaseModel):
+    """Response sent for an Idempotency-Key, replayed to retries of the same request."""
+    operation: str  # full | script | generate
+    fingerprint: str  # hash of the request; the key may not be reused for another one
+    status_code: int
+    response: dict
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+
 class PipelineJob(BaseModel):
     job_id: str
+    version: int = 0  # bumped on every write to the job store
     stage: PipelineStage = PipelineStage.UPLOADED
     created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)  # last write to the job store
     transcript: Optional[str] = None
+    audio_original_bytes: Optional[int] = None
+    audio_processed_bytes: Optional[int] = None  # bytes sent to Whisper (all chunks when split)
     script: Optional[MarketingScript] = None
     pre_compliance: Optional[ComplianceResult] = None
     post_compliance: Optional[ComplianceResult] = None
     image_paths: list[str] = []
+    scene_renders: list[SceneRender] = []
     video_clip_paths: list[str] = []
+    draft_video_path: Optional[str] = None
     final_video_path: Optional[str] = None
+    outputs: dict[str, str] = {}  # render profile name -> video path ("final", "9x16", ...)
+    rendered_scenes: list[int] = []  # scene numbers in the outputs (degraded renders drop some)
+    artifacts: dict[str, str] = {}  # path relative to the job dir -> artifact store key
+    variants: dict[str, VideoVariant] = {}
+    deadline: Optional[datetime] = None  # UTC; quality is degraded to meet it
+    degradations: list[str] = []  # ladder steps applied (see degradation.py)
+    idempotency: dict[str, IdempotencyRecord] = {}  # tenant-scoped Idempotency-Key -> record
     error: Optional[str] = None
+    # False for store snapshots read without their large fields (see job_storage.py)
+    _blobs_loaded: bool = PrivateAttr(default=True)
+
+
+class BatchItem(BaseModel):
+    job_id: str
+    filename: str
+
+
+class BatchJob(BaseModel):
+    """A group of memos submitted together; each item is a normal pipeline job."""
+    batch_id: str
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    items: list[BatchItem] = []
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
 
 
 # ── API Request/Response ─────────────────────────────────────────────────────
@@ -70,6 +169,7 @@ class ScriptResponse(BaseModel):
     job_id: str
     script: MarketingScript
     compliance: ComplianceResult
+    version: int = 0  # send as If-Match with the edited script
 
 
 class GenerateRequest(BaseModel):
@@ -77,17 +177,71 @@ class GenerateRequest(BaseModel):
     approved_script: Optional[MarketingScript] = None
 
 
+class VariantRequest(BaseModel):
+    """New narration for a finished video; at least one of voice_id / language."""
+    voice_id: Optional[str] = None  # ElevenLabs voice (default: settings.elevenlabs_voice_id)
+    language: Optional[str] = None  # e.g. "German"; narration is translated first
+
+
 class JobStatusResponse(BaseModel):
     job_id: str
     stage: PipelineStage
     progress_detail: str = ""
     final_video_url: Optional[str] = None
+    draft_video_url: Optional[str] = None
+    output_urls: dict[str, str] = {}
+    degradations: list[str] = []
+    encode_progress: Optional[EncodeProgress] = None
+    poll_after_seconds: float = 2  # suggested delay before the next status poll
+    error: Optional[str] = None
+    version: int = 0
+
+
+class BatchItemStatus(BaseModel):
+    job_id: str
+    filename: str
+    stage: PipelineStage
+    video_url: Optional[str] = None
     error: Optional[str] = None
 
 
+class BatchStatusResponse(BaseModel):
+    batch_id: str
+    total: int
+    completed: int = 0
+    failed: int = 0
+    in_progress: int = 0
+    stage_counts: dict[str, int] = {}
+    elapsed_seconds: Optional[float] = None
+    items: list[BatchItemStatus] = []
+
+
 class VideoSummary(BaseModel):
     job_id: str
     title: str = ""
     stage: PipelineStage
     created_at: datetime
     video_url: Optional[str] = None
+
+
+class StorageGCReport(BaseModel):
+    files_deleted: int = 0
+    files_protected: int = 0
+    bytes_before: int = 0
+    bytes_reclaimed: int = 0
+    bytes_after: int = 0
+    reclaimed_by_kind: dict[str, int] = {}
+
+
+class ResumableUpload(BaseModel):
+    upload_id: str
+    job_id: str
+    filename: str
+    content_type: str
+    length: int
+    offset: int = 0
+    mode: str = "transcribe"  # what starts when the last byte arrives: transcribe | full
+    expected_sha256: Optional[str] = None  # hex digest of the whole file, if the client sent one
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    completed: bool = False
@@ -0,0 +1,103 @@
+"""
+Single-flight request coalescing.
+
+Concurrent calls with the same key share one execution: the first caller
+starts the work, later callers await the same result. Keys are content
+hashes of a stage's inputs (see content_key), so identical memos, scripts,
+prompts and narrations submitted at the same time hit the providers once.
+Nothing is cached after the flight lands; this only de-duplicates work that
+is in progress. The shared work is scheduled in the most urgent lane among its
+callers (scheduler.FlightLane), so joining it never costs an interactive
+caller batch priority.
+"""
+
+import asyncio
+import hashlib
+import shutil
+from pathlib import Path
+from typing import Awaitable, Callable, TypeVar
+
+from scheduler import FlightLane, create_shared_task, current_lane
+
+T = TypeVar("T")
+
+
+def content_key(*parts: str | bytes) -> str:
+    """Stable sha256 over the given parts (NUL-separated)."""
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(part if isinstance(part, bytes) else str(part).encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def file_digest(path: Path) -> str:
+    """sha256 of a file's bytes, read in 1 MiB blocks."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class _Flight:
+    def __init__(self, fn: Callable[[], Awaitable[T]]):
+        self.lane = FlightLane()
+        self.task = create_shared_task(fn, self.lane)
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Per-stage registry of in-flight work keyed by content hash."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._flights: dict[str, _Flight] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run fn() once per key among concurrent callers and return its result to all.
+
+        The work runs in its own task, so one caller being cancelled doesn't cancel
+        it for the others; it is cancelled only when the last waiter goes away.
+        """
+        self.calls += 1
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight(fn)
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _, k=key, f=flight: self._forget(k, f))
+        else:
+            self.coalesced += 1
+            print(f"⤵ {self.name}: joined in-flight work {key[:12]}")
+
+        lane = current_lane()
+        flight.waiters += 1
+        flight.lane.join(lane)
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            flight.lane.leave(lane)
+            if flight.waiters == 0 and not flight.task.done():
+                flight.task.cancel()
+
+    def _forget(self, key: str, flight: _Flight):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+    def stats(self) -> dict[str, int]:
+        return {"calls": self.calls, "coalesced": self.coalesced, "in_flight": len(self._flights)}
+
+
+async def fan_out_file(source: Path, destination: Path) -> Path:
+    """Give a follower its own copy of a file produced by another job's flight."""
+    if source.resolve() == destination.resolve():
+        return destination
+    destination.parent.mkdir(parents=True, exist_ok=True)
+    # Unlink first: the old file may be hard-linked into the artifact store
+    await asyncio.to_thread(destination.unlink, missing_ok=True)
+    await asyncio.to_thread(shutil.copyfile, source, destination)
+    return destination
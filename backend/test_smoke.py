@@ -53,9 +53,1429 @@ def test_status_404_for_unknown_job():
     print("✓ GET /pipeline/{id}/status 404 for unknown job")
 
 
+def test_diff_scene_renders_reuses_unchanged_scenes():
+    """Editing one scene only invalidates that scene; inserting one re-renders nothing else."""
+    import tempfile
+    from pipeline import _adopt_reused_files, diff_scene_renders
+    from schemas import MarketingScript, SceneScript
+
+    def scene(n: int, text: str) -> SceneScript:
+        return SceneScript(scene_number=n, duration_seconds=5, narration=f"line {text}", visual_description=f"v{text}")
+
+    script = MarketingScript(
+        title="t", target_audience="a", tone="warm", total_duration_seconds=15,
+        scenes=[scene(n, str(n)) for n in (1, 2, 3)],
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp_path = Path(tmp)
+        renders = diff_scene_renders(script, [])
+        for r in renders:
+            r.image_path = str(tmp_path / f"scene_{r.scene_number:02d}.png")
+            r.audio_path = str(tmp_path / f"scene_{r.scene_number:02d}.mp3")
+            Path(r.image_path).write_bytes(f"image {r.scene_number}".encode())
+            Path(r.audio_path).write_bytes(f"audio {r.scene_number}".encode())
+
+        edited = script.model_copy(deep=True)
+        edited.scenes[1].narration = "a new line"
+        plan = diff_scene_renders(edited, renders)
+        assert [r.image_path is not None for r in plan] == [True, True, True]
+        assert [r.audio_path is not None for r in plan] == [True, False, True]
+
+        # A scene inserted at position 2 shifts 2 → 3 and 3 → 4, which keep their files
+        inserted = script.model_copy(update={
+            "scenes": [scene(1, "1"), scene(2, "new"), scene(3, "2"), scene(4, "3")],
+        })
+        plan = diff_scene_renders(inserted, renders)
+        assert [r.image_path is not None for r in plan] == [True, False, True, True]
+        _adopt_reused_files(plan)
+        assert [Path(r.image_path).name for r in plan if r.image_path] == ["scene_01.png", "scene_03.png", "scene_04.png"]
+        assert [Path(r.audio_path).read_text() for r in plan if r.audio_path] == ["audio 1", "audio 2", "audio 3"]
+        assert not list(tmp_path.glob("*.tmp"))
+    print("✓ diff_scene_renders reuses unchanged scenes")
+
+
+def test_merge_transcripts_dedupes_overlap():
+    """Words repeated across the chunk overlap appear once in the merged transcript."""
+    from whisper_service import merge_transcripts
+
+    merged = merge_transcripts([
+        "Hello there, this is our new coffee.",
+        "our new Coffee! It is great",
+        "It is great and cheap.",
+    ])
+    assert merged == "Hello there, this is our new coffee. It is great and cheap."
+    print("✓ merge_transcripts de-duplicates chunk overlap")
+
+
+def test_single_flight_coalesces_concurrent_calls():
+    """Concurrent calls with the same key share one execution; different keys don't."""
+    import asyncio
+    from singleflight import SingleFlight
+
+    calls = []
+
+    async def work(value):
+        calls.append(value)
+        await asyncio.sleep(0.01)
+        return value
+
+    async def run():
+        flights = SingleFlight("test")
+        return await asyncio.gather(
+            flights.do("a", lambda: work(1)),
+            flights.do("a", lambda: work(1)),
+            flights.do("b", lambda: work(2)),
+        )
+
+    assert asyncio.run(run()) == [1, 1, 2]
+    assert sorted(calls) == [1, 2]
+    print("✓ SingleFlight coalesces identical concurrent work")
+
+
+def test_filter_graph_maps_camera_and_transitions():
+    """Scene camera/transition text becomes zoompan moves and xfade/concat joins."""
+    from ffmpeg_render import build_filter_graph
+    from schemas import RenderProfile, SceneScript
+
+    scenes = [
+        SceneScript(scene_number=1, duration_seconds=3, narration="a", visual_description="x",
+                    camera_direction="Slow push in", transition="dissolve"),
+        SceneScript(scene_number=2, duration_seconds=3, narration="b", visual_description="x",
+                    camera_direction="pan right across the desk", transition="cut"),
+        SceneScript(scene_number=3, duration_seconds=3, narration="c", visual_description="x",
+                    transition="fade"),
+    ]
+    graph = build_filter_graph(scenes, [3, 3, 3], RenderProfile(name="t", width=640, height=360))
+    assert graph.count("zoompan=") == 3
+    assert "xfade=transition=fade:duration=0.500:offset=3.000" in graph
+    assert "concat=n=2:v=1:a=0" in graph
+    assert "fade=t=out:st=8.500" in graph
+    assert graph.endswith("[vout]")
+    print("✓ ffmpeg filter graph maps camera moves and transitions")
+
+
+def test_output_profiles_and_smart_crop_focus():
+    """Extra aspect profiles share the final's short side; crop focus follows the subject."""
+    import tempfile
+    from PIL import Image, ImageDraw
+    from config import settings
+    from image_processing import normalized_size, saliency_focus
+    from video_stitcher import output_profiles
+
+    assert [p.name for p in output_profiles()] == ["final"]  # extra aspects are opt-in
+    assert normalized_size((4000, 2250)) == (1280, 720)
+    saved, settings.output_aspect_ratios = settings.output_aspect_ratios, "16:9,9:16,1:1"
+    try:
+        sizes = {p.name: (p.width, p.height) for p in output_profiles()}
+        assert sizes == {"final": (1280, 720), "9x16": (720, 1280), "1x1": (720, 720)}
+        # Scene images keep enough pixels for the 9:16 crop, as far as the source has them
+        assert normalized_size((4000, 2250)) == (2276, 1280)
+        assert normalized_size((1344, 768)) == (1344, 756)
+        assert normalized_size((640, 360)) == (1280, 720)
+    finally:
+        settings.output_aspect_ratios = saved
+
+    img = Image.new("RGB", (1280, 720), "white")
+    ImageDraw.Draw(img).ellipse((1000, 300, 1200, 500), fill="black")  # subject on the right
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "scene.png"
+        img.save(path)
+        fx, fy = saliency_focus(path)
+    assert fx > 0.65 and 0.4 < fy < 0.6
+    print("✓ output profiles + smart-crop focus")
+
+
+def test_provider_limiter_caps_concurrency():
+    """Concurrent calls through a provider slot never exceed the provider's limit."""
+    import asyncio
+    from scheduler import ProviderLimiter
+
+    limiter = ProviderLimiter("test", 2)
+    peak = 0
+
+    async def call():
+        nonlocal peak
+        async with limiter.slot():
+            peak = max(peak, limiter.in_flight)
+            await asyncio.sleep(0.01)
+
+    async def run():
+        await asyncio.gather(*(call() for _ in range(10)))
+
+    asyncio.run(run())
+    assert peak == 2
+    assert limiter.stats()["calls"] == 10 and limiter.stats()["in_flight"] == 0
+    print("✓ provider limiter caps concurrency")
+
+
+def test_scheduler_keeps_interactive_fast_during_batch_flood():
+    """Interactive calls skip a batch backlog; batch tenants are served round-robin."""
+    import asyncio
+    from scheduler import ProviderLimiter
+
+    limiter = ProviderLimiter("test", 2, reserved=1)
+    order: list[str] = []
+
+    async def call(lane: str, tenant: str):
+        async with limiter.slot(lane, tenant):
+            order.append(tenant)
+            await asyncio.sleep(0.02)
+
+    async def run():
+        flood = [asyncio.create_task(call("batch", t)) for t in ["a"] * 6 + ["b"] * 6]
+        await asyncio.sleep(0.005)
+        await call("interactive", "editor")
+        await asyncio.gather(*flood)
+
+    asyncio.run(run())
+    # The reserved slot lets the editor in right after the one running batch call
+    assert order.index("editor") == 1, order
+    batch_order = [t for t in order if t != "editor"]
+    # The first "a" ran straight away; the queued rest alternate between tenants
+    assert batch_order[1:9] == ["a", "b"] * 4, batch_order
+    print("✓ scheduler: interactive unaffected by batch flood, tenants interleaved")
+
+
+def test_deadline_degradation_ladder():
+    """No deadline: full quality. Tight deadline: cheap steps first. Missed deadline: everything."""
+    from datetime import datetime, timedelta
+    from config import settings
+    from degradation import LADDER, plan_for_deadline, trim_scenes
+    from schemas import MarketingScript, PipelineJob, SceneRender, SceneScript
+    from video_stitcher import draft_profile, output_profiles
+
+    script = MarketingScript(
+        title="t", target_audience="a", tone="bold", total_duration_seconds=64,
+        scenes=[
+            SceneScript(scene_number=i, duration_seconds=8, narration=f"line {i}", visual_description="x")
+            for i in range(1, 9)
+        ],
+    )
+    renders = [SceneRender(scene_number=i, image_fingerprint="f", audio_fingerprint="a") for i in range(1, 9)]
+    now = datetime.utcnow()
+
+    saved, settings.output_aspect_ratios = settings.output_aspect_ratios, "9:16,1:1"
+    profiles = output_profiles()
+    settings.output_aspect_ratios = saved
+
+    def plan(seconds):
+        job = PipelineJob(job_id="j", deadline=now + timedelta(seconds=seconds) if seconds is not None else None)
+        return plan_for_deadline(job, script, renders, [], profiles, draft_profile(), now=now)
+
+    assert plan(None).steps == []
+    assert plan(3600).steps == []
+    # Without the fewer_scenes step every scene is rendered, however many there are
+    long = script.model_copy(update={"scenes": script.scenes + script.scenes[:4]})
+    assert len(trim_scenes(long, plan(None).max_scenes).scenes) == 12
+    tight = plan(150)
+    assert tight.steps == ["skip_draft", "skip_extra_aspects"], tight.steps
+    missed = plan(-1)
+    # No earlier images to fall back on, so cached_images saves nothing and is skipped
+    assert [s.split(":")[0] for s in missed.steps] == [s for s in LADDER if s != "cached_images"]
+    assert missed.profile(output_profiles()[0]).height == 480
+    trimmed = trim_scenes(script, missed.max_scenes)
+    assert len(trimmed.scenes) == missed.max_scenes and trimmed.scenes[-1].scene_number == 8
+    print(f"✓ deadline degradation (tight: {', '.join(tight.steps)})")
+
+
+def test_job_store_versions_and_patches():
+    """Patches merge field-wise and bump the version; stale whole-record writes conflict."""
+    from pipeline import JobConflictError, create_job, get_job, patch_job, update_job
+    from schemas import PipelineStage
+
+    job = create_job()
+    stale = get_job(job.job_id)
+    stale.transcript = "mutating a snapshot does not touch the store"
+    assert get_job(job.job_id).transcript is None
+
+    patch_job(job.job_id, stage=PipelineStage.SCRIPTING)
+    patch_job(job.job_id, transcript="hello")
+    current = get_job(job.job_id)
+    assert (current.version, current.stage, current.transcript) == (2, PipelineStage.SCRIPTING, "hello")
+
+    try:
+        update_job(stale)
+        assert False, "stale write should conflict"
+    except JobConflictError as e:
+        assert (e.expected, e.actual) == (0, 2)
+    try:
+        patch_job(job.job_id, expected_version=1, error="x")
+        assert False, "stale patch should conflict"
+    except JobConflictError:
+        pass
+    assert update_job(current).version == 3
+
+    # Patched values are validated like the model's constructor: bad ones never reach the store
+    try:
+        patch_job(job.job_id, stage="bogus")
+        assert False, "invalid stage should be rejected"
+    except ValueError:
+        pass
+    assert patch_job(job.job_id, stage="complete").stage is PipelineStage.COMPLETE
+    assert get_job(job.job_id).version == 4
+    print("✓ job store versions and patches")
+
+
+def test_job_store_keeps_blobs_out_of_hot_record():
+    """Transcripts / raw compliance responses are stored compressed and loaded on request."""
+    import pipeline
+    from schemas import ComplianceResult
+
+    job = pipeline.create_job()
+    raw = {"decision": "allow", "details": ["x" * 100] * 50}
+    pipeline.patch_job(job.job_id, transcript="memo " * 500, pre_compliance=ComplianceResult(passed=True, raw_response=raw))
+
+    hot = pipeline._jobs[job.job_id]
+    assert hot.transcript is None and hot.pre_compliance.raw_response is None
+    assert sum(len(b) for b in pipeline._blobs[job.job_id].values()) < 1000
+
+    lean = pipeline.get_job(job.job_id, blobs=False)
+    assert lean.transcript is None and lean.pre_compliance.passed
+    lean.error = "note"
+    pipeline.update_job(lean)  # a lean snapshot never erases the stored blobs
+    full = pipeline.get_job(job.job_id)
+    assert full.transcript == "memo " * 500 and full.pre_compliance.raw_response == raw
+    assert full.error == "note"
+    print("✓ compact job storage")
+
+
+def test_local_artifact_store_dedupes_by_content():
+    """Identical files share one sharded, content-addressed entry; reads stream it back."""
+    import tempfile
+    from pathlib import Path
+    from artifact_store import LocalArtifactStore
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        store = LocalArtifactStore(tmp / "store")
+        (tmp / "a.mp3").write_bytes(b"narration" * 1000)
+        (tmp / "b.mp3").write_bytes(b"narration" * 1000)
+
+        key = store.put_file(tmp / "a.mp3")
+        assert store.put_file(tmp / "b.mp3") == key
+        digest = key.rsplit("/", 1)[1]
+        assert key == f"sha256/{digest[:2]}/{digest[2:4]}/{digest}"
+        assert len(list((tmp / "store").rglob("*.mp3"))) == 1
+
+        assert store.put_stream(iter([b"narration" * 500, b"narration" * 500]), ".mp3") == key
+        assert b"".join(store.read(key, start=9)) == b"narration" * 999
+        assert store.fetch(key, tmp / "copy.mp3").read_bytes() == b"narration" * 1000
+    print("✓ local artifact store")
+
+
+def test_resumable_upload_resumes_and_verifies():
+    """Chunks append at the server offset; a bad chunk checksum rolls back; completion renames."""
+    import asyncio
+    import base64
+    import hashlib
+    from resumable_upload import UploadError, append_chunk, create_upload, upload_path
+
+    data = bytes(range(256)) * 40
+
+    async def body(chunk: bytes):
+        yield chunk
+
+    async def run():
+        upload = create_upload(len(data), {"filename": "memo.wav", "sha256": hashlib.sha256(data).hexdigest()})
+        upload = await append_chunk(upload.upload_id, 0, body(data[:4000]))
+        assert upload.offset == 4000 and not upload.completed
+        for offset, checksum in [(0, None), (4000, "sha256 " + base64.b64encode(b"0" * 32).decode())]:
+            try:
+                await append_chunk(upload.upload_id, offset, body(data[4000:]), checksum)
+                assert False, "stale offset / bad checksum should be rejected"
+            except UploadError as e:
+                assert e.status_code in (409, 460)
+        checksum = "sha256 " + base64.b64encode(hashlib.sha256(data[4000:]).digest()).decode()
+        upload = await append_chunk(upload.upload_id, 4000, body(data[4000:]), checksum)
+        assert upload.completed and upload_path(upload).read_bytes() == data
+        upload_path(upload).unlink()
+
+    asyncio.run(run())
+    print("✓ resumable upload")
+
+
+def test_idempotency_key_replays_and_rejects_reuse():
+    """A recorded key replays its response; reusing it for another request is rejected."""
+    from idempotency import IdempotencyKeyReused, find_record, remember, request_fingerprint
+    from pipeline import create_job, get_job, patch_job
+    from schemas import JobStatusResponse, PipelineStage
+
+    job = create_job()
+    fingerprint = request_fingerprint("generate", "{}")
+    assert find_record(job.job_id, "k", "generate", fingerprint) is None
+    response = JobStatusResponse(job_id=job.job_id, stage=PipelineStage.IMAGE_GEN)
+    patch_job(job.job_id, idempotency=remember(job, "k", "generate", fingerprint, response))
+
+    record = find_record(job.job_id, "k", "generate", fingerprint)
+    assert record.response == response.model_dump(mode="json")
+    assert find_record(None, "k", "generate", fingerprint).response["job_id"] == job.job_id
+    try:
+        find_record(job.job_id, "k", "generate", request_fingerprint("generate", "other"))
+        assert False, "key reuse should be rejected"
+    except IdempotencyKeyReused:
+        pass
+    assert get_job(job.job_id).version == 1
+    print("✓ idempotency keys")
+
+
+def test_encode_progress_is_throttled_with_eta():
+    """Encoder progress reports are throttled; each carries percent, fps and an ETA."""
+    from video_stitcher import _ProgressTracker
+
+    reports = []
+    progress = _ProgressTracker("final", total_seconds=10, fps=30, on_progress=reports.append)
+    progress.update(2.5)
+    progress.update(5)  # within the throttle interval: not reported
+    assert len(reports) == 1 and reports[0].frames == 75 and reports[0].percent == 25
+    assert reports[0].eta_seconds is not None and not reports[0].done
+    progress.finish()
+    assert len(reports) == 2 and reports[-1].done
+    assert reports[-1].frames == reports[-1].total_frames == 300 and reports[-1].eta_seconds == 0
+
+    # Live progress is served by /status without touching the versioned job record
+    import pipeline
+    from schemas import PipelineStage
+
+    job = pipeline.create_job()
+    version = pipeline.patch_job(job.job_id, stage=PipelineStage.STITCHING).version
+    try:
+        pipeline._encode_progress[job.job_id] = reports[0]
+        status = client.get(f"/pipeline/{job.job_id}/status").json()
+        assert status["encode_progress"]["frames"] == 75 and status["version"] == version
+    finally:
+        pipeline._encode_progress.pop(job.job_id, None)
+    assert client.get(f"/pipeline/{job.job_id}/status").json()["encode_progress"] is None
+    print("✓ encode progress")
+
+
+def test_loop_monitor_catches_blocking_call():
+    """A blocking call on the loop shows up as lag, and the debug watchdog captures its stack."""
+    import asyncio
+    import time
+
+    from loop_monitor import LoopMonitor
+
+    def blocking_sleep():
+        time.sleep(0.3)
+
+    async def run():
+        monitor = LoopMonitor(interval=0.02, block_threshold=0.1, debug=True)
+        monitor.start()
+        await asyncio.sleep(0.05)
+        blocking_sleep()
+        await asyncio.sleep(0.05)
+        await monitor.stop()
+        return monitor.snapshot()
+
+    stats = asyncio.run(run())
+    assert stats["max_ms"] >= 200 and stats["buckets_ms"]["+Inf"] == stats["count"]
+    assert stats["blocks_total"] == 1 and "blocking_sleep" in stats["recent_blocks"][0]["stack"]
+    print("✓ loop monitor")
+
+
+def test_replicate_webhook_requires_signature():
+    """Webhooks are refused without a configured secret or a valid signature; signed ones wake the render."""
+    import asyncio
+    import base64
+    import hashlib
+    import hmac
+    import json
+    import time
+
+    from config import settings
+    from replicate_predictions import _waiters, resolve_webhook, verify_webhook_signature, webhook_url
+
+    body = json.dumps({"id": "p1", "status": "succeeded", "output": ["https://example.com/x.png"]}).encode()
+    secret = "whsec_" + base64.b64encode(b"k" * 24).decode()
+    timestamp = str(int(time.time()))
+    signature = base64.b64encode(
+        hmac.new(b"k" * 24, f"msg1.{timestamp}.".encode() + body, hashlib.sha256).digest()
+    ).decode()
+    headers = {"webhook-id": "msg1", "webhook-timestamp": timestamp, "webhook-signature": f"v1,{signature}"}
+
+    saved = settings.replicate_webhook_secret, settings.public_base_url
+    try:
+        settings.public_base_url, settings.replicate_webhook_secret = "https://api.example.com", ""
+        assert webhook_url() is None, "webhooks must not be registered without a secret"
+        assert client.post("/webhooks/replicate", content=body).status_code == 401
+
+        settings.replicate_webhook_secret = secret
+        assert webhook_url() == "https://api.example.com/webhooks/replicate"
+        assert verify_webhook_signature(headers, body)
+        assert not verify_webhook_signature(headers, body.replace(b"x.png", b"y.png"))
+        assert not verify_webhook_signature({**headers, "webhook-timestamp": "1"}, body)
+        assert client.post("/webhooks/replicate", content=body).status_code == 401
+        r = client.post("/webhooks/replicate", content=body, headers=headers)
+        assert r.status_code == 200 and r.json()["resolved"]
+    finally:
+        settings.replicate_webhook_secret, settings.public_base_url = saved
+
+    async def wait():
+        future = asyncio.get_running_loop().create_future()
+        _waiters["p2"] = future
+        assert not resolve_webhook({"id": "p2", "status": "processing"})
+        assert resolve_webhook({"id": "p2", "status": "succeeded"})
+        return await future
+
+    assert asyncio.run(wait())["status"] == "succeeded"
+    _waiters.pop("p2", None)
+    print("✓ replicate webhook signature")
+
+
+def test_cancelled_work_releases_busy_stage():
+    """A cancelled /script or render never leaves the job in a busy stage (409 forever)."""
+    import asyncio
+
+    import main
+    import pipeline
+    from pipeline import create_job, get_job, patch_job
+    from schemas import MarketingScript, PipelineStage
+
+    async def hang(*args, **kwargs):
+        await asyncio.Event().wait()
+
+    async def run(coro):
+        task = asyncio.create_task(coro)
+        await asyncio.sleep(0.05)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    job = create_job()
+    patch_job(job.job_id, transcript="hello")
+    saved = pipeline.generate_script, pipeline._restore_artifacts
+    pipeline.generate_script = pipeline._restore_artifacts = hang
+    try:
+        asyncio.run(run(main._generate_script(job.job_id, None)))
+        job = get_job(job.job_id)
+        assert job.stage == PipelineStage.FAILED and "cancelled" in job.error
+        main._check_version(job, None)  # no longer busy
+
+        script = MarketingScript(title="t", target_audience="a", tone="b", total_duration_seconds=1, scenes=[])
+        patch_job(job.job_id, script=script, stage=PipelineStage.IMAGE_GEN)  # as claimed by /generate
+        asyncio.run(run(pipeline.run_media_generation(job.job_id)))
+        assert get_job(job.job_id).stage == PipelineStage.FAILED
+    finally:
+        pipeline.generate_script, pipeline._restore_artifacts = saved
+    print("✓ cancellation releases busy stages")
+
+
+def test_full_pipeline_idempotency_key_covers_audio_bytes():
+    """/pipeline/full replays only for the same memo bytes; a different memo under the key is rejected."""
+    import main
+    from config import settings
+
+    async def noop(*args):
+        pass
+
+    saved = main.run_full_pipeline
+    main.run_full_pipeline = noop
+    try:
+        headers = {"Idempotency-Key": "memo-1", "X-Tenant-ID": "full-key-test"}
+        first = client.post("/pipeline/full", files={"audio": ("m.wav", b"a" * 64, "audio/wav")}, headers=headers)
+        again = client.post("/pipeline/full", files={"audio": ("m.wav", b"a" * 64, "audio/wav")}, headers=headers)
+        other = client.post("/pipeline/full", files={"audio": ("m.wav", b"b" * 64, "audio/wav")}, headers=headers)
+    finally:
+        main.run_full_pipeline = saved
+        for path in settings.upload_dir.glob("*_m.wav"):
+            path.unlink()
+    assert first.status_code == again.status_code == 200
+    assert again.json()["job_id"] == first.json()["job_id"] and again.headers.get("Idempotent-Replayed")
+    assert other.status_code == 422
+    print("✓ /pipeline/full idempotency fingerprint")
+
+
+def test_speculation_cancel_and_expiry():
+    """A speculative render cancelled mid-promotion is re-rendered normally; stale speculations expire."""
+    import asyncio
+    import tempfile
+
+    import pipeline
+    from pipeline import _Speculation, _promote_speculation, _speculations, create_job, expire_speculations
+    from schemas import MarketingScript, SceneRender
+
+    script = MarketingScript(title="t", target_audience="a", tone="b", total_duration_seconds=1, scenes=[])
+
+    async def run(tmp: Path):
+        job = create_job()
+        quarantine = tmp / "speculative"
+        quarantine.mkdir()
+        speculation = _Speculation(script, quarantine)
+        task = asyncio.create_task(asyncio.sleep(10))
+        speculation.tasks["fp"] = task
+        _speculations[job.job_id] = speculation
+        render = SceneRender(scene_number=1, image_fingerprint="fp", audio_fingerprint="a")
+        asyncio.get_running_loop().call_later(0.02, task.cancel)  # e.g. a concurrent /script
+        assert await _promote_speculation(job.job_id, [render], tmp / "images") == 0
+        assert render.image_path is None and job.job_id not in _speculations
+
+        stale = create_job()
+        _speculations[stale.job_id] = _Speculation(script, quarantine)
+        _speculations[stale.job_id].started -= 3600
+        assert await expire_speculations(max_age_seconds=60) == 1
+        assert stale.job_id not in _speculations and not quarantine.exists()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(run(Path(tmp)))
+    print("✓ speculation cancel / expiry")
+
+
+def test_tts_streams_to_disk_and_cleans_up_on_failure():
+    """Streamed TTS lands on disk with ttfb / byte counts; a failed stream leaves no .part file."""
+    import asyncio
+    import tempfile
+
+    import httpx
+
+    import http_client
+    from config import settings
+    from elevenlabs_service import _synthesize, generate_all_scene_audio
+    from schemas import SceneScript
+
+    streaming = [0, 0]  # in flight, peak
+
+    async def body():
+        streaming[0] += 1
+        streaming[1] = max(streaming)
+        for _ in range(3):
+            await asyncio.sleep(0.01)
+            yield b"\xff\xfb" * 512
+        streaming[0] -= 1
+
+    async def broken():
+        yield b"\xff\xfb" * 512
+        raise httpx.ReadError("connection reset")
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        assert request.url.path.endswith("/stream")
+        return httpx.Response(200, content=broken() if b'"fail"' in request.content else body())
+
+    async def run(tmp: Path):
+        http_client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        try:
+            result = await _synthesize("ok", tmp / "a.mp3")
+            assert result.total_bytes == 3072 and (tmp / "a.mp3").stat().st_size == 3072
+            assert 0 < result.ttfb_ms <= result.duration_ms
+            try:
+                await _synthesize("fail", tmp / "b.mp3")
+                assert False, "broken stream should raise"
+            except httpx.ReadError:
+                pass
+            assert list(tmp.iterdir()) == [tmp / "a.mp3"]
+
+            # Segments of a script are requested concurrently, in scene order
+            scenes = [
+                SceneScript(scene_number=n, duration_seconds=5, narration=f"line {n}", visual_description="x")
+                for n in (1, 2, 3)
+            ]
+            results = await generate_all_scene_audio(scenes, tmp / "all")
+            assert [Path(r.path).name for r in results] == ["scene_01.mp3", "scene_02.mp3", "scene_03.mp3"]
+            assert streaming[1] == 3, streaming
+        finally:
+            await http_client.close_http_client()
+
+    saved = settings.elevenlabs_api_key
+    settings.elevenlabs_api_key = "test"
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            asyncio.run(run(Path(tmp)))
+    finally:
+        settings.elevenlabs_api_key = saved
+    print("✓ TTS streaming")
+
+
+def test_artifact_gc_keeps_referenced_and_republished_content():
+    """Store entries are hard links under the TTL and budget; references from live jobs keep them."""
+    import os
+    import tempfile
+    import time
+
+    import artifact_store
+    from config import settings
+    from pipeline import create_job, patch_job
+    from retention import _disk_usage, _scan, collect_garbage_sync
+    from schemas import PipelineStage
+
+    saved = (
+        settings.output_dir, settings.upload_dir, settings.artifact_dir,
+        settings.artifact_backend, settings.disk_budget_mb, artifact_store._store,
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        settings.output_dir, settings.upload_dir, settings.artifact_dir = tmp / "out", tmp / "up", tmp / "store"
+        settings.artifact_backend, settings.disk_budget_mb, artifact_store._store = "local", 0, None
+        try:
+            source = tmp / "scene.png"
+            source.write_bytes(b"pixels" * 100)
+            key = artifact_store._publish_sync(source)
+            entry = settings.artifact_dir / key
+            assert entry.stat().st_nlink == 2, "published by hard link, not copied"
+            assert _disk_usage(_scan()) == 600, "hard links are counted once"
+            old = time.time() - 365 * 86400
+
+            os.utime(entry, (old, old))
+            assert artifact_store._publish_sync(source) == key  # memoized, but refreshed
+            assert time.time() - entry.stat().st_mtime < 60
+
+            os.utime(entry, (old, old))
+            job = create_job()
+            patch_job(job.job_id, stage=PipelineStage.COMPLETE, artifacts={"images/scene_01.png": key})
+            collect_garbage_sync()
+            assert entry.exists(), "a recently written job keeps its entries"
+
+            # A year on, the job itself has gone stale: its reference no longer protects
+            report = collect_garbage_sync(now=time.time() + 365 * 86400)
+            assert not entry.exists() and report.files_deleted == 1
+            assert source.exists() and report.bytes_reclaimed == 0, "the working file still holds the inode"
+            assert artifact_store._publish_sync(source) == key and entry.exists()
+
+            # Under budget pressure store entries are evicted like any other file
+            patch_job(job.job_id, artifacts={})
+            settings.disk_budget_mb = 1e-6
+            source.unlink()
+            report = collect_garbage_sync()
+            assert not entry.exists() and report.reclaimed_by_kind == {"artifact": 600}
+        finally:
+            (
+                settings.output_dir, settings.upload_dir, settings.artifact_dir,
+                settings.artifact_backend, settings.disk_budget_mb, artifact_store._store,
+            ) = saved
+    print("✓ artifact store GC")
+
+
+def test_resumable_upload_expiry_spares_active_patch():
+    """Idle uploads expire (job failed), one with a PATCH in progress is kept; empty uploads are refused."""
+    import asyncio
+    from datetime import datetime, timedelta
+    from pipeline import get_job
+    from resumable_upload import UploadError, _locks, _part_path, create_upload, expire_uploads, get_upload
+    from schemas import PipelineStage
+
+    async def run():
+        try:
+            create_upload(0, {"filename": "empty.wav"})
+            assert False, "empty uploads should be refused"
+        except UploadError as e:
+            assert e.status_code == 400
+        idle = create_upload(10, {"filename": "idle.wav"})
+        busy = create_upload(10, {"filename": "busy.wav"})
+        later = datetime.utcnow() + timedelta(days=365)
+        async with _locks[busy.upload_id]:  # as held by a PATCH
+            assert expire_uploads(now=later) >= 1
+        assert get_upload(idle.upload_id) is None and get_job(idle.job_id).stage == PipelineStage.FAILED
+        assert get_upload(busy.upload_id) is not None
+        assert expire_uploads(now=later) >= 1 and get_upload(busy.upload_id) is None
+        for upload in (idle, busy):
+            _part_path(upload).unlink(missing_ok=True)
+
+    asyncio.run(run())
+    print("✓ resumable upload expiry")
+
+
+def test_single_flight_runs_in_most_urgent_waiter_lane():
+    """An interactive caller joining batch single-flight work promotes its queued provider call."""
+    import asyncio
+    import scheduler
+    from scheduler import ProviderLimiter, set_lane
+    from singleflight import SingleFlight
+
+    limiter = scheduler._limiters["flight-test"] = ProviderLimiter("flight-test", 1)
+    flights = SingleFlight("test")
+    order: list[str] = []
+
+    async def call(name: str):
+        async with limiter.slot():
+            order.append(name)
+
+    async def batch(fn):
+        set_lane("batch")
+        return await fn()
+
+    async def run():
+        release = asyncio.Event()
+
+        async def hold():
+            async with limiter.slot("batch", "holder"):
+                await release.wait()
+
+        holder = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        queued = [asyncio.create_task(batch(lambda: call("batch"))) for _ in range(3)]
+        shared = asyncio.create_task(batch(lambda: flights.do("k", lambda: call("flight"))))
+        await asyncio.sleep(0.01)
+        joined = asyncio.create_task(flights.do("k", lambda: call("flight")))  # interactive lane
+        await asyncio.sleep(0.01)
+        release.set()
+        await asyncio.gather(holder, shared, joined, *queued)
+
+    try:
+        asyncio.run(run())
+    finally:
+        del scheduler._limiters["flight-test"]
+    assert order == ["flight", "batch", "batch", "batch"], order
+    print("✓ single-flight lane promotion")
+
+
+def test_replicate_slot_released_while_prediction_renders():
+    """The replicate slot covers creating a prediction, not waiting for it to render."""
+    import asyncio
+    import tempfile
+
+    import replicate_predictions
+    from scheduler import get_limiter
+
+    limiter = get_limiter("replicate")
+    seen: list[int] = []
+
+    async def create(model, input):
+        seen.append(limiter.in_flight)
+        return {"id": "p", "status": "starting"}
+
+    async def wait(prediction):
+        seen.append(limiter.in_flight)
+        return {"id": "p", "status": "succeeded", "output": ["https://example.com/x.png"]}
+
+    async def download(url, path):
+        return path
+
+    saved = replicate_predictions.create_prediction, replicate_predictions.wait_for_prediction, replicate_predictions.download_output
+    replicate_predictions.create_prediction = create
+    replicate_predictions.wait_for_prediction = wait
+    replicate_predictions.download_output = download
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            asyncio.run(replicate_predictions.run_prediction("m", {}, Path(tmp) / "x.png"))
+    finally:
+        (replicate_predictions.create_prediction, replicate_predictions.wait_for_prediction,
+         replicate_predictions.download_output) = saved
+    assert seen == [1, 0], seen
+    print("✓ replicate slot released during render")
+
+
+def test_variant_remux_encodes_narration_once():
+    """Variants encode the new narration once and stream-copy it into every output; endpoints serve them."""
+    import subprocess
+    import tempfile
+
+    import artifact_store
+    import pipeline
+    import video_stitcher
+    from config import settings
+    from moviepy.video.io.ffmpeg_reader import ffmpeg_parse_infos
+    from pipeline import create_job, patch_job
+    from schemas import MarketingScript, PipelineStage, SceneScript, SynthesizedAudio
+
+    ffmpeg = video_stitcher.FFMPEG_BINARY
+
+    def make(args: list[str], path: Path) -> Path:
+        subprocess.run([ffmpeg, "-y", "-loglevel", "error", *args, str(path)], check=True)
+        return path
+
+    voiced = []
+
+    async def fake_tts(scenes, output_dir, voice_id=None, on_chunk=None):
+        voiced.extend(s.scene_number for s in scenes)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        return [
+            SynthesizedAudio(
+                path=str(make(["-f", "lavfi", "-i", "sine=d=0.4", "-c:a", "libmp3lame"], output_dir / f"{s.scene_number}.mp3")),
+                ttfb_ms=1, total_bytes=1, duration_ms=1,
+            )
+            for s in scenes
+        ]
+
+    encodes = []
+    real_call = video_stitcher.subprocess_call
+
+    def counting_call(cmd, **kwargs):
+        encodes.extend(a for a in cmd if a in ("aac", "libx264"))
+        return real_call(cmd, **kwargs)
+
+    saved = settings.output_dir, settings.artifact_dir, artifact_store._store, pipeline.generate_all_scene_audio
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        settings.output_dir, settings.artifact_dir, artifact_store._store = tmp / "out", tmp / "store", None
+        pipeline.generate_all_scene_audio = fake_tts
+        video_stitcher.subprocess_call = counting_call
+        try:
+            clips = tmp / "clips"
+            clips.mkdir()
+            lavfi = ["-f", "lavfi", "-i", "color=c=blue:s=64x36:r=12:d=2", "-c:v", "libx264"]
+            outputs = {"final": make(lavfi, clips / "video.mp4"), "9x16": make(lavfi, clips / "video_9x16.mp4")}
+            job = create_job()
+            patch_job(
+                job.job_id,
+                stage=PipelineStage.COMPLETE,
+                final_video_path=str(outputs["final"]),
+                outputs={name: str(p) for name, p in outputs.items()},
+                rendered_scenes=[1, 3],  # scene 2 was dropped by a deadline
+                script=MarketingScript(
+                    title="t", target_audience="a", tone="bold", total_duration_seconds=3,
+                    scenes=[
+                        SceneScript(scene_number=i, duration_seconds=1, narration=f"line {i}", visual_description="x")
+                        for i in (1, 2, 3)
+                    ],
+                ),
+            )
+
+            response = client.post(f"/pipeline/{job.job_id}/variants", json={"voice_id": "other"})
+            assert response.status_code == 202, response.text
+            variant_id = response.json()["variant_id"]
+            variant = client.get(f"/pipeline/{job.job_id}/variants/{variant_id}").json()
+            assert variant["status"] == "complete", variant
+            assert voiced == [1, 3], voiced  # only the scenes in the video are narrated
+            assert encodes == ["aac"], encodes  # one narration encode, video and audio copied per output
+
+            for name in ("final", "9x16"):
+                path = Path(variant["outputs"][name])
+                info = ffmpeg_parse_infos(str(path))
+                assert info["audio_found"] and abs(info["duration"] - 2) < 0.2, (name, info["duration"])
+                served = client.get(f"/pipeline/{job.job_id}/variants/{variant_id}/video?profile={name}")
+                assert served.status_code == 200 and served.content == path.read_bytes()
+            assert client.get(f"/pipeline/{job.job_id}/variants/{variant_id}/video?profile=1x1").status_code == 404
+            assert not list(Path(variant["outputs"]["final"]).parent.glob("*.aac.m4a"))
+        finally:
+            settings.output_dir, settings.artifact_dir, artifact_store._store, pipeline.generate_all_scene_audio = saved
+            video_stitcher.subprocess_call = real_call
+    print("✓ variant remux")
+
+
+def test_long_memo_is_decoded_once():
+    """Preprocessing hands its PCM to chunked transcription instead of decoding the memo again."""
+    import asyncio
+    import subprocess
+    import tempfile
+    from types import SimpleNamespace
+
+    import audio_processing
+    import whisper_service
+    from config import settings
+    from pipeline import _transcribe_upload
+
+    decodes = []
+    real_decode = audio_processing.decode_pcm
+
+    def counting_decode(path, *args, **kwargs):
+        decodes.append(Path(path).name)
+        return real_decode(path, *args, **kwargs)
+
+    chunks = []
+
+    async def create(model, file):
+        chunks.append((file.name, len(file.getvalue())))
+        return SimpleNamespace(text=f"part {len(chunks)}")
+
+    fake_client = SimpleNamespace(audio=SimpleNamespace(transcriptions=SimpleNamespace(create=create)))
+    saved = (
+        whisper_service._client, audio_processing.decode_pcm, settings.audio_preprocess,
+        settings.transcribe_chunk_threshold_seconds, settings.transcribe_chunk_seconds,
+    )
+    whisper_service._client, audio_processing.decode_pcm = fake_client, counting_decode
+    settings.audio_preprocess = True
+    settings.transcribe_chunk_threshold_seconds, settings.transcribe_chunk_seconds = 4, 3
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            memo = Path(tmp) / "memo.wav"
+            subprocess.run(
+                [audio_processing.ffmpeg_binary(), "-loglevel", "error", "-f", "lavfi",
+                 "-i", "sine=f=300:d=10", str(memo)],
+                check=True,
+            )
+            transcript, _, uploaded = asyncio.run(_transcribe_upload(memo, "audio/wav"))
+    finally:
+        (
+            whisper_service._client, audio_processing.decode_pcm, settings.audio_preprocess,
+            settings.transcribe_chunk_threshold_seconds, settings.transcribe_chunk_seconds,
+        ) = saved
+    assert decodes == ["memo.wav"], decodes
+    assert len(chunks) >= 3 and "part 1" in transcript
+    assert all(name.endswith(".ogg") for name, _ in chunks), "chunks are sent as Opus"
+    assert uploaded == sum(size for _, size in chunks)
+    print(f"✓ long memo decoded once ({len(chunks)} Opus chunks)")
+
+
+def test_gc_rechecks_protection_and_ages_out_abandoned_jobs():
+    """A job that starts rendering mid-pass keeps its files; jobs abandoned mid-pipeline lose protection."""
+    import os
+    import tempfile
+    import time
+
+    import retention
+    from config import settings
+    from pipeline import create_job, patch_job
+    from schemas import PipelineStage
+
+    saved = settings.output_dir, settings.upload_dir, settings.artifact_backend, retention._scan
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        settings.output_dir, settings.upload_dir, settings.artifact_backend = tmp / "out", tmp / "up", "s3"
+        try:
+            old = time.time() - 365 * 86400
+            files = {}
+            for name in ("regenerated", "abandoned", "working"):
+                job = create_job()
+                path = settings.output_dir / job.job_id / "images" / "scene_01.png"
+                path.parent.mkdir(parents=True)
+                path.write_bytes(b"x")
+                os.utime(path, (old, old))
+                files[name] = (job.job_id, path)
+            patch_job(files["regenerated"][0], stage=PipelineStage.COMPLETE)
+            patch_job(files["abandoned"][0], stage=PipelineStage.PRE_COMPLIANCE)
+            patch_job(files["working"][0], stage=PipelineStage.IMAGE_GEN)
+
+            def scan_then_generate():
+                artifacts = saved[3]()
+                # /generate re-renders the finished job while the pass is running
+                patch_job(files["regenerated"][0], stage=PipelineStage.IMAGE_GEN)
+                return artifacts
+
+            retention._scan = scan_then_generate
+            retention.collect_garbage_sync()
+            assert files["regenerated"][1].exists(), "re-checked right before the unlink"
+            assert files["working"][1].exists()
+
+            # A year later nothing has touched the in-flight jobs: they were abandoned
+            retention._scan = saved[3]
+            report = retention.collect_garbage_sync(now=time.time() + 365 * 86400)
+            assert not any(path.exists() for _, path in files.values()), report
+        finally:
+            settings.output_dir, settings.upload_dir, settings.artifact_backend, retention._scan = saved
+    print("✓ GC protection re-check and abandoned jobs")
+
+
+def test_lazy_image_sequence_follows_scene_boundaries():
+    """Frames switch image exactly at scene starts, each image is decoded once per visit."""
+    import tempfile
+
+    from PIL import Image
+
+    import video_stitcher
+    from video_stitcher import LazyImageSequence
+
+    colors = [(255, 0, 0), (0, 255, 0), (0, 0, 255)]
+    decoded = []
+    real_load = video_stitcher._load_frame
+
+    def counting_load(path, size):
+        decoded.append(path.name)
+        return real_load(path, size)
+
+    video_stitcher._load_frame = counting_load
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = []
+            for i, color in enumerate(colors):
+                paths.append(Path(tmp) / f"scene_{i + 1:02d}.png")
+                Image.new("RGB", (64, 64), color).save(paths[-1])  # square: cover-fit crops it
+            source = LazyImageSequence(paths, [1.0, 2.0, 1.0], (32, 18))
+            assert source.duration == 4.0
+
+            def color_at(t: float) -> tuple:
+                frame = source.frame_at(t)
+                assert frame.shape == (18, 32, 3)
+                return tuple(int(c) for c in frame[9, 16])
+
+            timeline = [(-0.5, 0), (0, 0), (0.99, 0), (1.0, 1), (2.5, 1), (2.999, 1), (3.0, 2), (9, 2)]
+            assert [color_at(t) for t, _ in timeline] == [colors[i] for _, i in timeline]
+            assert decoded == ["scene_01.png", "scene_02.png", "scene_03.png"]
+            source.release()
+            assert color_at(3.5) == colors[2] and len(decoded) == 4  # released frames are decoded again
+    finally:
+        video_stitcher._load_frame = real_load
+    try:
+        LazyImageSequence([Path("a.png")], [1.0, 2.0], (32, 18))
+        assert False, "one duration per image"
+    except ValueError:
+        pass
+    print("✓ lazy image sequence")
+
+
+def test_draft_is_published_before_final_encode():
+    """The low-res draft is on the job and served at /draft while the final encode is still running."""
+    import asyncio
+    import shutil
+    import subprocess
+    import tempfile
+
+    from PIL import Image
+
+    import artifact_store
+    import pipeline
+    import video_stitcher
+    from config import settings
+    from moviepy.video.io.ffmpeg_reader import ffmpeg_parse_infos
+    from schemas import ComplianceResult, MarketingScript, PipelineStage, SceneScript, SynthesizedAudio
+
+    async def images(script, output_dir, scenes=None):
+        output_dir.mkdir(parents=True, exist_ok=True)
+        paths = []
+        for scene in scenes:
+            paths.append(output_dir / f"scene_{scene.scene_number:02d}.png")
+            Image.new("RGB", (320, 180), (40 * scene.scene_number, 80, 120)).save(paths[-1])
+        return paths
+
+    async def tts(scenes, output_dir, voice_id=None, on_chunk=None):
+        output_dir.mkdir(parents=True, exist_ok=True)
+        results = []
+        for scene in scenes:
+            path = output_dir / f"scene_{scene.scene_number:02d}.mp3"
+            subprocess.run(
+                [video_stitcher.FFMPEG_BINARY, "-y", "-loglevel", "error", "-f", "lavfi", "-i", "sine=d=1", str(path)],
+                check=True,
+            )
+            results.append(SynthesizedAudio(path=str(path), ttfb_ms=1, total_bytes=1, duration_ms=1))
+        return results
+
+    async def compliant(script, video_path):
+        return ComplianceResult(passed=True)
+
+    seen = {}
+
+    real_encode = video_stitcher.stitch_images_to_profiles
+
+    async def final_encode(image_paths, script, audio_path, outputs, low_priority=False, on_progress=None):
+        if outputs[0][0].name == "draft":
+            return await real_encode(image_paths, script, audio_path, outputs, low_priority, on_progress)
+        # Still "encoding" the final video: the draft must already be watchable
+        job = pipeline.get_job(job_id, blobs=False)
+        seen["draft_path"] = job.draft_video_path
+        seen["status"] = (await asyncio.to_thread(client.get, f"/pipeline/{job_id}/status")).json()
+        seen["draft"] = await asyncio.to_thread(client.get, f"/pipeline/{job_id}/draft")
+        seen["low_priority"] = low_priority
+        for _, path in outputs:
+            shutil.copyfile(job.draft_video_path, path)
+        return {profile.name: path for profile, path in outputs}
+
+    saved = (
+        settings.output_dir, settings.artifact_dir, artifact_store._store, settings.draft_preview,
+        pipeline.generate_all_images, pipeline.generate_all_scene_audio, pipeline.check_video_compliance,
+        video_stitcher.stitch_images_to_profiles,
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        settings.output_dir, settings.artifact_dir, artifact_store._store = tmp / "out", tmp / "store", None
+        settings.draft_preview = True
+        pipeline.generate_all_images, pipeline.generate_all_scene_audio = images, tts
+        pipeline.check_video_compliance = compliant
+        video_stitcher.stitch_images_to_profiles = final_encode
+        try:
+            script = MarketingScript(
+                title="t", target_audience="a", tone="bold", total_duration_seconds=2,
+                scenes=[
+                    SceneScript(scene_number=i, duration_seconds=1, narration=f"line {i}", visual_description=f"v{i}")
+                    for i in (1, 2)
+                ],
+            )
+            job_id = pipeline.create_job().job_id
+            pipeline.patch_job(job_id, script=script)
+            job = asyncio.run(pipeline.run_media_generation(job_id))
+            assert job.stage == PipelineStage.COMPLETE, job.error
+
+            draft = Path(seen["draft_path"])
+            assert draft.name == "draft.mp4" and seen["low_priority"]
+            assert seen["status"]["stage"] == "stitching"
+            assert seen["status"]["draft_video_url"] == f"/pipeline/{job_id}/draft"
+            assert seen["status"]["final_video_url"] is None
+            assert seen["draft"].status_code == 200 and seen["draft"].content == draft.read_bytes()
+            profile = video_stitcher.draft_profile()
+            info = ffmpeg_parse_infos(str(draft))
+            assert info["video_size"] == [profile.width, profile.height] and info["video_fps"] == profile.fps
+        finally:
+            (
+                settings.output_dir, settings.artifact_dir, artifact_store._store, settings.draft_preview,
+                pipeline.generate_all_images, pipeline.generate_all_scene_audio, pipeline.check_video_compliance,
+                video_stitcher.stitch_images_to_profiles,
+            ) = saved
+    print("✓ draft published before the final encode")
+
+
+def test_generate_key_with_deadline_keeps_earlier_keys():
+    """Recording a /generate key (with a deadline) keeps the /script key already on the job."""
+    import main
+    from pipeline import create_job, get_job, patch_job
+    from schemas import ComplianceResult, MarketingScript, PipelineStage, SceneScript
+
+    script = MarketingScript(
+        title="t", target_audience="a", tone="bold", total_duration_seconds=8,
+        scenes=[SceneScript(scene_number=1, duration_seconds=8, narration="line", visual_description="v")],
+    )
+    calls = []
+
+    async def fake_script_generation(job_id):
+        calls.append(job_id)
+        return patch_job(
+            job_id, script=script, pre_compliance=ComplianceResult(passed=True), stage=PipelineStage.PRE_COMPLIANCE,
+        )
+
+    async def no_render(job_id, approved_script=None):
+        return get_job(job_id, blobs=False)
+
+    saved = main.run_script_generation, main.run_media_generation
+    main.run_script_generation, main.run_media_generation = fake_script_generation, no_render
+    try:
+        job = create_job()
+        patch_job(job.job_id, transcript="memo")
+        first = client.post(f"/pipeline/{job.job_id}/script", headers={"Idempotency-Key": "s1"})
+        assert first.status_code == 200, first.text
+        generated = client.post(
+            f"/pipeline/{job.job_id}/generate?deadline_seconds=60", json={}, headers={"Idempotency-Key": "g1"},
+        )
+        assert generated.status_code == 200, generated.text
+        assert len(get_job(job.job_id, blobs=("idempotency",)).idempotency) == 2
+        assert get_job(job.job_id, blobs=False).deadline is not None
+        # A retried /script is replayed, not run again
+        retried = client.post(f"/pipeline/{job.job_id}/script", headers={"Idempotency-Key": "s1"})
+        assert retried.json() == first.json() and len(calls) == 1
+
+        # A later /generate without a deadline drops the old one instead of inheriting it
+        patch_job(job.job_id, stage=PipelineStage.COMPLETE)
+        assert client.post(f"/pipeline/{job.job_id}/generate", json={}).status_code == 200
+        assert get_job(job.job_id, blobs=False).deadline is None
+    finally:
+        main.run_script_generation, main.run_media_generation = saved
+    print("✓ idempotency keys survive a deadline")
+
+
+def test_pre_render_stages_are_busy():
+    """Edits are refused while a memo is transcribed or a script is checked, not while it waits for review."""
+    import asyncio
+
+    from fastapi import HTTPException
+
+    import main
+    import pipeline
+    from pipeline import create_job, get_job, patch_job
+    from schemas import ComplianceResult, MarketingScript, PipelineStage
+
+    script = MarketingScript(title="t", target_audience="a", tone="b", total_duration_seconds=1, scenes=[])
+    checking = asyncio.Event()
+    release = asyncio.Event()
+
+    async def fake_script(transcript):
+        return script
+
+    async def fake_check(checked):
+        checking.set()
+        await release.wait()
+        return ComplianceResult(passed=True)
+
+    def assert_busy(job_id):
+        try:
+            main._check_version(get_job(job_id), None)
+        except HTTPException as e:
+            assert e.status_code == 409
+        else:
+            raise AssertionError(f"{get_job(job_id).stage} should be busy")
+
+    job = create_job()
+    patch_job(job.job_id, stage=PipelineStage.TRANSCRIBING)
+    assert_busy(job.job_id)
+
+    async def run():
+        patch_job(job.job_id, transcript="hello", pre_compliance=ComplianceResult(passed=True))
+        task = asyncio.create_task(pipeline.run_script_generation(job.job_id))
+        await checking.wait()
+        assert get_job(job.job_id).stage == PipelineStage.PRE_COMPLIANCE
+        assert_busy(job.job_id)  # the previous run's result does not count
+        release.set()
+        await task
+
+    saved = pipeline.generate_script, pipeline.check_script_compliance, pipeline._start_speculation
+    pipeline.generate_script, pipeline.check_script_compliance = fake_script, fake_check
+    pipeline._start_speculation = lambda job_id, script: None
+    try:
+        asyncio.run(run())
+    finally:
+        pipeline.generate_script, pipeline.check_script_compliance, pipeline._start_speculation = saved
+    job = get_job(job.job_id)
+    assert job.stage == PipelineStage.PRE_COMPLIANCE and job.pre_compliance.passed
+    main._check_version(job, None)  # waiting for review: editable
+    print("✓ transcription and pre-compliance are busy stages")
+
+
+def test_discarded_speculation_keeps_shared_image_flight():
+    """Discarding a speculation whose render another job joined still delivers that job's image."""
+    import asyncio
+    import tempfile
+
+    import image_service
+    from config import settings
+    from pipeline import _start_speculation, create_job, discard_speculation
+    from schemas import MarketingScript, SceneScript
+
+    scene = SceneScript(scene_number=1, duration_seconds=2, narration="n", visual_description="a lamp")
+    script = MarketingScript(title="t", target_audience="a", tone="b", total_duration_seconds=2, scenes=[scene])
+    started, release = asyncio.Event(), asyncio.Event()
+
+    async def render(prompt, output_path):
+        started.set()
+        await release.wait()
+        output_path.with_suffix(".jpg").write_bytes(b"jpeg")
+        return output_path.with_suffix(".jpg")
+
+    async def run():
+        job = create_job()
+        _start_speculation(job.job_id, script)
+        await started.wait()
+        other = asyncio.create_task(image_service.generate_scene_image(scene, script, settings.output_dir / "other"))
+        await asyncio.sleep(0.01)  # joins the speculative flight
+        await discard_speculation(job.job_id)
+        assert not (settings.output_dir / job.job_id / "speculative").exists()
+        release.set()
+        path = await other
+        assert path.read_bytes() == b"jpeg"
+        assert not image_service._staged and not any((settings.output_dir / "_flights").iterdir())
+
+    saved = (
+        settings.output_dir, settings.speculative_scenes, settings.api_only,
+        settings.replicate_async, image_service._render_scene_image,
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        settings.output_dir, settings.speculative_scenes, settings.api_only = Path(tmp), 1, False
+        settings.replicate_async, image_service._render_scene_image = True, render
+        try:
+            asyncio.run(run())
+        finally:
+            (
+                settings.output_dir, settings.speculative_scenes, settings.api_only,
+                settings.replicate_async, image_service._render_scene_image,
+            ) = saved
+    print("✓ discarded speculation keeps shared image flight")
+
+
+def test_live_narration_hears_chunks_before_segment_is_done():
+    """Narration listeners get the first TTS bytes while the segment is still being synthesized."""
+    import asyncio
+    import tempfile
+
+    import httpx
+
+    import http_client
+    from config import settings
+    from elevenlabs_service import generate_all_scene_audio, segment_path
+    from pipeline import _NarrationFeed, _narration_feeds, listen_narration
+    from schemas import SceneScript
+
+    async def body():
+        for i in range(3):
+            await asyncio.sleep(0.02)
+            yield bytes([i]) * 512
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, content=body())
+
+    async def run(tmp: Path):
+        http_client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        scenes = [SceneScript(scene_number=n, duration_seconds=5, narration=f"live {n}", visual_description="x") for n in (1, 2)]
+        feed = _narration_feeds["live"] = _NarrationFeed({s.scene_number: segment_path(tmp, s.scene_number) for s in scenes})
+        try:
+            live = listen_narration("live", 2)
+            task = asyncio.create_task(generate_all_scene_audio(scenes, tmp, on_chunk=feed.on_chunk))
+            first = await live.__anext__()
+            assert first == bytes([0]) * 512 and not segment_path(tmp, 2).exists(), "heard before the file is done"
+            rest = [chunk async for chunk in live]
+            await task
+            assert first + b"".join(rest) == segment_path(tmp, 2).read_bytes()
+            assert listen_narration("live", 2) is None and not feed.listeners
+        finally:
+            _narration_feeds.pop("live", None)
+            await http_client.close_http_client()
+
+    saved = settings.elevenlabs_api_key
+    settings.elevenlabs_api_key = "test"
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            asyncio.run(run(Path(tmp)))
+    finally:
+        settings.elevenlabs_api_key = saved
+    print("✓ live narration")
+
+
+def test_last_gc_report_is_served():
+    """GET /admin/gc returns the report of the last pass, null before one has run."""
+    import tempfile
+
+    import retention
+    from config import settings
+
+    saved = settings.output_dir, settings.upload_dir, settings.artifact_dir, retention._last_report
+    with tempfile.TemporaryDirectory() as tmp:
+        settings.output_dir, settings.upload_dir, settings.artifact_dir = Path(tmp) / "out", Path(tmp) / "up", Path(tmp) / "store"
+        retention._last_report = None
+        try:
+            assert client.get("/admin/gc").json() is None
+            ran = client.post("/admin/gc").json()
+            assert client.get("/admin/gc").json() == ran
+        finally:
+            settings.output_dir, settings.upload_dir, settings.artifact_dir, retention._last_report = saved
+    print("✓ last GC report served")
+
+
+# Modules that must only load on first use (provider SDKs + render stack)
+HEAVY_MODULES = ("moviepy", "numpy", "PIL", "anthropic", "openai", "replicate", "httpx")
+IMPORT_BUDGET_SECONDS = 2.0
+
+
+def test_import_time_budget():
+    """Importing the app stays within budget and does not pull in provider SDKs or moviepy."""
+    import subprocess
+
+    code = (
+        "import sys, time; t = time.perf_counter(); import main; "
+        "print(time.perf_counter() - t); "
+        f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=Path(__file__).resolve().parent,
+        capture_output=True, text=True, check=True,
+    ).stdout.splitlines()
+    elapsed, loaded = float(out[0]), out[1] if len(out) > 1 else ""
+    assert not loaded, f"Eagerly imported at startup: {loaded}"
+    assert elapsed < IMPORT_BUDGET_SECONDS, f"import main took {elapsed:.2f}s (budget {IMPORT_BUDGET_SECONDS}s)"
+    print(f"✓ import main in {elapsed:.2f}s, no heavy SDKs loaded")
+
+
 if __name__ == "__main__":
     print("Running smoke tests...\n")
     test_health()
     test_status_404_for_unknown_job()
     test_upload_creates_job()
+    test_diff_scene_renders_reuses_unchanged_scenes()
+    test_merge_transcripts_dedupes_overlap()
+    test_single_flight_coalesces_concurrent_calls()
+    test_filter_graph_maps_camera_and_transitions()
+    test_output_profiles_and_smart_crop_focus()
+    test_provider_limiter_caps_concurrency()
+    test_scheduler_keeps_interactive_fast_during_batch_flood()
+    test_deadline_degradation_ladder()
+    test_job_store_versions_and_patches()
+    test_job_store_keeps_blobs_out_of_hot_record()
+    test_local_artifact_store_dedupes_by_content()
+    test_resumable_upload_resumes_and_verifies()
+    test_idempotency_key_replays_and_rejects_reuse()
+    test_encode_progress_is_throttled_with_eta()
+    test_loop_monitor_catches_blocking_call()
+    test_replicate_webhook_requires_signature()
+    test_cancelled_work_releases_busy_stage()
+    test_full_pipeline_idempotency_key_covers_audio_bytes()
+    test_speculation_cancel_and_expiry()
+    test_tts_streams_to_disk_and_cleans_up_on_failure()
+    test_artifact_gc_keeps_referenced_and_republished_content()
+    test_resumable_upload_expiry_spares_active_patch()
+    test_single_flight_runs_in_most_urgent_waiter_lane()
+    test_replicate_slot_released_while_prediction_renders()
+    test_variant_remux_encodes_narration_once()
+    test_long_memo_is_decoded_once()
+    test_gc_rechecks_protection_and_ages_out_abandoned_jobs()
+    test_lazy_image_sequence_follows_scene_boundaries()
+    test_draft_is_published_before_final_encode()
+    test_generate_key_with_deadline_keeps_earlier_keys()
+    test_pre_render_stages_are_busy()
+    test_discarded_speculation_keeps_shared_image_flight()
+    test_live_narration_hears_chunks_before_segment_is_done()
+    test_last_gc_report_is_served()
+    test_import_time_budget()
     print("\n✅ Smoke tests done.")
@@ -4,13 +4,34 @@ into a final marketing video.
 """
 
 import asyncio
+import bisect
+import os
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import accumulate
 from pathlib import Path
+from typing import Callable, Optional
 
+import numpy as np
+import proglog
+from PIL import Image, ImageOps
 from moviepy import VideoFileClip, concatenate_videoclips
-from moviepy.video.VideoClip import ImageClip
+from moviepy.video.VideoClip import VideoClip
 from moviepy.audio.io.AudioFileClip import AudioFileClip
+from moviepy.config import FFMPEG_BINARY
+from moviepy.tools import subprocess_call
+from moviepy.video.io.ffmpeg_reader import ffmpeg_parse_infos
 
-from schemas import MarketingScript
+from artifact_store import detach
+from config import settings
+from image_processing import aspect_size
+from schemas import EncodeProgress, MarketingScript, RenderProfile
+from scheduler import provider_slot
+
+ProgressCallback = Callable[[EncodeProgress], None]
 
 
 async def stitch_video(
@@ -61,6 +82,7 @@ def _stitch_sync(
 
     # Write output
     output_path.parent.mkdir(parents=True, exist_ok=True)
+    detach(output_path)
     final.write_videofile(
         str(output_path),
         codec="libx264",
@@ -78,56 +100,431 @@ def _stitch_sync(
     return output_path
 
 
+def final_profile() -> RenderProfile:
+    return RenderProfile(
+        name="final",
+        width=settings.video_width,
+        height=settings.video_height,
+        fps=settings.video_fps,
+        preset=settings.video_preset,
+        crf=settings.video_crf,
+    )
+
+
+def draft_profile() -> RenderProfile:
+    """Quick preview: same aspect ratio at draft_height, low fps, ultrafast preset."""
+    height = settings.draft_height
+    width = round(height * settings.video_width / settings.video_height / 2) * 2
+    return RenderProfile(
+        name="draft",
+        width=width,
+        height=height,
+        fps=settings.draft_fps,
+        preset="ultrafast",
+        crf=30,
+    )
+
+
+def aspect_profile(ratio: str) -> RenderProfile:
+    """
+    Final-quality profile for an aspect ratio like "9:16", named "9x16".
+    The short side matches the primary video's short side.
+    """
+    a, b = (int(part) for part in ratio.split(":"))
+    width, height = aspect_size(ratio)
+    return final_profile().model_copy(update={"name": f"{a}x{b}", "width": width, "height": height})
+
+
+def output_profiles() -> list[RenderProfile]:
+    """The final profile plus one per extra aspect in settings.output_aspect_ratios."""
+    primary = final_profile()
+    profiles = [primary]
+    for ratio in filter(None, (r.strip() for r in settings.output_aspect_ratios.split(","))):
+        profile = aspect_profile(ratio)
+        if profile.width * primary.height != profile.height * primary.width and all(
+            p.name != profile.name for p in profiles
+        ):
+            profiles.append(profile)
+    return profiles
+
+
+# Background (final-quality) encodes run on niced threads; the ffmpeg processes
+# they spawn inherit the lower priority, so drafts and API work go first.
+_background_pool: Optional[ThreadPoolExecutor] = None
+
+
+def _lower_thread_priority():
+    try:
+        # On Linux, nice values are per-thread and inherited by child processes
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), settings.background_encode_niceness)
+    except (AttributeError, OSError):
+        pass
+
+
+def _get_background_pool() -> ThreadPoolExecutor:
+    global _background_pool
+    if _background_pool is None:
+        _background_pool = ThreadPoolExecutor(
+            max_workers=settings.background_encode_workers,
+            thread_name_prefix="encode-bg",
+            initializer=_lower_thread_priority,
+        )
+    return _background_pool
+
+
 async def stitch_images_with_audio(
     image_paths: list[Path],
     script: MarketingScript,
     audio_path: Path,
     output_path: Path,
+    profile: Optional[RenderProfile] = None,
+    low_priority: bool = False,
+    on_progress: Optional[ProgressCallback] = None,
 ) -> Path:
     """
     Stitch scene images with a single narration audio track into a video.
     Each image is shown for its scene's duration_seconds; audio plays across the whole video.
+    `profile` sets resolution / fps / encoder speed (defaults to the final profile);
+    `low_priority` runs the encode on the niced background pool.
     """
-    return await asyncio.to_thread(
-        _stitch_images_with_audio_sync, image_paths, script, audio_path, output_path
+    profile = profile or final_profile()
+    await stitch_images_to_profiles(
+        image_paths, script, audio_path, [(profile, output_path)],
+        low_priority=low_priority, on_progress=on_progress,
     )
+    return output_path
+
+
+async def stitch_images_to_profiles(
+    image_paths: list[Path],
+    script: MarketingScript,
+    audio_path: Path,
+    outputs: list[tuple[RenderProfile, Path]],
+    low_priority: bool = False,
+    on_progress: Optional[ProgressCallback] = None,
+) -> dict[str, Path]:
+    """
+    Render one video per (profile, path) from a single pass: images are decoded
+    and smart-crop focus computed once, narration is encoded to AAC once.
+    Returns {profile name: path}. Encodes take a "stitch" slot in the job's lane.
+    `on_progress` receives throttled EncodeProgress reports from the encoder
+    thread (at most one per settings.encode_progress_interval_seconds, plus a
+    final one).
+    """
+    async with provider_slot("stitch"):
+        if low_priority:
+            loop = asyncio.get_running_loop()
+            rendered = await loop.run_in_executor(
+                _get_background_pool(),
+                _stitch_images_with_audio_sync,
+                image_paths, script, audio_path, outputs, on_progress,
+            )
+        else:
+            rendered = await asyncio.to_thread(
+                _stitch_images_with_audio_sync, image_paths, script, audio_path, outputs, on_progress
+            )
+    return rendered
+
+
+class LazyImageSequence:
+    """
+    Frame source for a slideshow of still images.
+
+    Only the image for the scene whose time window is being encoded is decoded,
+    resized once to the output size and kept; it is released as soon as the
+    encoder moves on, so peak memory is about one frame regardless of scene count.
+    """
+
+    def __init__(
+        self,
+        image_paths: list[Path],
+        durations: list[float],
+        size: tuple[int, int],
+    ):
+        if len(image_paths) != len(durations):
+            raise ValueError("Need one duration per image")
+        self.image_paths = image_paths
+        self.size = size
+        self.starts = list(accumulate(durations, initial=0.0))[:-1]
+        self.duration = float(sum(durations))
+        self._index: Optional[int] = None
+        self._frame: Optional[np.ndarray] = None
+
+    def frame_at(self, t: float) -> np.ndarray:
+        index = min(max(bisect.bisect_right(self.starts, t) - 1, 0), len(self.image_paths) - 1)
+        if index != self._index:
+            self._frame = None  # drop the previous scene before decoding the next
+            self._frame = _load_frame(self.image_paths[index], self.size)
+            self._index = index
+        return self._frame
+
+    def release(self):
+        self._index = None
+        self._frame = None
+
+
+def _load_frame(image_path: Path, size: tuple[int, int]) -> np.ndarray:
+    """Decode an image and cover-fit it to `size` (centre crop, no letterboxing)."""
+    with Image.open(image_path) as img:
+        img = img.convert("RGB")
+        if img.size != size:
+            img = ImageOps.fit(img, size, Image.LANCZOS)
+        return np.asarray(img)
 
 
 def _stitch_images_with_audio_sync(
     image_paths: list[Path],
     script: MarketingScript,
     audio_path: Path,
-    output_path: Path,
-) -> Path:
-    """Synchronous: image clips + single audio -> final video."""
-    clips = []
-    for i, img_path in enumerate(image_paths):
+    outputs: list[tuple[RenderProfile, Path]],
+    on_progress: Optional[ProgressCallback] = None,
+) -> dict[str, Path]:
+    """Synchronous: scene images + single audio -> one video per output profile."""
+    if not image_paths:
+        raise ValueError("No image clips to stitch")
+    for img_path in image_paths:
         if not img_path.exists():
             raise FileNotFoundError(f"Image not found: {img_path}")
-        duration = script.scenes[i].duration_seconds if i < len(script.scenes) else 5.0
-        clip = ImageClip(str(img_path), duration=duration)
-        clips.append(clip)
 
-    if not clips:
-        raise ValueError("No image clips to stitch")
+    durations = [
+        script.scenes[i].duration_seconds if i < len(script.scenes) else 5.0
+        for i in range(len(image_paths))
+    ]
+    for _, output_path in outputs:
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        detach(output_path)  # encoders rewrite in place; keep published copies intact
 
-    final = concatenate_videoclips(clips, method="compose")
+    primary = outputs[0][0]
+    passes = 1 if settings.stitch_engine == "ffmpeg" else len(outputs)
+    progress = _ProgressTracker(primary.name, sum(durations) * passes, primary.fps, on_progress)
+    if settings.stitch_engine == "ffmpeg":
+        _render_ffmpeg(image_paths, script, durations, audio_path, outputs, progress)
+    else:
+        for i, (profile, output_path) in enumerate(outputs):
+            progress.offset = sum(durations) * i
+            _render_moviepy(image_paths, durations, audio_path, output_path, profile, progress)
+    progress.finish()
+    return {profile.name: output_path for profile, output_path in outputs}
+
+
+class _ProgressTracker:
+    """Turns encoder counters (media seconds done) into throttled EncodeProgress reports."""
+
+    def __init__(self, output: str, total_seconds: float, fps: int, on_progress: Optional[ProgressCallback]):
+        self.output = output
+        self.total_seconds = max(total_seconds, 1e-6)
+        self.fps = fps
+        self.on_progress = on_progress
+        self.offset = 0.0  # media seconds finished by earlier passes
+        self.started = time.perf_counter()
+        self._last_report = 0.0
+        self._done_seconds = 0.0
+
+    def update(self, media_seconds: float):
+        self._done_seconds = min(self.offset + media_seconds, self.total_seconds)
+        now = time.perf_counter()
+        if now - self._last_report >= settings.encode_progress_interval_seconds:
+            self._last_report = now
+            self._report(done=False)
+
+    def finish(self):
+        self._done_seconds = self.total_seconds
+        progress = self._report(done=True)
+        print(
+            f"🎞 Encoded {progress.output}: {progress.frames} frames in "
+            f"{progress.elapsed_seconds:.1f}s ({progress.fps:.1f} fps)"
+        )
+
+    def _report(self, done: bool) -> EncodeProgress:
+        elapsed = time.perf_counter() - self.started
+        done_seconds = self._done_seconds
+        frames = round(done_seconds * self.fps)
+        progress = EncodeProgress(
+            output=self.output,
+            frames=frames,
+            total_frames=round(self.total_seconds * self.fps),
+            percent=round(done_seconds / self.total_seconds * 100, 1),
+            fps=round(frames / elapsed, 1) if elapsed > 0 else 0,
+            eta_seconds=(
+                0 if done else
+                round((self.total_seconds - done_seconds) * elapsed / done_seconds, 1)
+                if done_seconds > 0 else None
+            ),
+            elapsed_seconds=round(elapsed, 1),
+            done=done,
+        )
+        if self.on_progress:
+            try:
+                self.on_progress(progress)
+            except Exception as e:  # progress is best-effort; never fail the encode over it
+                print(f"Encode progress update failed: {e}")
+        return progress
+
+
+class _MoviepyProgressLogger(proglog.ProgressBarLogger):
+    """Feeds moviepy's frame loop into a _ProgressTracker."""
+
+    def __init__(self, progress: _ProgressTracker, fps: int):
+        super().__init__()
+        self.progress = progress
+        self.frame_fps = fps
+
+    def bars_callback(self, bar, attr, value, old_value=None):
+        if bar == "frame_index" and attr == "index" and value >= 0:
+            self.progress.update((value + 1) / self.frame_fps)
+
+
+def _run_ffmpeg_with_progress(cmd: list[str], progress: _ProgressTracker):
+    """
+    subprocess_call with `-progress pipe:1`: ffmpeg writes key=value blocks
+    (out_time_us=..., progress=continue|end) to stdout while it encodes.
+    """
+    cmd = [cmd[0], "-progress", "pipe:1", "-nostats", *cmd[1:]]
+    with tempfile.TemporaryFile() as stderr:
+        proc = subprocess.Popen(
+            cmd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=stderr, text=True
+        )
+        for line in proc.stdout:
+            key, _, value = line.strip().partition("=")
+            if key == "out_time_us" and value.isdigit():
+                progress.update(int(value) / 1_000_000)
+        proc.stdout.close()
+        if proc.wait():
+            stderr.seek(0)
+            raise IOError(stderr.read().decode("utf8", errors="replace"))
+
+
+def _render_ffmpeg(
+    image_paths: list[Path],
+    script: MarketingScript,
+    durations: list[float],
+    audio_path: Path,
+    outputs: list[tuple[RenderProfile, Path]],
+    progress: _ProgressTracker,
+):
+    """Camera motion + transitions in one filter graph; no frames pass through Python."""
+    from ffmpeg_render import build_command, encode_audio_command
+    from image_processing import saliency_focus
+
+    multi = len(outputs) > 1
+    focus = [saliency_focus(p) for p in image_paths]  # once per image, shared by all profiles
+    aac_path = outputs[0][1].with_suffix(".aac.m4a")
+    try:
+        if multi:
+            subprocess_call(encode_audio_command(FFMPEG_BINARY, audio_path, aac_path), logger=None)
+        _run_ffmpeg_with_progress(
+            build_command(
+                FFMPEG_BINARY, image_paths, script, durations,
+                aac_path if multi else audio_path, outputs, focus, copy_audio=multi,
+            ),
+            progress,
+        )
+    finally:
+        aac_path.unlink(missing_ok=True)
+
+
+def _render_moviepy(
+    image_paths: list[Path],
+    durations: list[float],
+    audio_path: Path,
+    output_path: Path,
+    profile: RenderProfile,
+    progress: _ProgressTracker,
+):
+    """Fallback engine: static slideshow composited frame by frame (centre crop)."""
+    source = LazyImageSequence(image_paths, durations, (profile.width, profile.height))
+    video = VideoClip(frame_function=source.frame_at, duration=source.duration)
     audio = AudioFileClip(str(audio_path))
-    final = final.with_audio(audio)
+    final = video.with_audio(audio)
+
+    try:
+        final.write_videofile(
+            str(output_path),
+            codec="libx264",
+            audio_codec="aac",
+            fps=profile.fps,
+            preset=profile.preset,
+            ffmpeg_params=["-crf", str(profile.crf)],
+            logger=_MoviepyProgressLogger(progress, profile.fps),
+        )
+    finally:
+        final.close()
+        audio.close()
+        source.release()
+
+
+async def concat_audio_segments(segment_paths: list[Path], output_path: Path) -> Path:
+    """
+    Join per-scene narration segments into a single track.
+    Uses ffmpeg's concat demuxer with stream copy, so reused segments are never re-encoded.
+    """
+    return await asyncio.to_thread(_concat_audio_segments_sync, segment_paths, output_path)
+
+
+def _concat_audio_segments_sync(segment_paths: list[Path], output_path: Path) -> Path:
+    if not segment_paths:
+        raise ValueError("No audio segments to concatenate")
 
     output_path.parent.mkdir(parents=True, exist_ok=True)
-    final.write_videofile(
-        str(output_path),
-        codec="libx264",
-        audio_codec="aac",
-        fps=24,
-        preset="medium",
-        logger=None,
+    detach(output_path)
+    list_path = output_path.with_suffix(".txt")
+    list_path.write_text(
+        "".join(f"file '{p.resolve().as_posix()}'\n" for p in segment_paths)
     )
-
-    for clip in clips:
-        clip.close()
-    final.close()
-    audio.close()
+    try:
+        subprocess_call(
+            [
+                FFMPEG_BINARY, "-y",
+                "-f", "concat", "-safe", "0",
+                "-i", str(list_path),
+                "-c", "copy",
+                str(output_path),
+            ],
+            logger=None,
+        )
+    finally:
+        list_path.unlink(missing_ok=True)
 
     return output_path
+
+
+async def remux_audio(videos: list[tuple[Path, Path]], audio_path: Path) -> list[Path]:
+    """
+    Replace the audio track of rendered videos, given as (video, output) pairs.
+    The narration is encoded to AAC once, fitted to the videos' length (shorter
+    narration is padded with silence, longer is cut), and stream-copied into
+    every output next to the copied video stream: nothing is re-encoded per output.
+    """
+    await asyncio.to_thread(_remux_audio_sync, videos, audio_path)
+    return [output_path for _, output_path in videos]
+
+
+def _remux_audio_sync(videos: list[tuple[Path, Path]], audio_path: Path):
+    from ffmpeg_render import encode_audio_command
+
+    if not videos:
+        return
+    durations = [ffmpeg_parse_infos(str(video_path))["duration"] for video_path, _ in videos]
+    aac_path = videos[0][1].with_suffix(".aac.m4a")
+    aac_path.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        # Renders of one job share a timeline, so one track fits every output
+        subprocess_call(encode_audio_command(FFMPEG_BINARY, audio_path, aac_path, max(durations)), logger=None)
+        for (video_path, output_path), duration in zip(videos, durations):
+            output_path.parent.mkdir(parents=True, exist_ok=True)
+            detach(output_path)
+            subprocess_call(
+                [
+                    FFMPEG_BINARY, "-y",
+                    "-i", str(video_path),
+                    "-i", str(aac_path),
+                    "-map", "0:v", "-map", "1:a",
+                    "-c", "copy",
+                    "-t", f"{duration:.3f}",
+                    "-movflags", "+faststart",
+                    str(output_path),
+                ],
+                logger=None,
+            )
+    finally:
+        aac_path.unlink(missing_ok=True)
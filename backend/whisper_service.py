@@ -4,44 +4,146 @@ Transcription service: voice memo to text using OpenAI Whisper.
 """
 
 import io
+import re
+import asyncio
 from pathlib import Path
-from typing import Optional
-
-from openai import AsyncOpenAI
+from typing import TYPE_CHECKING, Optional
 
 from config import settings
+from scheduler import provider_slot
+
+if TYPE_CHECKING:
+    import numpy as np
+    from openai import AsyncOpenAI
 
-_client: Optional[AsyncOpenAI] = None
+_client: Optional["AsyncOpenAI"] = None
 
 
-def get_client() -> AsyncOpenAI:
+def get_client() -> "AsyncOpenAI":
     global _client
     if _client is None:
         if not settings.openai_api_key:
             raise ValueError("OPENAI_API_KEY is not set")
+        from openai import AsyncOpenAI  # imported on first use to keep startup fast
+
         _client = AsyncOpenAI(api_key=settings.openai_api_key)
     return _client
 
 
-async def transcribe_audio(audio_path: Path, mime_type: str = "audio/wav") -> str:
+# Whisper rejects uploads over 25 MB; chunk anything close to that regardless of duration
+_MAX_SINGLE_REQUEST_BYTES = 24 * 1024 * 1024
+
+
+async def _transcribe_bytes(audio_data: bytes, filename: str) -> str:
+    client = get_client()
+    file_like = io.BytesIO(audio_data)
+    file_like.name = filename
+
+    async with provider_slot("openai"):
+        transcript_response = await client.audio.transcriptions.create(
+            model="whisper-1",
+            file=file_like,
+        )
+    return transcript_response.text
+
+
+async def _should_chunk(audio_path: Path, samples: Optional["np.ndarray"] = None) -> bool:
+    if audio_path.stat().st_size > _MAX_SINGLE_REQUEST_BYTES:
+        return True
+    from audio_processing import SAMPLE_RATE, probe_duration
+
+    if samples is not None:
+        duration = len(samples) / SAMPLE_RATE
+    else:
+        duration = await asyncio.to_thread(probe_duration, audio_path)
+    return duration is not None and duration > settings.transcribe_chunk_threshold_seconds
+
+
+async def _transcribe_chunked(audio_path: Path, samples: Optional["np.ndarray"] = None) -> tuple[str, int]:
+    """
+    Split the memo on silence into overlapping chunks, transcribe them
+    concurrently (bounded by transcribe_max_concurrency) and merge the texts.
+    Chunks are sent as Opus at audio_preprocess_bitrate (WAV if the encoder
+    fails). `samples` is the memo's already decoded 16 kHz PCM, if the caller
+    has it. Returns (text, bytes uploaded).
+    """
+    from audio_processing import decode_pcm, opus_bytes, split_on_silence, pcm_to_wav
+
+    if samples is None:
+        samples = await asyncio.to_thread(decode_pcm, audio_path)
+    ranges = split_on_silence(
+        samples,
+        chunk_seconds=settings.transcribe_chunk_seconds,
+        overlap_seconds=settings.transcribe_chunk_overlap_seconds,
+    )
+    print(f"Transcribing {audio_path.name} in {len(ranges)} chunks")
+
+    semaphore = asyncio.Semaphore(settings.transcribe_max_concurrency)
+
+    async def _one(index: int, start: int, end: int) -> tuple[str, int]:
+        async with semaphore:
+            try:
+                data = await asyncio.to_thread(opus_bytes, samples[start:end], settings.audio_preprocess_bitrate)
+                filename = f"chunk_{index:03d}.ogg"
+            except Exception as e:
+                print(f"Opus encoding of chunk {index} failed, sending WAV: {e}")
+                data = await asyncio.to_thread(pcm_to_wav, samples[start:end])
+                filename = f"chunk_{index:03d}.wav"
+            return await _transcribe_bytes(data, filename), len(data)
+
+    results = await asyncio.gather(*(_one(i, s, e) for i, (s, e) in enumerate(ranges)))
+    return merge_transcripts([text for text, _ in results]), sum(size for _, size in results)
+
+
+def _normalize_word(word: str) -> str:
+    return re.sub(r"[^\w']", "", word.lower())
+
+
+def merge_transcripts(texts: list[str], max_overlap_words: int = 40) -> str:
+    """
+    Join chunk transcripts, dropping the words at the start of each chunk that
+    repeat the end of the previous one (the audio overlap is heard twice).
+    The longest matching suffix/prefix run (case and punctuation insensitive) wins.
+    """
+    merged: list[str] = []
+    for text in texts:
+        words = text.split()
+        if merged and words:
+            tail = [_normalize_word(w) for w in merged[-max_overlap_words:]]
+            head = [_normalize_word(w) for w in words[:max_overlap_words]]
+            for k in range(min(len(tail), len(head)), 0, -1):
+                if tail[-k:] == head[:k] and any(tail[-k:]):
+                    words = words[k:]
+                    break
+        merged.extend(words)
+    return " ".join(merged)
+
+
+async def transcribe_audio(
+    audio_path: Path,
+    mime_type: str = "audio/wav",
+    samples: Optional["np.ndarray"] = None,
+) -> tuple[str, int]:
     """
     Transcribe voice memo with Whisper and format for the pipeline.
     Returns text in the same format as before: TRANSCRIPTION: ... BRIEF: ...
     We then ask Claude to extract the brief from the raw transcript in script generation.
-    """
-    client = get_client()
-    audio_data = audio_path.read_bytes()
-    file_like = io.BytesIO(audio_data)
-    file_like.name = "audio" + _mime_to_ext(mime_type)
 
-    transcript_response = await client.audio.transcriptions.create(
-        model="whisper-1",
-        file=file_like,
-    )
-    raw = transcript_response.text
+    Short memos go to Whisper in a single request; long or very large ones are
+    split on silence and transcribed in parallel chunks. Pass `samples` (the
+    memo's 16 kHz mono PCM, e.g. from preprocessing) to skip decoding it again.
+    Returns (formatted transcript, bytes sent to Whisper).
+    """
+    get_client()  # fail fast on missing credentials before any local decoding
+    if await _should_chunk(audio_path, samples):
+        raw, uploaded = await _transcribe_chunked(audio_path, samples)
+    else:
+        audio_data = await asyncio.to_thread(audio_path.read_bytes)
+        raw = await _transcribe_bytes(audio_data, "audio" + _mime_to_ext(mime_type))
+        uploaded = len(audio_data)
 
     # Add a brief-format prompt so Claude can use it for script generation
-    return (
+    text = (
         "TRANSCRIPTION:\n"
         + raw
         + "\n\n"
@@ -49,6 +151,7 @@ async def transcribe_audio(audio_path: Path, mime_type: str = "audio/wav") -> st
         "Extract from the above: product/service, target audience, key selling points, "
         "tone/mood, and any specific requirements. Use this for the marketing script."
     )
+    return text, uploaded
 
 
 def _mime_to_ext(mime_type: str) -> str:
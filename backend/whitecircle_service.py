@@ -12,11 +12,12 @@ White Circle evaluates the LAST message in the messages array against all
 policies in the deployment. Previous messages serve as context.
 """
 
-import httpx
 from typing import Optional
 
 from config import settings
 from schemas import ComplianceResult, MarketingScript
+from scheduler import provider_slot
+from singleflight import SingleFlight, content_key
 
 
 # ── White Circle API Client ──────────────────────────────────────────────────
@@ -79,7 +80,9 @@ class WhiteCircleClient:
         if metadata:
             payload["metadata"] = metadata
 
-        async with httpx.AsyncClient(timeout=30.0) as client:
+        import httpx  # imported on first use to keep startup fast
+
+        async with provider_slot("whitecircle"), httpx.AsyncClient(timeout=30.0) as client:
             response = await client.post(
                 f"{self.base_url}/api/session/check",
                 headers=self.headers,
@@ -92,6 +95,7 @@ class WhiteCircleClient:
 # ── Singleton ────────────────────────────────────────────────────────────────
 
 _wc_client: Optional[WhiteCircleClient] = None
+_flights = SingleFlight("compliance")
 
 
 def get_wc_client() -> WhiteCircleClient:
@@ -129,6 +133,16 @@ def _parse_wc_response(result: dict) -> ComplianceResult:
 async def check_script_compliance(
     script: MarketingScript,
     session_id: Optional[str] = None,
+) -> ComplianceResult:
+    """PRE-generation check; concurrent checks of an identical script share one API call."""
+    key = content_key("pre", script.model_dump_json(), session_id or "")
+    result = await _flights.do(key, lambda: _check_script_compliance(script, session_id))
+    return result.model_copy(deep=True)
+
+
+async def _check_script_compliance(
+    script: MarketingScript,
+    session_id: Optional[str] = None,
 ) -> ComplianceResult:
     """
     PRE-GENERATION CHECK: Validate the marketing script before
@@ -138,6 +152,8 @@ async def check_script_compliance(
     evaluates it against all policies in the deployment.
     The system message provides context about what this content is.
     """
+    import httpx
+
     client = get_wc_client()
 
     # Build the full script text
@@ -210,6 +226,22 @@ async def check_video_compliance(
     script: MarketingScript,
     video_path: str,
     session_id: Optional[str] = None,
+) -> ComplianceResult:
+    """
+    POST-generation check; coalesced on the checked content (the script),
+    not on video_path, which is only passed along as metadata.
+    """
+    key = content_key("post", script.model_dump_json(), session_id or "")
+    result = await _flights.do(
+        key, lambda: _check_video_compliance(script, video_path, session_id)
+    )
+    return result.model_copy(deep=True)
+
+
+async def _check_video_compliance(
+    script: MarketingScript,
+    video_path: str,
+    session_id: Optional[str] = None,
 ) -> ComplianceResult:
     """
     POST-GENERATION CHECK: Verify the final assembled content